@@ -1,7 +1,34 @@
 from bs4 import BeautifulSoup
+from collections import deque
+from lxml import etree
+import lxml.html
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import argparse
+import os
 import pymongo
 import re
 
+from src.utils.compression import decompress_html, load_zstd_dictionary
+from src.utils.config import ZSTD_DICT_PATH
+
+PARSE_BATCH_SIZE = 50  # Raw documents sent to a worker process at a time
+
+# Bump when the extracted fields change; incremental runs then rebuild every document
+EXTRACTOR_VERSION = 2
+# Re-read pages this far behind the last run's start, in case crawler and parser clocks differ
+WATERMARK_OVERLAP = timedelta(minutes=5)
+# Incremental runs a failing page may hold the watermark for; after that it waits for its page to change
+MAX_PARSE_ATTEMPTS = 3
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+def load_html_dictionary():
+    """Register the crawler's zstd dictionary so pages compressed with it can be read; also the pool initializer"""
+    if ZSTD_DICT_PATH:
+        load_zstd_dictionary(ZSTD_DICT_PATH)
+
 def connect_to_mongodb():
     """Establish connections to both source and destination databases"""
     client = pymongo.MongoClient("mongodb://localhost:27017/")
@@ -64,6 +91,71 @@ def parse_technical_details(html_content):
 
     return tech_details
 
+# Fast path: the page is parsed once with lxml and every lookup is an XPath anchored on
+# the few subtrees we need, instead of two html.parser trees and repeated full-tree finds.
+# Text matches BeautifulSoup's .text, which leaves out script/style/template/ruby strings.
+_TEXT = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template'
+                    ' or ancestor::rt or ancestor::rp)]')
+_TITLE = etree.XPath('(//span[@id="productTitle"])[1]')
+_PRICE_WHOLE = etree.XPath('(//span[contains(concat(" ", normalize-space(@class), " "), " a-price-whole ")])[1]')
+_MRP = etree.XPath('(//span[normalize-space(@class)="a-price a-text-price"])[1]')
+_OFFSCREEN = etree.XPath('(.//span[contains(concat(" ", normalize-space(@class), " "), " a-offscreen ")])[1]')
+_SAVING = etree.XPath('(//span[contains(concat(" ", normalize-space(@class), " "), " savingPriceOverride ")])[1]')
+_TECH_TABLE = etree.XPath('(//table[@id="productDetails_techSpec_section_1"])[1]')
+_FIRST_TH = etree.XPath('(.//th)[1]')
+_FIRST_TD = etree.XPath('(.//td)[1]')
+
+def _text(element):
+    """Concatenated text of an element, as BeautifulSoup's .text returns it"""
+    return ''.join(_TEXT(element))
+
+def _first(xpath, node):
+    """First match of a compiled XPath, or None"""
+    found = xpath(node)
+    return found[0] if found else None
+
+def extract_page(html_content):
+    """Extract title, price info and technical details from one lxml parse of the page"""
+    root = lxml.html.document_fromstring(html_content.encode('utf-8'), parser=_HTML_PARSER)
+
+    title_element = _first(_TITLE, root)
+    title = _text(title_element).strip() if title_element is not None else None
+
+    price_info = {
+        "current_price": None,
+        "mrp": None,
+        "discount_percentage": None
+    }
+    price_element = _first(_PRICE_WHOLE, root)
+    if price_element is not None:
+        price_info["current_price"] = _text(price_element).strip().replace(',', '')
+    mrp_element = _first(_MRP, root)
+    if mrp_element is not None:
+        mrp_text = _first(_OFFSCREEN, mrp_element)
+        if mrp_text is not None:
+            price_info["mrp"] = _text(mrp_text).strip().replace('₹', '').replace(',', '')
+    discount_element = _first(_SAVING, root)
+    if discount_element is not None:
+        price_info["discount_percentage"] = _text(discount_element).strip().replace('-', '').replace('%', '')
+
+    tech_details = {}
+    table = _first(_TECH_TABLE, root)
+    if table is not None:
+        for row in table.iter('tr'):
+            label = _first(_FIRST_TH, row)
+            value = _first(_FIRST_TD, row)
+            if label is not None and value is not None:
+                key = _text(label).strip().replace('\u200e', '').strip()
+                val = _text(value).strip().replace('\u200e', '').strip()
+                tech_details[key] = val
+
+    return title, price_info, tech_details
+
+def extract_page_bs4(html_content):
+    """Reference extraction with BeautifulSoup's html.parser, kept to verify the fast path"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    return extract_title(soup), extract_price_info(soup), parse_technical_details(html_content)
+
 def standardize_specs(tech_details):
     """Standardize and organize technical specifications"""
     organized_specs = {
@@ -117,53 +209,276 @@ def standardize_specs(tech_details):
     
     return organized_specs
 
-def process_html_documents():
+def build_laptop_doc(doc):
+    """Parse one raw page document into a laptop_specs document, or None if it has no HTML"""
+    # Get HTML content from the document
+    html_content = doc.get('content', decompress_html(doc) or doc.get('source', doc.get('html')))
+    
+    if not html_content:
+        return None
+    
+    # Extract title, price information and specifications in one parse
+    title, price_info, tech_details = extract_page(html_content)
+    organized_specs = standardize_specs(tech_details)
+    
+    # Create document for laptop_data database
+    return {
+        "source_id": doc["_id"],
+        "url": doc.get("url", ""),  # Get URL from raw pages
+        "title": title,
+        "pricing": {
+            "current_price": price_info["current_price"],
+            "mrp": price_info["mrp"],
+            "discount_percentage": price_info["discount_percentage"]
+        },
+        "specifications": organized_specs,
+        "raw_specs": tech_details,
+        "parser_version": EXTRACTOR_VERSION
+    }
+
+def save_laptop_docs(laptop_collection, laptop_docs, upsert=False):
+    """Insert parsed documents, or upsert them by source_id in incremental mode"""
+    if not upsert:
+        laptop_collection.insert_many(laptop_docs, ordered=False)
+        return
+    laptop_collection.bulk_write(
+        [pymongo.ReplaceOne({"source_id": d["source_id"]}, d, upsert=True) for d in laptop_docs],
+        ordered=False
+    )
+
+def parse_batch(docs):
+    """Worker entry point: parse a batch of raw documents, returning (laptop_docs, errors)"""
+    laptop_docs = []
+    errors = []
+    for doc in docs:
+        try:
+            laptop_doc = build_laptop_doc(doc)
+            if laptop_doc is None:
+                errors.append((doc["_id"], "Could not find HTML content"))
+            else:
+                laptop_docs.append(laptop_doc)
+        except Exception as e:
+            errors.append((doc["_id"], str(e)))
+    return laptop_docs, errors
+
+def iter_batches(cursor, batch_size):
+    """Group documents from a cursor into lists of batch_size"""
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def process_in_parallel(raw_collection, laptop_collection, workers=None, batch_size=PARSE_BATCH_SIZE,
+                        query=None, upsert=False):
+    """Parse raw pages on a process pool, streaming batches from the cursor and inserting results in bulk
+
+    Returns the ids of documents that failed to parse or save.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2  # Keeps every worker busy without reading the whole cursor ahead
+    query = query or {}
+    total = raw_collection.count_documents(query) if query else raw_collection.estimated_document_count()
+    batches = iter_batches(raw_collection.find(query, batch_size=batch_size), batch_size)
+    retry_queue = deque()  # (docs, crashes) to resubmit after a worker crash
+    in_flight = {}
+    processed = 0
+    failed_ids = []
+    exhausted = False
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=load_html_dictionary)
+    try:
+        while True:
+            # Top up the pool; batches lost to a crash run alone so a repeat crash is attributable
+            while len(in_flight) < max_in_flight:
+                if retry_queue:
+                    if in_flight:
+                        break
+                    docs, crashes = retry_queue.popleft()
+                    in_flight[pool.submit(parse_batch, docs)] = (docs, crashes)
+                    break
+                elif not exhausted:
+                    docs, crashes = next(batches, None), 0
+                    if docs is None:
+                        exhausted = True
+                        continue
+                else:
+                    break
+                in_flight[pool.submit(parse_batch, docs)] = (docs, crashes)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            lost = []
+            for future in done:
+                docs, crashes = in_flight.pop(future)
+                try:
+                    laptop_docs, errors = future.result()
+                except BrokenProcessPool:
+                    lost.append((docs, crashes))
+                    continue
+
+                if laptop_docs:
+                    try:
+                        save_laptop_docs(laptop_collection, laptop_docs, upsert)
+                    except Exception as e:
+                        # The whole batch counts as failed; the run goes on with the next one
+                        print(f"Error saving {len(laptop_docs)} parsed documents: {str(e)}")
+                        errors = [(doc["_id"], "not saved") for doc in docs]
+                for doc_id, error in errors:
+                    print(f"Error processing document {doc_id}: {error}")
+                    failed_ids.append(doc_id)
+                processed += len(docs)
+                print(f"Processed {processed}/{total} documents ({len(failed_ids)} failed)")
+
+            if lost:
+                # A worker died: every batch still in flight is lost with the pool
+                lost.extend(in_flight.values())
+                in_flight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=load_html_dictionary)
+
+                for docs, crashes in lost:
+                    if crashes == 0:
+                        retry_queue.append((docs, 1))
+                    elif len(docs) > 1:
+                        # Crashed while running alone: isolate the document that kills the worker
+                        retry_queue.extend(([doc], 1) for doc in docs)
+                    else:
+                        print(f"Error processing document {docs[0]['_id']}: worker crashed")
+                        processed += 1
+                        failed_ids.append(docs[0]["_id"])
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    print(f"Finished: {processed - len(failed_ids)} documents parsed, {len(failed_ids)} failed")
+    return failed_ids
+
+def changed_pages_query(watermark):
+    """Raw pages whose HTML changed since the watermark (last_updated for pages saved before html_updated existed)"""
+    return {"$or": [
+        {"html_updated": {"$gte": watermark}},
+        {"html_updated": None, "last_updated": {"$gte": watermark}}
+    ]}
+
+def oldest_change(raw_collection, doc_ids):
+    """Earliest html_updated (or last_updated) among the given raw pages, or None"""
+    oldest = None
+    for doc in raw_collection.find({"_id": {"$in": list(doc_ids)}}, {"html_updated": 1, "last_updated": 1}):
+        changed = doc.get("html_updated") or doc.get("last_updated")
+        if changed is not None and (oldest is None or changed < oldest):
+            oldest = changed
+    return oldest
+
+def remove_orphans(raw_collection, laptop_collection):
+    """Delete laptop_specs documents whose raw page no longer exists, returning how many"""
+    raw_ids = {doc["_id"] for doc in raw_collection.find({}, {"_id": 1})}
+    orphans = [doc["_id"] for doc in laptop_collection.find({}, {"source_id": 1})
+               if doc.get("source_id") not in raw_ids]
+    if not orphans:
+        return 0
+    return laptop_collection.delete_many({"_id": {"$in": orphans}}).deleted_count
+
+def process_incremental(raw_collection, laptop_collection, state_collection, parallel=False, workers=None,
+                        batch_size=PARSE_BATCH_SIZE):
+    """Reparse only pages changed since the last run, upserting by source_id without dropping the collection"""
+    started_at = datetime.utcnow()
+    state = state_collection.find_one({"_id": "laptop_specs"}) or {}
+    laptop_collection.create_index("source_id")
+    raw_collection.create_index("html_updated")
+    raw_collection.create_index("last_updated")
+
+    if state.get("extractor_version") != EXTRACTOR_VERSION or not state.get("watermark"):
+        # New extractor: rebuild everything in place, then drop what the old version wrote
+        print(f"Extractor version {EXTRACTOR_VERSION} differs from stored state, rebuilding all documents")
+        query = {}
+        full_rebuild = True
+    else:
+        query = changed_pages_query(state["watermark"] - WATERMARK_OVERLAP)
+        full_rebuild = False
+        print(f"Parsing pages changed since {state['watermark']}")
+
+    if parallel:
+        failed_ids = process_in_parallel(raw_collection, laptop_collection, workers, batch_size,
+                                         query=query, upsert=True)
+    else:
+        failed_ids = []
+        for doc in raw_collection.find(query):
+            try:
+                laptop_doc = build_laptop_doc(doc)
+                if laptop_doc is None:
+                    print(f"Could not find HTML content in document {doc['_id']}")
+                    failed_ids.append(doc["_id"])
+                    continue
+                save_laptop_docs(laptop_collection, [laptop_doc], upsert=True)
+                print(f"Successfully processed document {doc['_id']}")
+            except Exception as e:
+                print(f"Error processing document {doc['_id']}: {str(e)}")
+                failed_ids.append(doc["_id"])
+
+    if full_rebuild:
+        removed = laptop_collection.delete_many({"parser_version": {"$ne": EXTRACTOR_VERSION}}).deleted_count
+        print(f"Removed {removed} documents from older extractor versions")
+    removed = remove_orphans(raw_collection, laptop_collection)
+    print(f"Removed {removed} documents whose raw page was deleted")
+
+    # Failed attempts per document are kept with the extractor version they were made with
+    previous = {} if full_rebuild else {f["source_id"]: f["attempts"] for f in state.get("failures", [])}
+    failures = [{"source_id": doc_id, "attempts": previous.get(doc_id, 0) + 1} for doc_id in failed_ids]
+    retry_ids = [f["source_id"] for f in failures if f["attempts"] < MAX_PARSE_ATTEMPTS]
+    if len(retry_ids) < len(failures):
+        print(f"{len(failures) - len(retry_ids)} documents failed {MAX_PARSE_ATTEMPTS} runs in a row, "
+              f"skipping them until their page changes")
+
+    # The next run starts from this run's start time, so pages saved while it ran are picked up;
+    # a failed document holds the watermark back so the next run parses it again
+    watermark = started_at
+    oldest_failed = oldest_change(raw_collection, retry_ids) if retry_ids else None
+    if oldest_failed is not None and oldest_failed < watermark:
+        print(f"{len(retry_ids)} documents failed, keeping the watermark at {oldest_failed}")
+        watermark = oldest_failed
+    state_collection.replace_one(
+        {"_id": "laptop_specs"},
+        {"watermark": watermark, "extractor_version": EXTRACTOR_VERSION, "failures": failures},
+        upsert=True
+    )
+
+def process_html_documents(parallel=False, workers=None, batch_size=PARSE_BATCH_SIZE, incremental=False):
     """Main function to process HTML documents and organize data"""
+    load_html_dictionary()
     source_db, dest_db = connect_to_mongodb()
     
     # Get collections
     raw_collection = source_db["raw_pages"]
     laptop_collection = dest_db["laptop_specs"]
+
+    if incremental:
+        process_incremental(raw_collection, laptop_collection, dest_db["parser_state"],
+                            parallel, workers, batch_size)
+        return
     
     # Drop existing collection to start fresh
     laptop_collection.drop()
     print("Dropped existing collection")
+    # A full rebuild invalidates any incremental watermark
+    dest_db["parser_state"].delete_one({"_id": "laptop_specs"})
+
+    if parallel:
+        process_in_parallel(raw_collection, laptop_collection, workers, batch_size)
+        return
     
     # Process each HTML document
     for doc in raw_collection.find():
         try:
-            # Get HTML content from the document
-            html_content = doc.get('content', doc.get('html_content', doc.get('source', doc.get('html'))))
-            
-            if not html_content:
+            laptop_doc = build_laptop_doc(doc)
+            if laptop_doc is None:
                 print(f"Could not find HTML content in document {doc['_id']}")
                 continue
             
-            # Parse the HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Extract title and price information
-            title = extract_title(soup)
-            price_info = extract_price_info(soup)
-            
-            # Extract and organize specifications
-            tech_details = parse_technical_details(html_content)
-            organized_specs = standardize_specs(tech_details)
-            
-            # Create document for laptop_data database
-            laptop_doc = {
-                "source_id": doc["_id"],
-                "url": doc.get("url", ""),  # Get URL from raw pages
-                "title": title,
-                "pricing": {
-                    "current_price": price_info["current_price"],
-                    "mrp": price_info["mrp"],
-                    "discount_percentage": price_info["discount_percentage"]
-                },
-                "specifications": organized_specs,
-                "raw_specs": tech_details
-            }
-            
             # Insert into laptop_data collection
             laptop_collection.insert_one(laptop_doc)
             print(f"Successfully processed document {doc['_id']}")
@@ -172,4 +487,12 @@ def process_html_documents():
             print(f"Error processing document {doc['_id']}: {str(e)}")
 
 if __name__ == "__main__":
-    process_html_documents()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Parse raw laptop pages into laptop_specs")
+    parser.add_argument('--parallel', action='store_true', help="Parse on a process pool")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=PARSE_BATCH_SIZE, help="Documents per worker batch")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Reparse only changed pages and upsert them instead of dropping the collection")
+    args = parser.parse_args()
+    process_html_documents(parallel=args.parallel, workers=args.workers, batch_size=args.batch_size,
+                           incremental=args.incremental)
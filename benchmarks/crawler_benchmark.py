@@ -0,0 +1,231 @@
+# benchmarks/crawler_benchmark.py
+#
+# End-to-end crawler benchmark: runs RawCrawler against the local mock Amazon
+# server, storing through the real DatabaseManager on a mocked Motor client,
+# and reports throughput, fetch latency, rate limiter wait, CPU per page and
+# peak memory. Fetch latency is the crawler's own crawler_fetch_seconds
+# measurement, which covers the HTTP exchange only; time spent waiting on the
+# limiter is reported separately. Use --min-pages-per-sec / --max-p99-ms to
+# fail the run (exit code 1) on a throughput regression.
+#
+#   python benchmarks/crawler_benchmark.py --pages 10 --latency-ms 80 --throttle-rate 0.02
+#   python benchmarks/crawler_benchmark.py --proxies 4 --captcha-rate 0.02 --quarantine-base 2
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_amazon import MockAmazon, MockAmazonConfig
+from benchmarks.mock_motor import mock_database_manager
+from src.crawler.debug_store import DebugArtifactStore
+from src.crawler.proxy_pool import ProxyPool
+from src.crawler.rate_limiter import AdaptiveRateLimiter
+from src.crawler.raw_crawler import RawCrawler
+from src.utils.config import PROXY_QUARANTINE_BASE, PROXY_QUARANTINE_MAX
+from src.utils.metrics import Metrics
+
+class SampledMetrics(Metrics):
+    """Metrics that also keep every raw sample of the chosen histograms, for exact percentiles."""
+
+    def __init__(self, sampled: Tuple[str, ...] = ('crawler_fetch_seconds',)):
+        super().__init__()
+        self.samples: Dict[str, List[float]] = {name: [] for name in sampled}
+
+    def observe(self, name: str, value: float, **labels: str):
+        super().observe(name, value, **labels)
+        if name in self.samples:
+            self.samples[name].append(value)
+
+    def counter_total(self, name: str, **labels: str) -> float:
+        """Sum of a counter over every series whose labels include ``labels``."""
+        wanted = set(labels.items())
+        return sum(value for key, value in self.counters.get(name, {}).items() if wanted <= set(key))
+
+class BenchmarkCrawler(RawCrawler):
+    """RawCrawler that counts fetched pages, takes quarantine settings and reaps its parser pool on shutdown."""
+
+    def __init__(self, *args, quarantine_base: float = PROXY_QUARANTINE_BASE,
+                 quarantine_max: float = PROXY_QUARANTINE_MAX, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.quarantine_base = quarantine_base
+        self.quarantine_max = quarantine_max
+        self.pages_fetched = 0
+        self.bytes_fetched = 0
+
+    async def create_session(self) -> ProxyPool:
+        return ProxyPool(self.proxies, quarantine_base=self.quarantine_base, quarantine_max=self.quarantine_max)
+
+    async def _fetch(self, session, url: str) -> Tuple[int, Optional[str]]:
+        status, content = await super()._fetch(session, url)
+        if content is not None:
+            self.pages_fetched += 1
+            self.bytes_fetched += len(content)
+        return status, content
+
+    def _shutdown_executor(self):
+        # Wait for the pool so its processes' CPU time shows up in RUSAGE_CHILDREN
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def cpu_seconds() -> float:
+    """User and system CPU of this process and its reaped children."""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process or its largest child, in MB (Linux reports KB)."""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / 1024
+
+async def run_benchmark(config: MockAmazonConfig,
+                        concurrency: int = 8,
+                        listing_concurrency: int = 3,
+                        rate: float = 200.0,
+                        cooldown: float = 1.0,
+                        parser_executor: str = 'process',
+                        parser_workers: Optional[int] = None,
+                        write_latency_ms: float = 0.0,
+                        proxies: int = 0,
+                        quarantine_base: float = PROXY_QUARANTINE_BASE,
+                        quarantine_max: float = PROXY_QUARANTINE_MAX) -> Dict[str, Any]:
+    """Crawl the mock catalogue once and return the measurements.
+
+    With ``proxies`` set, requests go through that many proxies, all of them
+    the mock server itself under distinct URLs, so bans and quarantines play
+    out per proxy.
+    """
+    async with MockAmazon(config) as server:
+        db = mock_database_manager(write_latency_ms=write_latency_ms)
+        host = server.base_url.split('://', 1)[1]
+        proxy_urls = [f"http://proxy{i}@{host}" for i in range(1, proxies + 1)]
+        limiter = AdaptiveRateLimiter(initial_rate=rate, min_rate=rate / 10, max_rate=rate,
+                                      burst_limit=max(1, int(rate)), cooldown_time=cooldown, jitter=0)
+        metrics = SampledMetrics()
+        crawler = BenchmarkCrawler(
+            db,
+            metrics=metrics,
+            concurrency=concurrency,
+            listing_concurrency=listing_concurrency,
+            rate_limiter=limiter,
+            parser_executor=parser_executor,
+            parser_workers=parser_workers,
+            debug_store=DebugArtifactStore(enabled=False),
+            proxies=proxy_urls,
+            product_url_template=server.product_url_template,
+            quarantine_base=quarantine_base,
+            quarantine_max=quarantine_max
+        )
+        crawler.urls = server.search_urls
+
+        cpu_started = cpu_seconds()
+        started = time.perf_counter()
+        await crawler.run(max_pages=config.pages)
+        await db.close()  # Flushes the write buffers, so the last batch is timed too
+        elapsed = time.perf_counter() - started
+        cpu_used = cpu_seconds() - cpu_started
+
+        pages = crawler.pages_fetched
+        fetch_latencies = metrics.samples['crawler_fetch_seconds']
+        limiter_wait = metrics.counter_total('crawler_backoff_seconds_total', reason='rate_limit')
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "pages_fetched": pages,
+            "products_stored": sum(1 for doc in db.collection.docs.values() if "html_content" in doc),
+            "db_write_calls": db.collection.write_calls,
+            "products_expected": server.unique_products,
+            "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+            "fetch_p50_ms": round(percentile(fetch_latencies, 50) * 1000, 1),
+            "fetch_p99_ms": round(percentile(fetch_latencies, 99) * 1000, 1),
+            "limiter_wait_s": round(limiter_wait, 3),
+            "cpu_ms_per_page": round(cpu_used / pages * 1000, 2) if pages else 0.0,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "mb_downloaded": round(crawler.bytes_fetched / 2 ** 20, 1),
+            "server": asdict(server.stats),
+        }
+
+def parse_args():
+    defaults = MockAmazonConfig()
+    parser = argparse.ArgumentParser(description="Benchmark RawCrawler against a local mock Amazon server")
+    parser.add_argument('--search-urls', type=int, default=defaults.search_urls)
+    parser.add_argument('--pages', type=int, default=defaults.pages, help="Listing pages per search URL")
+    parser.add_argument('--products-per-page', type=int, default=defaults.products_per_page)
+    parser.add_argument('--product-kb', type=int, default=defaults.product_kb)
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms)
+    parser.add_argument('--latency-jitter-ms', type=float, default=defaults.latency_jitter_ms)
+    parser.add_argument('--throttle-rate', type=float, default=defaults.throttle_rate,
+                        help="Share of responses answered 429/503")
+    parser.add_argument('--captcha-rate', type=float, default=defaults.captcha_rate,
+                        help="Share of responses replaced by a CAPTCHA page")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--listing-concurrency', type=int, default=3)
+    parser.add_argument('--rate', type=float, default=200.0, help="Rate limiter ceiling, requests/sec")
+    parser.add_argument('--cooldown', type=float, default=1.0, help="Rate limiter cool-down after throttling, s")
+    parser.add_argument('--parser-executor', choices=['process', 'thread'], default='process')
+    parser.add_argument('--parser-workers', type=int)
+    parser.add_argument('--write-latency-ms', type=float, default=0.0, help="Simulated database write latency")
+    parser.add_argument('--proxies', type=int, default=0,
+                        help="Route requests through this many proxies (default: direct connection)")
+    parser.add_argument('--quarantine-base', type=float, default=PROXY_QUARANTINE_BASE,
+                        help="Seconds a banned proxy sits out, doubled per consecutive strike")
+    parser.add_argument('--quarantine-max', type=float, default=PROXY_QUARANTINE_MAX,
+                        help="Longest proxy quarantine, s")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--min-pages-per-sec', type=float, help="Exit 1 if throughput falls below this")
+    parser.add_argument('--max-p99-ms', type=float, help="Exit 1 if p99 fetch latency (HTTP exchange only) exceeds this")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    config = MockAmazonConfig(
+        search_urls=args.search_urls, pages=args.pages, products_per_page=args.products_per_page,
+        product_kb=args.product_kb, latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+        throttle_rate=args.throttle_rate, captcha_rate=args.captcha_rate
+    )
+    report = asyncio.run(run_benchmark(
+        config, concurrency=args.concurrency, listing_concurrency=args.listing_concurrency,
+        rate=args.rate, cooldown=args.cooldown, parser_executor=args.parser_executor,
+        parser_workers=args.parser_workers, write_latency_ms=args.write_latency_ms,
+        proxies=args.proxies, quarantine_base=args.quarantine_base, quarantine_max=args.quarantine_max
+    ))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>18}: {value}")
+
+    failures = []
+    if args.min_pages_per_sec is not None and report["pages_per_sec"] < args.min_pages_per_sec:
+        failures.append(f"pages/sec {report['pages_per_sec']} < {args.min_pages_per_sec}")
+    if args.max_p99_ms is not None and report["fetch_p99_ms"] > args.max_p99_ms:
+        failures.append(f"p99 fetch latency {report['fetch_p99_ms']}ms > {args.max_p99_ms}ms")
+    if failures:
+        print("Benchmark regression: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
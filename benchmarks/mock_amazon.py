@@ -0,0 +1,155 @@
+# benchmarks/mock_amazon.py
+#
+# Local aiohttp server that serves synthetic Amazon-like search and product
+# pages, with injectable latency, throttling and CAPTCHA responses.
+
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+CAPTCHA_PAGE = (
+    "<html><body><h4>Enter the characters you see below</h4>"
+    "<p>Sorry, we just need to make sure you're not a robot.</p></body></html>"
+)
+
+@dataclass
+class MockAmazonConfig:
+    """Shape of the synthetic catalogue and the faults injected into responses."""
+    search_urls: int = 2             # Distinct search result listings
+    pages: int = 5                   # Listing pages per search URL
+    products_per_page: int = 24
+    overlap: float = 0.1             # Share of cards repeating an ASIN from another search URL
+    product_kb: int = 200            # Approximate size of a product page
+    latency_ms: float = 50.0         # Mean response delay
+    latency_jitter_ms: float = 20.0
+    throttle_rate: float = 0.0       # Share of responses answered 429 or 503
+    captcha_rate: float = 0.0        # Share of responses replaced by a CAPTCHA page
+    seed: int = 7
+
+@dataclass
+class MockAmazonStats:
+    """Responses served, by kind."""
+    listing: int = 0
+    product: int = 0
+    throttled: int = 0
+    captcha: int = 0
+    not_found: int = 0
+
+class MockAmazon:
+    """The server and its deterministic catalogue; use as an async context manager."""
+
+    def __init__(self, config: Optional[MockAmazonConfig] = None):
+        self.config = config or MockAmazonConfig()
+        self.stats = MockAmazonStats()
+        self.random = random.Random(self.config.seed)
+        self.catalogue = self._build_catalogue()
+        self.base_url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    def _build_catalogue(self) -> Dict[int, List[List[str]]]:
+        """ASINs on each listing page of each search URL."""
+        c = self.config
+        catalogue: Dict[int, List[List[str]]] = {}
+        for search in range(c.search_urls):
+            pages = []
+            for page in range(c.pages):
+                asins = []
+                for slot in range(c.products_per_page):
+                    if search and self.random.random() < c.overlap:
+                        # Same product listed under an earlier search URL
+                        other = self.random.randrange(search)
+                        asins.append(f"B{other:02d}{page:03d}{slot:04d}")
+                    else:
+                        asins.append(f"B{search:02d}{page:03d}{slot:04d}")
+                pages.append(asins)
+            catalogue[search] = pages
+        return catalogue
+
+    @property
+    def search_urls(self) -> List[str]:
+        return [f"{self.base_url}/s?k=laptop&search={search}" for search in self.catalogue]
+
+    @property
+    def product_url_template(self) -> str:
+        return f"{self.base_url}/dp/{{asin}}"
+
+    @property
+    def unique_products(self) -> int:
+        return len({asin for pages in self.catalogue.values() for asins in pages for asin in asins})
+
+    async def __aenter__(self) -> 'MockAmazon':
+        app = web.Application()
+        app.router.add_get('/s', self._listing)
+        app.router.add_get('/dp/{asin}', self._product)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+        return False
+
+    async def _fault(self) -> Optional[web.Response]:
+        """Delay the response and decide whether it is replaced by a fault."""
+        c = self.config
+        delay = max(0.0, self.random.gauss(c.latency_ms, c.latency_jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < c.throttle_rate:
+            self.stats.throttled += 1
+            return web.Response(status=self.random.choice([429, 503]))
+        if roll < c.throttle_rate + c.captcha_rate:
+            self.stats.captcha += 1
+            return web.Response(text=CAPTCHA_PAGE, content_type='text/html')
+        return None
+
+    async def _listing(self, request: web.Request) -> web.Response:
+        fault = await self._fault()
+        if fault is not None:
+            return fault
+        search = int(request.query.get('search', 0))
+        page = int(request.query.get('page', 1))
+        pages = self.catalogue.get(search, [])
+        if not 1 <= page <= len(pages):
+            self.stats.not_found += 1
+            return web.Response(status=404)
+        self.stats.listing += 1
+        return web.Response(text=self.listing_html(pages[page - 1], len(pages)), content_type='text/html')
+
+    async def _product(self, request: web.Request) -> web.Response:
+        fault = await self._fault()
+        if fault is not None:
+            return fault
+        self.stats.product += 1
+        return web.Response(text=self.product_html(request.match_info['asin']), content_type='text/html')
+
+    @staticmethod
+    def listing_html(asins: List[str], last_page: int) -> str:
+        cards = "".join(
+            f'<div data-asin="{asin}" class="s-result-item"><h2><a class="a-link-normal">'
+            f'<span class="a-size-medium a-text-normal">Laptop {asin} 16GB RAM 512GB SSD</span></a></h2>'
+            f'<span class="a-icon-alt">4.2 out of 5 stars</span>'
+            f'<span class="a-price"><span class="a-price-whole">{50000 + int(asin[-4:]) * 10:,}</span></span></div>'
+            for asin in asins
+        )
+        items = "".join(f'<span class="s-pagination-item">{n}</span>' for n in (1, 2, last_page))
+        return (f"<html><body><div class='s-main-slot'>{cards}</div>"
+                f"<div class='s-pagination-strip'>{items}</div></body></html>")
+
+    def product_html(self, asin: str) -> str:
+        specs = "".join(f"<tr><th>Spec {i}</th><td>Value {asin} {i}</td></tr>" for i in range(30))
+        filler_row = f'<div class="a-section"><span class="a-text">Customer review text for {asin}.</span></div>'
+        filler = filler_row * max(0, self.config.product_kb * 1024 // len(filler_row))
+        return (f'<html><body><span id="productTitle"> Laptop {asin} 16GB RAM 512GB SSD </span>'
+                f'<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">'
+                f'₹54,990</span></span></div>'
+                f'<span id="acrCustomerReviewText">1,234 ratings</span>'
+                f'<table id="productDetails_techSpec_section_1">{specs}</table>'
+                f'<script>var data = {{}};</script>{filler}</body></html>')
@@ -0,0 +1,217 @@
+# benchmarks/mock_motor.py
+#
+# In-memory stand-in for the Motor client, covering the collection calls
+# DatabaseManager and PriceHistory make. The benchmark runs the real
+# DatabaseManager on top of it, so write buffering, compression and price
+# history are measured without a MongoDB server.
+
+import asyncio
+import itertools
+from typing import Any, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+from src.database.db_manager import DatabaseManager
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    for part in path.split('.'):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Evaluate equality, $in, $ne, $exists, $gte and $lt conditions."""
+    for key, condition in query.items():
+        value = _get(doc, key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, operand in condition.items():
+            if op == '$in':
+                ok = value in operand
+            elif op == '$ne':
+                ok = value != operand
+            elif op == '$exists':
+                ok = (value is not None) == bool(operand)
+            elif op == '$gte':
+                ok = value is not None and value >= operand
+            elif op == '$lt':
+                ok = value is not None and value < operand
+            else:
+                raise NotImplementedError(f"Query operator {op} is not mocked")
+            if not ok:
+                return False
+    return True
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply an inclusion projection; _id is kept unless excluded."""
+    if not projection:
+        return dict(doc)
+    keep = [key for key, value in projection.items() if value and key != '_id']
+    result = {key: doc[key] for key in keep if key in doc}
+    if projection.get('_id', 1) and '_id' in doc:
+        result['_id'] = doc['_id']
+    return result
+
+class _Result:
+    def __init__(self, **fields):
+        self.acknowledged = True
+        self.__dict__.update(fields)
+
+class MockCursor:
+    """Async iterable over a snapshot of matching documents."""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def sort(self, key, direction: int = 1) -> 'MockCursor':
+        self.docs.sort(key=lambda doc: _get(doc, key), reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.docs[:length] if length else list(self.docs)
+
+class MockCollection:
+    """Documents in a dict keyed by _id, with a URL lookup and optional write latency."""
+
+    def __init__(self, name: str, write_latency: float = 0.0):
+        self.name = name
+        self.write_latency = write_latency
+        self.docs: Dict[Any, Dict[str, Any]] = {}
+        self._by_url: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self.write_calls = 0
+
+    async def _write_delay(self):
+        self.write_calls += 1
+        if self.write_latency:
+            await asyncio.sleep(self.write_latency)
+
+    def _matching(self, query: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        if set(query) == {'url'} and not isinstance(query['url'], dict):
+            doc_id = self._by_url.get(query['url'])
+            return iter([self.docs[doc_id]] if doc_id is not None else [])
+        if set(query) == {'_id'} and not isinstance(query['_id'], dict):
+            doc = self.docs.get(query['_id'])
+            return iter([doc] if doc is not None else [])
+        return (doc for doc in self.docs.values() if matches(doc, query))
+
+    def _store(self, doc: Dict[str, Any]):
+        doc.setdefault('_id', next(self._ids))
+        self.docs[doc['_id']] = doc
+        if 'url' in doc:
+            self._by_url[doc['url']] = doc['_id']
+
+    async def create_index(self, keys, **kwargs):
+        return str(keys)
+
+    async def bulk_write(self, operations, ordered: bool = True) -> _Result:
+        await self._write_delay()
+        matched = upserted = 0
+        for op in operations:
+            query, update = op._filter, op._doc
+            doc = next(self._matching(query), None)
+            if doc is None:
+                if not op._upsert:
+                    continue
+                doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+                upserted += 1
+            else:
+                matched += 1
+            doc.update(update.get('$set', {}))
+            for key in update.get('$unset', {}):
+                doc.pop(key, None)
+            self._store(doc)
+        return _Result(matched_count=matched, modified_count=matched, upserted_count=upserted)
+
+    async def insert_many(self, documents, ordered: bool = True) -> _Result:
+        await self._write_delay()
+        for doc in documents:
+            self._store(dict(doc))
+        return _Result(inserted_ids=[doc.get('_id') for doc in documents])
+
+    async def replace_one(self, query, replacement, upsert: bool = False) -> _Result:
+        await self._write_delay()
+        doc = next(self._matching(query), None)
+        if doc is None and not upsert:
+            return _Result(matched_count=0)
+        new = dict(replacement)
+        new['_id'] = doc['_id'] if doc is not None else query.get('_id', next(self._ids))
+        self._store(new)
+        return _Result(matched_count=int(doc is not None))
+
+    async def find_one(self, query=None, projection=None, sort=None) -> Optional[Dict[str, Any]]:
+        docs = list(self._matching(query or {}))
+        for key, direction in reversed(sort or []):
+            docs.sort(key=lambda doc: _get(doc, key), reverse=direction < 0)
+        return project(docs[0], projection) if docs else None
+
+    def find(self, query=None, projection=None, **kwargs) -> MockCursor:
+        return MockCursor([project(doc, projection) for doc in self._matching(query or {})])
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> MockCursor:
+        """Run $match, $sort and $group-with-$first stages, the ones the crawl path uses."""
+        docs = list(self.docs.values())
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == '$match':
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == '$sort':
+                for key, direction in reversed(list(spec.items())):
+                    docs.sort(key=lambda doc: _get(doc, key), reverse=direction < 0)
+            elif name == '$group':
+                groups: Dict[Any, Dict[str, Any]] = {}
+                for doc in docs:
+                    group_id = _get(doc, spec['_id'].lstrip('$'))
+                    if group_id in groups:
+                        continue
+                    groups[group_id] = {'_id': group_id, **{
+                        field: _get(doc, accumulator['$first'].lstrip('$'))
+                        for field, accumulator in spec.items() if field != '_id'
+                    }}
+                docs = list(groups.values())
+            else:
+                raise NotImplementedError(f"Pipeline stage {name} is not mocked")
+        return MockCursor(docs)
+
+class MockDatabase:
+    def __init__(self, write_latency: float = 0.0):
+        self.write_latency = write_latency
+        self.collections: Dict[str, MockCollection] = {}
+
+    def __getitem__(self, name: str) -> MockCollection:
+        if name not in self.collections:
+            self.collections[name] = MockCollection(name, self.write_latency)
+        return self.collections[name]
+
+    async def create_collection(self, name: str, **kwargs) -> MockCollection:
+        return self[name]
+
+class MockClient:
+    """Stands in for AsyncIOMotorClient; every database shares the write latency."""
+
+    def __init__(self, write_latency: float = 0.0):
+        self.write_latency = write_latency
+        self.databases: Dict[str, MockDatabase] = {}
+
+    def __getitem__(self, name: str) -> MockDatabase:
+        if name not in self.databases:
+            self.databases[name] = MockDatabase(self.write_latency)
+        return self.databases[name]
+
+    def close(self):
+        pass
+
+def mock_database_manager(write_latency_ms: float = 0.0, **kwargs) -> DatabaseManager:
+    """A real DatabaseManager whose Motor client is an in-memory MockClient."""
+    client = MockClient(write_latency_ms / 1000)
+    with patch('src.database.db_manager.AsyncIOMotorClient', return_value=client):
+        return DatabaseManager(**kwargs)
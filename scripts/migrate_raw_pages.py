@@ -0,0 +1,41 @@
+# scripts/migrate_raw_pages.py
+
+import argparse
+import asyncio
+import logging
+import sys
+import os
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+from src.utils.config import MONGODB_URI, LOG_FORMAT
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compress html_content of stored raw pages")
+    parser.add_argument('--codec', choices=['zlib', 'zstd'], default='zlib', help="Target codec")
+    parser.add_argument('--level', type=int, default=None, help="Compression level (codec default if omitted)")
+    parser.add_argument('--zstd-dict', default=None, help="Trained zstd dictionary file")
+    parser.add_argument('--batch-size', type=int, default=100, help="Documents per bulk write")
+    return parser.parse_args()
+
+async def main(args):
+    """Rewrite every raw page that is not yet stored with the target codec."""
+    logger = logging.getLogger('migrate')
+    db_manager = DatabaseManager(
+        MONGODB_URI,
+        compression=args.codec,
+        compression_level=args.level,
+        zstd_dict_path=args.zstd_dict
+    )
+    try:
+        migrated = await db_manager.migrate_html_compression(batch_size=args.batch_size)
+        logger.info(f"Migrated {migrated} documents to {args.codec}")
+    finally:
+        await db_manager.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,46 @@
+# scripts/price_history.py
+
+import argparse
+import asyncio
+import logging
+import sys
+import os
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+from src.utils.config import MONGODB_URI, LOG_FORMAT
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Query the recorded price history")
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--asin', help="Print every recorded point for this ASIN")
+    query.add_argument('--drops', action='store_true', help="Print the biggest price drops")
+    parser.add_argument('--hours', type=float, default=24, help="Window for --drops (default: 24)")
+    parser.add_argument('--limit', type=int, default=20, help="Rows printed by --drops (default: 20)")
+    return parser.parse_args()
+
+def rupees(paise):
+    return "-" if paise is None else f"₹{paise / 100:,.2f}"
+
+async def main(args):
+    """Print the history of one ASIN or the biggest recent drops."""
+    db_manager = DatabaseManager(MONGODB_URI)
+    history = db_manager.price_history
+    try:
+        if args.asin:
+            for point in await history.history(args.asin):
+                print(f"{point['ts']:%Y-%m-%d %H:%M}  {rupees(point['price']):>14}  "
+                      f"rating={point['rating']}  reviews={point['reviews']}")
+        else:
+            for drop in await history.biggest_drops(hours=args.hours, limit=args.limit):
+                print(f"{drop['asin']}  {rupees(drop['before']):>14} -> {rupees(drop['price']):>14}  "
+                      f"-{rupees(drop['drop'])} ({drop['drop_pct']}%)")
+    finally:
+        await db_manager.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    asyncio.run(main(parse_args()))
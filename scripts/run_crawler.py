@@ -1,17 +1,26 @@
 # scripts/run_crawler.py
 
+import argparse
 import asyncio
 import logging
 import sys
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.crawler.http_cache import HttpCache, RECORD, REPLAY
+from src.crawler.rate_limiter import AdaptiveRateLimiter
 from src.crawler.raw_crawler import RawCrawler
 from src.database.db_manager import DatabaseManager
-from src.utils.config import MONGODB_URI, LOG_FORMAT, LOG_FILE
+from src.database.work_queue import WorkQueue
+from src.utils.config import (
+    MONGODB_URI, LOG_FORMAT, LOG_FILE, HTTP_CACHE_DIR, PARSER_EXECUTOR, METRICS_PORT, METRICS_SNAPSHOT_PATH, METRICS_SNAPSHOT_INTERVAL
+)
+from src.utils.metrics import Metrics, serve_metrics, write_snapshots
+from src.utils.profiling import CrawlProfiler
+from src.utils.settings import CrawlSettings, MODES, INCREMENTAL, REFRESH, load_settings
 
 def setup_logging():
     """Setup logging configuration."""
@@ -32,7 +41,110 @@ def setup_logging():
         ]
     )
 
-async def main():
+def read_urls(path: str):
+    """Search URLs from a file, one per line; blank lines and # comments are skipped."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def parse_args():
+    """Parse command line options and resolve the crawl settings.
+
+    Run settings fall back to CRAWLER_* environment variables, then the
+    --config file, then config.py.
+    """
+    parser = argparse.ArgumentParser(description="Crawl Amazon laptop pages into MongoDB")
+    parser.add_argument('--config', help="TOML file with crawl settings (default: $CRAWLER_CONFIG)")
+
+    crawl = parser.add_argument_group('crawl')
+    crawl.add_argument('--url', action='append', dest='urls', metavar='URL',
+                       help="Search URL to crawl; repeat for several (default: config.LAPTOP_URLS)")
+    crawl.add_argument('--urls-file', help="File with one search URL per line")
+    crawl.add_argument('--mode', choices=MODES,
+                       help="full fetches every product page; incremental skips pages saved within "
+                            "--max-age-hours; refresh updates known products from listing cards")
+    crawl.add_argument('--max-age-hours', type=float, help="Freshness window for incremental mode")
+
+    budget = parser.add_argument_group('budget')
+    budget.add_argument('--max-pages', type=int, help="Listing pages read per search URL")
+    budget.add_argument('--max-requests', type=int,
+                        help="Stop after this many listing and product pages; the rest is left to --resume")
+    budget.add_argument('--max-seconds', type=float,
+                        help="Stop starting new pages after this many seconds; the rest is left to --resume")
+
+    throughput = parser.add_argument_group('throughput')
+    throughput.add_argument('--concurrency', type=int, help="Product-page workers")
+    throughput.add_argument('--listing-concurrency', type=int, help="Listing pages fetched at once")
+    throughput.add_argument('--queue-size', type=int, help="Product URLs buffered between the stages")
+    throughput.add_argument('--rate', type=float, help="Starting requests per second per host and proxy")
+    throughput.add_argument('--rate-min', type=float, help="Rate floor after throttling")
+    throughput.add_argument('--rate-max', type=float, help="Rate ceiling after sustained success")
+    throughput.add_argument('--burst', type=int, help="Token bucket capacity")
+    throughput.add_argument('--cooldown', type=float, help="Seconds to hold a host after 429/503 or a CAPTCHA")
+    throughput.add_argument('--delay', type=float,
+                            help="Minimum seconds between requests to one host through one proxy")
+
+    parser.add_argument('--crawl-id',
+                        help="Id the crawl checkpoint is saved under (default: a new timestamped id)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue the crawl given by --crawl-id, or the most recently checkpointed one")
+    parser.add_argument('--distributed', action='store_true',
+                        help="Share the crawl given by --crawl-id with other processes through the MongoDB work queue")
+    parser.add_argument('--http-cache', choices=[RECORD, REPLAY],
+                        help="Record every response to the HTTP cache, or replay them with no network")
+    parser.add_argument('--http-cache-dir', default=HTTP_CACHE_DIR,
+                        help=f"HTTP cache directory (default: {HTTP_CACHE_DIR})")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help="Serve Prometheus metrics on this port at /metrics")
+    parser.add_argument('--metrics-json', default=METRICS_SNAPSHOT_PATH,
+                        help="Write a JSON metrics snapshot to this file periodically and at exit")
+    parser.add_argument('--metrics-interval', type=float, default=METRICS_SNAPSHOT_INTERVAL,
+                        help="Seconds between JSON metrics snapshots")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="Profile a bounded run and write pstats, collapsed stacks and memory snapshots to DIR")
+    parser.add_argument('--profile-pages', type=int, default=2,
+                        help="Listing pages per search URL in a profiled run (default: 2)")
+    args = parser.parse_args()
+    if args.distributed and not args.crawl_id:
+        parser.error("--distributed needs a --crawl-id shared by every node")
+
+    overrides = {name: getattr(args, name) for name in (
+        'mode', 'max_age_hours', 'max_pages', 'max_requests', 'max_seconds', 'concurrency',
+        'listing_concurrency', 'queue_size', 'rate', 'rate_min', 'rate_max', 'burst', 'cooldown', 'delay'
+    )}
+    try:
+        urls = (args.urls or []) + (read_urls(args.urls_file) if args.urls_file else [])
+        overrides['urls'] = urls or None
+        settings = load_settings(args.config, overrides=overrides)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    return args, settings
+
+def build_crawler(db_manager: DatabaseManager, settings: CrawlSettings, **kwargs) -> RawCrawler:
+    """Crawler configured from the resolved settings."""
+    ceiling = settings.rate_ceiling
+    rate_limiter = AdaptiveRateLimiter(
+        initial_rate=min(settings.rate, ceiling),
+        min_rate=settings.rate_min,
+        max_rate=ceiling,
+        burst_limit=settings.burst,
+        cooldown_time=settings.cooldown
+    )
+    return RawCrawler(
+        db_manager,
+        urls=settings.urls,
+        concurrency=settings.concurrency,
+        queue_size=settings.queue_size,
+        listing_concurrency=settings.listing_concurrency,
+        rate_limiter=rate_limiter,
+        incremental=settings.mode == INCREMENTAL,
+        listing_refresh=settings.mode == REFRESH,
+        max_age=timedelta(hours=settings.max_age_hours),
+        max_requests=settings.max_requests,
+        max_seconds=settings.max_seconds,
+        **kwargs
+    )
+
+async def main(args, settings: CrawlSettings):
     """Main function to run the crawler."""
     start_time = datetime.now()
     logger = logging.getLogger('main')
@@ -43,9 +155,43 @@ async def main():
         # Initialize database manager
         db_manager = DatabaseManager(MONGODB_URI)
         
+        crawl_id = args.crawl_id
+        if args.resume and not crawl_id:
+            crawl_id = await db_manager.latest_checkpoint_id()
+            if crawl_id is None:
+                logger.warning("No checkpoint to resume, starting a new crawl")
+        if not crawl_id:
+            crawl_id = datetime.now().strftime('crawl_%Y%m%d_%H%M%S')
+        logger.info(f"Crawl id: {crawl_id} (resume with --resume --crawl-id {crawl_id})")
+
         # Initialize and run crawler
-        crawler = RawCrawler(db_manager)
-        await crawler.run()
+        http_cache = HttpCache(args.http_cache_dir, args.http_cache) if args.http_cache else None
+        metrics = Metrics()
+        crawler = build_crawler(db_manager, settings, crawl_id=crawl_id, resume=args.resume,
+                                http_cache=http_cache, metrics=metrics,
+                                # The profiler only sees this process, so parse on threads while profiling
+                                parser_executor='thread' if args.profile else PARSER_EXECUTOR)
+        logger.info(f"Crawling {len(settings.urls)} search URLs in {settings.mode} mode, up to "
+                    f"{settings.max_pages} pages each, {settings.concurrency} workers, "
+                    f"at most {settings.rate_ceiling:g} requests/s per host")
+        metrics_server = await serve_metrics(metrics, port=args.metrics_port) if args.metrics_port else None
+        snapshots = (asyncio.create_task(write_snapshots(metrics, args.metrics_json, args.metrics_interval))
+                     if args.metrics_json else None)
+        try:
+            if args.profile:
+                with CrawlProfiler(args.profile):
+                    await crawler.run(max_pages=args.profile_pages)
+            elif args.distributed:
+                await crawler.run_distributed(WorkQueue(db_manager.task_collection, crawl_id),
+                                              max_pages=settings.max_pages)
+            else:
+                await crawler.run(max_pages=settings.max_pages)
+        finally:
+            if snapshots is not None:
+                snapshots.cancel()
+                await asyncio.gather(snapshots, return_exceptions=True)
+            if metrics_server is not None:
+                await metrics_server.cleanup()
         
         # Log completion statistics
         end_time = datetime.now()
@@ -62,12 +208,14 @@ async def main():
         logger.info("Crawler process finished")
 
 if __name__ == "__main__":
+    args, settings = parse_args()
+
     # Setup logging
     setup_logging()
     
     # Run the crawler
     try:
-        asyncio.run(main())
+        asyncio.run(main(args, settings))
     except KeyboardInterrupt:
         logging.info("Crawler stopped by user")
     except Exception as e:
@@ -0,0 +1,41 @@
+# src/crawler/budget.py
+
+import time
+from typing import Callable, Optional
+
+class CrawlBudget:
+    """Page-fetch and wall-clock limits for one crawl.
+
+    Every listing or product page takes one unit before it is fetched (its
+    retries are not charged again). Once a limit is reached the budget stays
+    exhausted, so the crawler stops starting pages while the ones in flight
+    finish and are checkpointed normally.
+    """
+
+    def __init__(self, max_requests: Optional[int] = None, max_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.used = 0
+        self.reason: Optional[str] = None
+        self.started = clock()
+
+    def start(self):
+        """Reset the counters at the start of a run."""
+        self.used = 0
+        self.reason = None
+        self.started = self.clock()
+
+    def exceeded(self) -> Optional[str]:
+        """Why the budget is used up, or None while pages may still be started."""
+        if self.reason is None:
+            if self.max_requests is not None and self.used >= self.max_requests:
+                self.reason = f"request budget of {self.max_requests} pages used"
+            elif self.max_seconds is not None and self.clock() - self.started >= self.max_seconds:
+                self.reason = f"time budget of {self.max_seconds:g}s used"
+        return self.reason
+
+    def charge(self):
+        """Count one page fetch against the request limit."""
+        self.used += 1
@@ -0,0 +1,96 @@
+# src/crawler/checkpoint.py
+
+from typing import Any, Dict, List, Optional
+
+class CrawlFrontier:
+    """Progress of one crawl: listing pages read and product pages fetched.
+
+    Kept in memory for the whole run, so a retried attempt picks up where the
+    failed one stopped, and saved as a checkpoint document so a new process
+    can resume it. Products are keyed by ASIN, which is safe as a MongoDB key.
+    """
+
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+        self.listings: Dict[str, Dict[str, Any]] = {}
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+
+    def listing(self, base_url: str) -> Dict[str, Any]:
+        """Progress of a search URL: last page, pages read, and whether it is complete."""
+        if base_url not in self.listings:
+            self.listings[base_url] = {"last_page": None, "done": set(), "complete": False}
+        return self.listings[base_url]
+
+    def page_done(self, base_url: str, page: int, last_page: Optional[int] = None):
+        """Record a listing page whose products have all been queued."""
+        progress = self.listing(base_url)
+        progress["done"].add(page)
+        if last_page is not None:
+            progress["last_page"] = last_page
+        self.dirty = True
+
+    def listing_complete(self, base_url: str):
+        """Mark a search URL as fully paginated."""
+        self.listing(base_url)["complete"] = True
+        self.dirty = True
+
+    def product_queued(self, asin: str):
+        """Record a product handed to the workers."""
+        self.products.setdefault(asin, {"status": self.PENDING, "attempts": 0})
+        self.dirty = True
+
+    def product_started(self, asin: str):
+        """Count a fetch attempt before it runs, so a crash mid-fetch still counts."""
+        entry = self.products.setdefault(asin, {"status": self.PENDING, "attempts": 0})
+        entry["attempts"] += 1
+        self.dirty = True
+
+    def product_finished(self, asin: str, success: bool):
+        """Record the outcome of a product fetch."""
+        entry = self.products.setdefault(asin, {"status": self.PENDING, "attempts": 1})
+        entry["status"] = self.DONE if success else self.FAILED
+        self.dirty = True
+
+    def retry_products(self) -> List[str]:
+        """ASINs queued but not fetched, or failed with attempts left."""
+        return [
+            asin for asin, entry in self.products.items()
+            if entry["status"] == self.PENDING
+            or (entry["status"] == self.FAILED and entry["attempts"] < self.max_attempts)
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of products per status."""
+        counts = {self.PENDING: 0, self.DONE: 0, self.FAILED: 0}
+        for entry in self.products.values():
+            counts[entry["status"]] += 1
+        return counts
+
+    def to_document(self) -> Dict[str, Any]:
+        """Serialize for storage in MongoDB; URLs contain dots, so listings are a list."""
+        self.dirty = False
+        return {
+            "listings": [
+                {"url": url, "last_page": p["last_page"], "done": sorted(p["done"]), "complete": p["complete"]}
+                for url, p in self.listings.items()
+            ],
+            "products": {asin: dict(entry) for asin, entry in self.products.items()}
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any], max_attempts: int = 3) -> 'CrawlFrontier':
+        """Rebuild a frontier saved with to_document."""
+        frontier = cls(max_attempts=max_attempts)
+        for item in doc.get("listings", []):
+            frontier.listings[item["url"]] = {
+                "last_page": item.get("last_page"),
+                "done": set(item.get("done", [])),
+                "complete": item.get("complete", False)
+            }
+        frontier.products = {asin: dict(entry) for asin, entry in doc.get("products", {}).items()}
+        return frontier
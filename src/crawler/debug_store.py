@@ -0,0 +1,102 @@
+# src/crawler/debug_store.py
+
+import asyncio
+import gzip
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Optional, Set, Tuple
+
+from ..utils.config import (
+    DEBUG_HTML_ENABLED, DEBUG_HTML_DIR, DEBUG_HTML_SAMPLE_RATE, DEBUG_HTML_MAX_BYTES, DEBUG_HTML_MAX_AGE_DAYS
+)
+
+class DebugArtifactStore:
+    """Sampled, compressed, size- and age-capped store for debug HTML.
+
+    Writes happen on the default thread pool so the event loop never blocks
+    on disk. Failures are always kept; successes are kept at
+    ``success_sample_rate``. When the directory grows past ``max_total_bytes``
+    or files pass ``max_age_days``, the oldest files are evicted.
+    """
+
+    def __init__(self, directory: str = DEBUG_HTML_DIR,
+                 enabled: bool = DEBUG_HTML_ENABLED,
+                 success_sample_rate: float = DEBUG_HTML_SAMPLE_RATE,
+                 max_total_bytes: int = DEBUG_HTML_MAX_BYTES,
+                 max_age_days: float = DEBUG_HTML_MAX_AGE_DAYS):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.success_sample_rate = success_sample_rate
+        self.max_total_bytes = max_total_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self.logger = logging.getLogger('DebugArtifactStore')
+
+        self._lock = threading.Lock()
+        self._files: Optional[Deque[Tuple[float, Path, int]]] = None  # (mtime, path, size), oldest first
+        self._total_bytes = 0
+        self._pending: Set[asyncio.Future] = set()
+
+    def save(self, content: str, name: str, failure: bool = False):
+        """Schedule an artifact write; returns immediately."""
+        if not self.enabled:
+            return
+        if not failure and random.random() >= self.success_sample_rate:
+            return
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        prefix = 'fail' if failure else 'ok'
+        filename = f"{prefix}_{name}_{timestamp}.html.gz"
+        future = asyncio.get_running_loop().run_in_executor(None, self._write, content, filename)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    def _load_index(self):
+        """Scan existing artifacts once so the caps cover files from earlier runs."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.directory.glob('*.html.gz'):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        self._files = deque(entries)
+        self._total_bytes = sum(size for _, _, size in entries)
+
+    def _write(self, content: str, filename: str):
+        """Compress and write one artifact, then evict (runs on a worker thread)."""
+        try:
+            data = gzip.compress(content.encode('utf-8'), compresslevel=6)
+            with self._lock:
+                if self._files is None:
+                    self._load_index()
+                path = self.directory / filename
+                tmp_path = path.with_suffix('.tmp')
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+                self._files.append((time.time(), path, len(data)))
+                self._total_bytes += len(data)
+                self._evict()
+            self.logger.debug(f"Saved debug HTML to {path}")
+        except Exception as e:
+            self.logger.error(f"Failed to save debug HTML: {str(e)}")
+
+    def _evict(self):
+        """Drop expired files, then the oldest ones until under the size cap."""
+        cutoff = time.time() - self.max_age_seconds
+        while self._files and (self._files[0][0] < cutoff or self._total_bytes > self.max_total_bytes):
+            _, path, size = self._files.popleft()
+            self._total_bytes -= size
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def close(self):
+        """Wait for scheduled writes to finish."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
@@ -0,0 +1,83 @@
+# src/crawler/dedup.py
+
+import hashlib
+import math
+from typing import Any, Dict, Iterator, Optional, Set
+
+class BloomFilter:
+    """Compact probabilistic set used to persist seen ASINs between processes."""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001, bits: Optional[bytes] = None,
+                 num_hashes: Optional[int] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes or max(1, round(num_bits / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((num_bits + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        """Bit positions for an item, using double hashing over one digest."""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> bool:
+        """Add an item; returns True if it was not already (probably) present."""
+        added = False
+        for pos in self._positions(item):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                added = True
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def to_document(self) -> Dict[str, Any]:
+        """Serialize for storage in MongoDB."""
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "num_hashes": self.num_hashes,
+            "bits": bytes(self.bits)
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> 'BloomFilter':
+        """Rebuild a filter saved with to_document."""
+        return cls(capacity=doc["capacity"], error_rate=doc["error_rate"],
+                   bits=doc["bits"], num_hashes=doc["num_hashes"])
+
+class AsinDeduplicator:
+    """Run-scoped set of ASINs already queued for a product fetch.
+
+    An optional Bloom filter carries the seen ASINs of an earlier process
+    of the same crawl, so a restarted crawl does not fetch them again. A
+    false positive there skips one product, at the filter's error rate.
+    """
+
+    def __init__(self, persistent: Optional[BloomFilter] = None):
+        self.seen: Set[str] = set()
+        self.persistent = persistent
+        self.skipped = 0
+        self.dirty = False  # New ASINs since the filter was last saved
+
+    def add(self, asin: str) -> bool:
+        """Record an ASIN; returns True only the first time it is seen in this crawl."""
+        if asin in self.seen:
+            self.skipped += 1
+            return False
+        self.seen.add(asin)
+        if self.persistent is not None:
+            if not self.persistent.add(asin):
+                self.skipped += 1
+                return False
+            self.dirty = True
+        return True
+
+    def __len__(self) -> int:
+        return len(self.seen)
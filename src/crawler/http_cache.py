@@ -0,0 +1,128 @@
+# src/crawler/http_cache.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from ..utils.config import HTTP_CACHE_DIR
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+class HttpCache:
+    """Record-and-replay store for crawler responses.
+
+    Bodies are content-addressed: each distinct body is appended once to
+    ``responses.dat`` under its blake2b digest, and ``index.jsonl`` maps every
+    URL to its status and body location. In replay mode the data file is
+    memory-mapped, so a lookup is a dict hit plus a slice of the page cache.
+    The last record for a URL wins.
+    """
+
+    DATA_FILE = 'responses.dat'
+    INDEX_FILE = 'index.jsonl'
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, mode: str = REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown HTTP cache mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.logger = logging.getLogger('HttpCache')
+        self.entries: Dict[str, Tuple[int, Optional[str]]] = {}  # url -> (status, digest)
+        self.blobs: Dict[str, Tuple[int, int]] = {}              # digest -> (offset, length)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._data_file = None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+        if mode == REPLAY:
+            self.logger.info(f"Replaying {len(self.entries)} recorded responses from {self.directory}")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _load_index(self):
+        """Read the index; a torn last line from an interrupted recording is skipped."""
+        index_path = self.directory / self.INDEX_FILE
+        if not index_path.exists():
+            return
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                digest = item.get("digest")
+                self.entries[item["url"]] = (item["status"], digest)
+                if digest:
+                    self.blobs[digest] = (item["offset"], item["length"])
+
+    def _open_map(self) -> Optional[mmap.mmap]:
+        """Memory-map the data file for reading, once."""
+        if self._map is None:
+            data_path = self.directory / self.DATA_FILE
+            if data_path.exists() and data_path.stat().st_size:
+                with open(data_path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def replay(self, url: str) -> Tuple[int, Optional[str]]:
+        """Recorded status and body for a URL; a URL never recorded replays as 404."""
+        entry = self.entries.get(url)
+        if entry is None:
+            self.misses += 1
+            self.logger.debug(f"No recorded response for {url}")
+            return 404, None
+        self.hits += 1
+        status, digest = entry
+        data = self._open_map() if digest is not None else None
+        if data is None:
+            return status, None
+        offset, length = self.blobs[digest]
+        return status, data[offset:offset + length].decode('utf-8')
+
+    async def record(self, url: str, status: int, content: Optional[str]):
+        """Store a response; the disk write runs on a worker thread."""
+        await asyncio.to_thread(self._append, url, status, content)
+
+    def _append(self, url: str, status: int, content: Optional[str]):
+        """Append the body (unless already stored) and an index line."""
+        with self._lock:
+            item = {"url": url, "status": status, "digest": None, "recorded_at": datetime.utcnow().isoformat()}
+            if content is not None:
+                body = content.encode('utf-8')
+                digest = hashlib.blake2b(body, digest_size=20).hexdigest()
+                if digest not in self.blobs:
+                    if self._data_file is None:
+                        self._data_file = open(self.directory / self.DATA_FILE, 'ab')
+                    self._data_file.seek(0, os.SEEK_END)
+                    offset = self._data_file.tell()
+                    self._data_file.write(body)
+                    self._data_file.flush()
+                    self.blobs[digest] = (offset, len(body))
+                offset, length = self.blobs[digest]
+                item.update(digest=digest, offset=offset, length=length)
+            # The body is flushed before its index line, so the index never points past the data
+            with open(self.directory / self.INDEX_FILE, 'a', encoding='utf-8') as index:
+                index.write(json.dumps(item) + "\n")
+            self.entries[url] = (status, item["digest"])
+
+    def close(self):
+        """Release the data file and memory map."""
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
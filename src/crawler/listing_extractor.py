@@ -0,0 +1,162 @@
+# src/crawler/listing_extractor.py
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import lxml.html
+from lxml import etree
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one CSS class, like the CSS selector .name does."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+# Card container layouts, mirroring the CSS selectors the crawler used to try in turn
+CONTAINER_VARIANTS = [
+    etree.XPath('//div[@data-asin!=""]'),
+    etree.XPath(f'//div[{_has_class("s-result-item")}][@data-asin!=""]'),
+    etree.XPath(f'//div[{_has_class("sg-col-inner")}]//div[@data-asin!=""]'),
+    etree.XPath(f'//*[{_has_class("s-main-slot")}]//div[@data-asin!=""]'),
+]
+
+# Card title layouts: h2 a.a-text-normal, h2 span.a-text-normal, .a-size-medium.a-text-normal,
+# .a-size-base-plus.a-text-normal, h2 a span
+TITLE_VARIANTS = [
+    etree.XPath(f'(.//h2//a[{_has_class("a-text-normal")}])[1]'),
+    etree.XPath(f'(.//h2//span[{_has_class("a-text-normal")}])[1]'),
+    etree.XPath(f'(.//*[{_has_class("a-size-medium")} and {_has_class("a-text-normal")}])[1]'),
+    etree.XPath(f'(.//*[{_has_class("a-size-base-plus")} and {_has_class("a-text-normal")}])[1]'),
+    etree.XPath('(.//h2//a//span)[1]'),
+]
+
+_PRICE = etree.XPath(f'(.//*[{_has_class("a-price-whole")}])[1]')
+_RATING = etree.XPath(f'(.//*[{_has_class("a-icon-alt")}])[1]')
+_REVIEWS = etree.XPath(f'(.//*[{_has_class("s-underline-text")}])[1]')
+_PAGINATION = etree.XPath(
+    f'//*[{_has_class("s-pagination-strip")}]//*[{_has_class("s-pagination-item")}]'
+    f' | //*[{_has_class("a-pagination")}]//li'
+)
+_RESULT_INFO = etree.XPath(
+    f'(//*[@data-component-type="s-result-info-bar"]//h1 | //*[{_has_class("s-desktop-toolbar")}]//h1)[1]'
+)
+# Text as BeautifulSoup's .text returns it: no script/style/template strings
+_TEXT = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+# Result count in the toolbar, e.g. "1-24 of over 2,000 results for"
+RESULT_COUNT_PATTERN = re.compile(r'(\d[\d,]*)\s*[-–]\s*(\d[\d,]*)\s+of\s+(?:over\s+)?(\d[\d,]*)\s+results')
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+@dataclass
+class ListingCard:
+    """Product card data read from a search results page."""
+    asin: str
+    title: str
+    price: Optional[str] = None
+    rating: Optional[str] = None
+    num_reviews: Optional[str] = None
+
+def _text(element) -> str:
+    return ''.join(_TEXT(element)).strip()
+
+def _first_text(xpath, node) -> Optional[str]:
+    found = xpath(node)
+    return _text(found[0]) if found else None
+
+class ListingExtractor:
+    """Single-pass listing page extractor with a precompiled combo-deal matcher.
+
+    The container and title layouts that matched last are tried first on
+    the next page, so a stable page layout costs one XPath per lookup
+    instead of a walk through every variant.
+    """
+
+    def __init__(self, combo_keywords: Sequence[str]):
+        # Longest first so overlapping keywords cannot shadow each other; a hit anywhere is a combo
+        alternatives = sorted({k.lower() for k in combo_keywords}, key=len, reverse=True)
+        self.combo_pattern = re.compile('|'.join(re.escape(k) for k in alternatives)) if alternatives else None
+        self.container_variant = 0
+        self.title_variant = 0
+
+    def is_combo(self, title: str) -> bool:
+        """True when a lowercased title contains any combo keyword."""
+        return bool(self.combo_pattern and self.combo_pattern.search(title))
+
+    def _containers(self, root) -> list:
+        """Card elements using the remembered layout first, then the others in order."""
+        order = [self.container_variant] + [i for i in range(len(CONTAINER_VARIANTS)) if i != self.container_variant]
+        for index in order:
+            cards = CONTAINER_VARIANTS[index](root)
+            if cards:
+                self.container_variant = index
+                return cards
+        return []
+
+    def _title(self, card) -> Optional[str]:
+        """Card title using the remembered layout first, then the others in order."""
+        found = TITLE_VARIANTS[self.title_variant](card)
+        if found:
+            return _text(found[0])
+        for index, variant in enumerate(TITLE_VARIANTS):
+            if index == self.title_variant:
+                continue
+            found = variant(card)
+            if found:
+                self.title_variant = index
+                return _text(found[0])
+        return None
+
+    @staticmethod
+    def last_page(root) -> Optional[int]:
+        """Last page number from the pagination control, or from the result count."""
+        # The pagination strip lists the first pages and the last one as numbered items
+        page_numbers = [int(text) for text in (_text(item) for item in _PAGINATION(root)) if text.isdigit()]
+        if page_numbers:
+            return max(page_numbers)
+
+        # Fall back to "1-24 of over 2,000 results"
+        info = _first_text(_RESULT_INFO, root)
+        if info:
+            match = RESULT_COUNT_PATTERN.search(info)
+            if match:
+                first, last, total = (int(group.replace(',', '')) for group in match.groups())
+                per_page = last - first + 1
+                if per_page > 0:
+                    return -(-total // per_page)
+        return None
+
+    def extract(self, content: str) -> Tuple[List[ListingCard], Optional[int], bool]:
+        """Parse a listing page into non-combo cards, the last page number and whether any cards were found."""
+        try:
+            root = lxml.html.document_fromstring(content.encode('utf-8'), parser=_HTML_PARSER)
+        except etree.ParserError:
+            # Whitespace- or comment-only body: a page without cards, not a crawl error
+            return [], None, False
+        last_page = self.last_page(root)
+        containers = self._containers(root)
+        if not containers:
+            return [], last_page, False
+
+        cards = []
+        for container in containers:
+            try:
+                asin = container.get('data-asin')
+                if not asin:
+                    continue
+                title = self._title(container)
+                if not title:
+                    continue
+                # Skip combo deals
+                if self.is_combo(title.lower()):
+                    continue
+                cards.append(ListingCard(
+                    asin=asin,
+                    title=title,
+                    price=_first_text(_PRICE, container),
+                    rating=_first_text(_RATING, container),
+                    num_reviews=_first_text(_REVIEWS, container)
+                ))
+            except Exception:
+                # One malformed card should not lose the rest of the page
+                continue
+        return cards, last_page, True
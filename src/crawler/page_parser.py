@@ -0,0 +1,86 @@
+# src/crawler/page_parser.py
+#
+# CPU-bound page parsing for RawCrawler. Everything here is a plain module-level
+# function of its arguments, so the crawler can run it on a thread or process pool
+# and keep its event loop for I/O.
+
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup
+
+from .listing_extractor import ListingCard, ListingExtractor
+
+# Page parts whose text decides whether a product page changed
+FINGERPRINT_SELECTORS = [
+    '#productTitle',
+    '#corePriceDisplay_desktop_feature_div, #corePrice_feature_div, #priceblock_ourprice, #priceblock_dealprice',
+    '#productDetails_techSpec_section_1',
+]
+
+# Extractors remember the layout variant they last matched, so each parser thread keeps its own
+_local = threading.local()
+
+def content_fingerprint(soup: BeautifulSoup) -> str:
+    """Stable hash of the title, price block and tech-spec table text."""
+    digest = hashlib.blake2b(digest_size=16)
+    for selector in FINGERPRINT_SELECTORS:
+        elem = soup.select_one(selector)
+        text = ' '.join(elem.get_text(' ').split()) if elem else ''
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+def parse_listing_page(content: str, combo_keywords: Sequence[str]) -> Tuple[List[ListingCard], Optional[int], bool]:
+    """Parse a listing page into cards, the last page number and whether any cards were found."""
+    extractors: Dict[Tuple[str, ...], ListingExtractor] = getattr(_local, 'extractors', None)
+    if extractors is None:
+        extractors = _local.extractors = {}
+    key = tuple(combo_keywords)
+    extractor = extractors.get(key)
+    if extractor is None:
+        # One compiled extractor per keyword set and thread, so its remembered layout carries over
+        extractor = extractors[key] = ListingExtractor(combo_keywords)
+    return extractor.extract(content)
+
+def parse_product_page(content: str, combo_keywords: Sequence[str]) -> Dict[str, Any]:
+    """Validate a product page and extract its metadata and content fingerprint.
+
+    ``status`` is 'ok', 'no_title' or 'combo'; metadata is only set for 'ok'.
+    """
+    # Basic validation that it's a laptop product page
+    soup = BeautifulSoup(content, 'lxml')
+    title_elem = soup.select_one('#productTitle')
+    if not title_elem:
+        return {"status": "no_title"}
+
+    title = title_elem.text.strip()
+
+    # Skip if it's a combo deal
+    if any(keyword in title.lower() for keyword in combo_keywords):
+        return {"status": "combo", "title": title}
+
+    metadata = {
+        'title': title,
+        'price': None,
+        'rating': None,
+        'num_reviews': None
+    }
+
+    # Try to extract price
+    price_elem = soup.select_one('#priceblock_ourprice, #priceblock_dealprice, .a-price .a-offscreen')
+    if price_elem:
+        metadata['price'] = price_elem.text.strip()
+
+    # Try to extract rating
+    rating_elem = soup.select_one('#acrPopover .a-text-normal')
+    if rating_elem:
+        metadata['rating'] = rating_elem.text.strip()
+
+    # Try to extract number of reviews
+    reviews_elem = soup.select_one('#acrCustomerReviewText')
+    if reviews_elem:
+        metadata['num_reviews'] = reviews_elem.text.strip()
+
+    return {"status": "ok", "title": title, "metadata": metadata, "content_hash": content_fingerprint(soup)}
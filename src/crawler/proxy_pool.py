@@ -0,0 +1,172 @@
+# src/crawler/proxy_pool.py
+
+import asyncio
+import aiohttp
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..utils.config import (
+    PROXIES, PROXY_CONNECTIONS, PROXY_KEEPALIVE, PROXY_QUARANTINE_BASE, PROXY_QUARANTINE_MAX
+)
+
+# Outcomes reported back to the pool after each request
+OK = 'ok'
+THROTTLED = 'throttled'
+BANNED = 'banned'
+ERROR = 'error'
+
+# Extra seconds charged per failed request, for the retry and backoff it causes
+FAILURE_PENALTY = 5.0
+
+@dataclass
+class ProxyState:
+    """A proxy (None for a direct connection), its session and its health counters."""
+    url: Optional[str]
+    session: Optional[aiohttp.ClientSession] = None
+    latency: Optional[float] = None  # Moving average of response time, seconds
+    requests: int = 0
+    successes: int = 0
+    bans: int = 0
+    errors: int = 0
+    strikes: int = 0  # Consecutive bad outcomes; reset by a success
+    quarantined_until: float = 0.0
+    in_flight: int = 0
+
+    def score(self, unmeasured_latency: float = 0.0) -> float:
+        """Expected cost of the next request here; lower is better.
+
+        A request costs the average latency (``unmeasured_latency`` before
+        the first response) plus a penalty weighted by the failure rate,
+        scaled by the requests already in flight and divided by the success
+        rate, so a proxy that fails fast never looks cheap.
+        """
+        latency = unmeasured_latency if self.latency is None else self.latency
+        success_rate = (self.successes + 1) / (self.requests + 1)
+        cost = latency + FAILURE_PENALTY * (1 - success_rate)
+        return cost * (1 + self.in_flight) / max(success_rate, 0.05)
+
+class ProxyPool:
+    """Spreads requests over a set of proxies, each with its own kept-alive connection pool.
+
+    Proxies are picked by "power of two choices" on their score, which folds
+    in latency, load and failure rate. A ban quarantines a proxy at once, and
+    ``error_threshold`` consecutive errors do the same. The quarantine
+    doubles with every further strike up to ``quarantine_max``. A pool with
+    only the direct connection never quarantines it, since that would halt
+    the crawl; backing off is then left to the rate limiter.
+    Use it as an async context manager to open and close the sessions.
+    """
+
+    def __init__(self, proxies: Sequence[Optional[str]] = PROXIES,
+                 connections_per_proxy: int = PROXY_CONNECTIONS,
+                 keepalive_timeout: float = PROXY_KEEPALIVE,
+                 quarantine_base: float = PROXY_QUARANTINE_BASE,
+                 quarantine_max: float = PROXY_QUARANTINE_MAX,
+                 error_threshold: int = 3,
+                 latency_alpha: float = 0.3,
+                 clock: Callable[[], float] = time.monotonic):
+        self.proxies = [ProxyState(url=url) for url in (list(proxies) or [None])]
+        self.direct_only = len(self.proxies) == 1 and self.proxies[0].url is None
+        self.connections_per_proxy = connections_per_proxy
+        self.keepalive_timeout = keepalive_timeout
+        self.quarantine_base = quarantine_base
+        self.quarantine_max = quarantine_max
+        self.error_threshold = error_threshold
+        self.latency_alpha = latency_alpha
+        self.clock = clock
+        self.logger = logging.getLogger('ProxyPool')
+
+    async def __aenter__(self) -> 'ProxyPool':
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    def open(self):
+        """Create one session and connection pool per proxy."""
+        timeout = aiohttp.ClientTimeout(
+            total=60,      # Total timeout
+            connect=10,    # Connection timeout
+            sock_read=30   # Socket read timeout
+        )
+        for proxy in self.proxies:
+            connector = aiohttp.TCPConnector(
+                ssl=False,
+                limit=self.connections_per_proxy,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            proxy.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        """Close every proxy's session."""
+        for proxy in self.proxies:
+            if proxy.session is not None:
+                await proxy.session.close()
+                proxy.session = None
+
+    def available(self) -> List[ProxyState]:
+        """Proxies not in quarantine."""
+        now = self.clock()
+        return [proxy for proxy in self.proxies if proxy.quarantined_until <= now]
+
+    async def acquire(self) -> ProxyState:
+        """Pick a proxy for the next request, waiting if every proxy is in quarantine."""
+        while True:
+            available = self.available()
+            if available:
+                # Untried proxies are assumed a little faster than the fastest one, so each gets tried early
+                measured = [proxy.latency for proxy in self.proxies if proxy.latency is not None]
+                prior = min(measured) / 2 if measured else 0.0
+                candidates = random.sample(available, min(2, len(available)))
+                proxy = min(candidates, key=lambda candidate: candidate.score(prior))
+                proxy.in_flight += 1
+                return proxy
+            wait = min(proxy.quarantined_until for proxy in self.proxies) - self.clock()
+            self.logger.warning(f"All {len(self.proxies)} proxies quarantined, waiting {wait:.1f}s")
+            await asyncio.sleep(max(wait, 0.0))
+
+    def release(self, proxy: ProxyState, outcome: str, latency: Optional[float] = None):
+        """Record the outcome of a request made through ``proxy``."""
+        proxy.in_flight = max(0, proxy.in_flight - 1)
+        proxy.requests += 1
+        if latency is not None:
+            if proxy.latency is None:
+                proxy.latency = latency
+            else:
+                proxy.latency += self.latency_alpha * (latency - proxy.latency)
+
+        if outcome == OK:
+            proxy.successes += 1
+            proxy.strikes = 0
+            return
+        if outcome == THROTTLED:
+            # Throttling is the rate limiter's job; it only costs the proxy some score
+            return
+
+        proxy.strikes += 1
+        if outcome == BANNED:
+            proxy.bans += 1
+        else:
+            proxy.errors += 1
+            if proxy.strikes < self.error_threshold:
+                return
+        if self.direct_only:
+            return
+        cool_off = min(self.quarantine_max, self.quarantine_base * 2 ** (proxy.strikes - 1))
+        proxy.quarantined_until = self.clock() + cool_off
+        self.logger.warning(f"Quarantining proxy {proxy.url or 'direct'} for {cool_off:.0f}s "
+                            f"after {outcome} (strike {proxy.strikes})")
+
+    def summary(self) -> List[Dict]:
+        """Per-proxy counters for logging."""
+        return [
+            {"proxy": proxy.url or "direct", "requests": proxy.requests, "successes": proxy.successes,
+             "bans": proxy.bans, "errors": proxy.errors,
+             "latency": round(proxy.latency, 3) if proxy.latency is not None else None}
+            for proxy in self.proxies
+        ]
@@ -1,131 +1,172 @@
-# src/utils/rate_limiter.py
+# src/crawler/rate_limiter.py
 
 import asyncio
 import time
 import random
 from typing import Dict, Optional
-from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+def limiter_key(url: str, proxy: Optional[str] = None) -> str:
+    """Build the limiter key for a request: one bucket per host and proxy."""
+    host = urlsplit(url).netloc.lower()
+    return f"{host}|{proxy}" if proxy else host
+
+class TokenBucket:
+    """Token bucket with reservation semantics.
+
+    Tokens may go negative: each reservation takes one token immediately and
+    returns how long the caller has to wait before that token is actually
+    available, so concurrent callers queue up without a lock or history list.
+    A pause drops the outstanding reservations; ``pauses`` counts them so
+    callers sleeping on a dropped reservation can tell and reserve again.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'pauses')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.pauses = 0
+
+    def _refill(self, now: float):
+        """Add the tokens accrued since the last update."""
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Take one token and return the delay before it may be used."""
+        self._refill(now)
+        self.tokens -= 1
+        ready_at = self.updated + max(0.0, -self.tokens) / self.rate
+        return max(0.0, ready_at - now)
+
+    def set_rate(self, rate: float, now: float):
+        """Change the refill rate without losing accrued tokens."""
+        self._refill(now)
+        self.rate = rate
+
+    def pause(self, until: float):
+        """Stop refilling until the given time and drop all reservations; at most one token is ready then."""
+        if until > self.updated:
+            self.tokens = min(max(self.tokens, 0.0), 1.0)
+            self.updated = until
+            self.pauses += 1
 
 class RateLimiter:
     def __init__(self, 
                  requests_per_second: float = 0.5,  # Default: 1 request per 2 seconds
                  burst_limit: int = 5,              # Maximum burst requests
-                 cooldown_time: int = 60):          # Cooldown time in seconds
+                 cooldown_time: int = 60,           # Cooldown time in seconds
+                 jitter: float = 0.25):             # Max random jitter added per request
         self.rate_limit = requests_per_second
         self.burst_limit = burst_limit
         self.cooldown_time = cooldown_time
-        self.request_times: Dict[str, list] = {}    # Track request times per domain
-        self.locks: Dict[str, asyncio.Lock] = {}    # Locks per domain
-        self.cooldown_until: Dict[str, datetime] = {}  # Track cooldown periods
-
-    async def acquire(self, domain: str):
-        """Acquire rate limit lock with adaptive delays and burst protection."""
-        # Create lock for domain if it doesn't exist
-        if domain not in self.locks:
-            self.locks[domain] = asyncio.Lock()
-            self.request_times[domain] = []
-
-        async with self.locks[domain]:
-            await self._handle_cooldown(domain)
-            await self._enforce_rate_limit(domain)
-            self._update_request_times(domain)
-            await self._add_jitter()
-
-    async def _handle_cooldown(self, domain: str):
-        """Check and handle cooldown periods."""
-        if domain in self.cooldown_until:
-            wait_time = (self.cooldown_until[domain] - datetime.now()).total_seconds()
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-            del self.cooldown_until[domain]
-
-    async def _enforce_rate_limit(self, domain: str):
-        """Enforce rate limiting with burst protection."""
-        current_time = time.time()
-        recent_requests = [t for t in self.request_times[domain] 
-                         if current_time - t < (1 / self.rate_limit)]
-
-        if len(recent_requests) >= self.burst_limit:
-            # Enter cooldown if burst limit exceeded
-            self.cooldown_until[domain] = datetime.now() + timedelta(seconds=self.cooldown_time)
-            await asyncio.sleep(self.cooldown_time)
-            self.request_times[domain].clear()
-        elif recent_requests:
-            # Calculate delay based on rate limit
-            newest_request = max(recent_requests)
-            time_since_request = current_time - newest_request
-            if time_since_request < (1 / self.rate_limit):
-                delay = (1 / self.rate_limit) - time_since_request
+        self.jitter = jitter
+        self.buckets: Dict[str, TokenBucket] = {}   # Bucket per host/proxy key
+
+    def _bucket(self, key: str) -> TokenBucket:
+        """Get or create the bucket for a key."""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate_limit, self.burst_limit, time.monotonic())
+            self.buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, key: str) -> float:
+        """Wait for a token for the key; returns the time spent waiting.
+
+        A cooldown declared while the caller sleeps drops its reservation, so
+        it queues again behind the cooldown instead of firing into it.
+        """
+        bucket = self._bucket(key)
+        waited = 0.0
+        while True:
+            pauses = bucket.pauses
+            delay = bucket.reserve(time.monotonic())
+            if self.jitter:
+                # Jitter prevents concurrent workers from firing in lockstep
+                delay += random.uniform(0, self.jitter)
+            if delay > 0:
                 await asyncio.sleep(delay)
+                waited += delay
+            if bucket.pauses == pauses:
+                return waited
 
-    def _update_request_times(self, domain: str):
-        """Update request history."""
-        current_time = time.time()
-        # Clean old requests
-        self.request_times[domain] = [t for t in self.request_times[domain] 
-                                    if current_time - t < 60]  # Keep last minute
-        self.request_times[domain].append(current_time)
-
-    async def _add_jitter(self):
-        """Add random jitter to prevent synchronized requests."""
-        jitter = random.uniform(0.1, 0.5)
-        await asyncio.sleep(jitter)
-
-    async def reset(self, domain: str):
-        """Reset rate limiting for a domain."""
-        if domain in self.request_times:
-            self.request_times[domain].clear()
-        if domain in self.cooldown_until:
-            del self.cooldown_until[domain]
+    def cooldown(self, key: str, seconds: Optional[float] = None):
+        """Hold all requests for a key for the cooldown period."""
+        seconds = self.cooldown_time if seconds is None else seconds
+        self._bucket(key).pause(time.monotonic() + seconds)
+
+    def get_rate(self, key: str) -> float:
+        """Current request rate for a key."""
+        bucket = self.buckets.get(key)
+        return bucket.rate if bucket else self.rate_limit
+
+    async def reset(self, key: str):
+        """Reset rate limiting for a key."""
+        self.buckets.pop(key, None)
 
 class AdaptiveRateLimiter(RateLimiter):
     def __init__(self, 
                  initial_rate: float = 0.5,
                  min_rate: float = 0.1,
-                 max_rate: float = 2.0):
-        super().__init__(requests_per_second=initial_rate)
+                 max_rate: float = 2.0,
+                 burst_limit: int = 5,
+                 cooldown_time: int = 60,
+                 jitter: float = 0.25):
+        super().__init__(requests_per_second=initial_rate, burst_limit=burst_limit,
+                         cooldown_time=cooldown_time, jitter=jitter)
         self.min_rate = min_rate
         self.max_rate = max_rate
         self.success_count: Dict[str, int] = {}
         self.failure_count: Dict[str, int] = {}
 
-    async def handle_response(self, domain: str, success: bool):
-        """Adjust rate limit based on success/failure of requests."""
-        if domain not in self.success_count:
-            self.success_count[domain] = 0
-            self.failure_count[domain] = 0
-
-        if success:
-            self.success_count[domain] += 1
-            if self.success_count[domain] >= 10:
-                self._increase_rate(domain)
-                self.success_count[domain] = 0
+    async def handle_response(self, key: str, success: bool, throttled: bool = False):
+        """Adjust the rate for a key based on the outcome of a request.
+
+        ``throttled`` marks 429/503 and CAPTCHA responses: the rate is halved
+        and the key cools down immediately instead of after repeated failures.
+        """
+        if key not in self.success_count:
+            self.success_count[key] = 0
+            self.failure_count[key] = 0
+
+        if throttled:
+            self.success_count[key] = 0
+            self.failure_count[key] = 0
+            self._decrease_rate(key)
+            self.cooldown(key)
+        elif success:
+            self.success_count[key] += 1
+            if self.success_count[key] >= 10:
+                self._increase_rate(key)
+                self.success_count[key] = 0
         else:
-            self.failure_count[domain] += 1
-            if self.failure_count[domain] >= 3:
-                self._decrease_rate(domain)
-                self.failure_count[domain] = 0
-
-    def _increase_rate(self, domain: str):
-        """Increase the rate limit for a domain."""
-        current_rate = self.rate_limit
-        new_rate = min(current_rate * 1.2, self.max_rate)
-        if new_rate != current_rate:
-            self.rate_limit = new_rate
-
-    def _decrease_rate(self, domain: str):
-        """Decrease the rate limit for a domain."""
-        current_rate = self.rate_limit
-        new_rate = max(current_rate * 0.5, self.min_rate)
-        if new_rate != current_rate:
-            self.rate_limit = new_rate
-            # Clear request history and enter cooldown
-            self.request_times[domain].clear()
-            self.cooldown_until[domain] = datetime.now() + timedelta(seconds=self.cooldown_time)
+            self.failure_count[key] += 1
+            if self.failure_count[key] >= 3:
+                self._decrease_rate(key)
+                self.failure_count[key] = 0
+
+    def _increase_rate(self, key: str):
+        """Increase the rate limit for a key."""
+        bucket = self._bucket(key)
+        new_rate = min(bucket.rate * 1.2, self.max_rate)
+        if new_rate != bucket.rate:
+            bucket.set_rate(new_rate, time.monotonic())
+
+    def _decrease_rate(self, key: str):
+        """Decrease the rate limit for a key."""
+        bucket = self._bucket(key)
+        new_rate = max(bucket.rate * 0.5, self.min_rate)
+        if new_rate != bucket.rate:
+            bucket.set_rate(new_rate, time.monotonic())
 
 # Usage example:
 # rate_limiter = AdaptiveRateLimiter()
-# async with rate_limiter.acquire("amazon.in"):
-#     # Make request
-#     response = await make_request()
-#     await rate_limiter.handle_response("amazon.in", response.status == 200)
\ No newline at end of file
+# key = limiter_key(url, proxy)
+# await rate_limiter.acquire(key)
+# response = await make_request()
+# await rate_limiter.handle_response(key, response.status == 200,
+#                                    throttled=response.status in (429, 503))
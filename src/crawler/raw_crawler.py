@@ -1,24 +1,186 @@
 # src/crawler/raw_crawler.py
 
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
-from datetime import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
-import random
-from pathlib import Path
-from typing import List, Optional, Dict
+import os
+import socket
+from functools import partial
+from typing import Callable, List, Optional, Dict, Tuple
+from urllib.parse import urlsplit
+from dataclasses import dataclass
 import json
+import multiprocessing
 import time
 
+from .budget import CrawlBudget
+from .checkpoint import CrawlFrontier
+from .debug_store import DebugArtifactStore
+from .http_cache import HttpCache
+from .dedup import AsinDeduplicator, BloomFilter
+from .listing_extractor import ListingCard
+from .page_parser import parse_listing_page, parse_product_page
+from .proxy_pool import ProxyPool, OK, THROTTLED, BANNED, ERROR
+from .rate_limiter import AdaptiveRateLimiter, limiter_key
+from .streaming import ResponseTooLargeError, find_marker, read_body
 from ..database.db_manager import DatabaseManager
-from ..utils.config import get_random_headers, LAPTOP_URLS
+from ..database.work_queue import WorkQueue
+from ..utils.metrics import Metrics
+from ..utils.settings import rate_ceiling
+from ..utils.config import (
+    get_random_headers, LAPTOP_URLS, CONCURRENCY, PRODUCT_QUEUE_SIZE, LISTING_CONCURRENCY,
+    RATE_LIMIT_INITIAL, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_BURST, RATE_LIMIT_COOLDOWN,
+    DELAY_BETWEEN_REQUESTS, DEDUP_BLOOM_CAPACITY, DEDUP_BLOOM_ERROR_RATE, INCREMENTAL_MAX_AGE_HOURS,
+    PARSER_EXECUTOR, PARSER_WORKERS, CHECKPOINT_INTERVAL, MAX_PAGES, CHECKPOINT_MAX_ATTEMPTS,
+    WORK_QUEUE_POLL_INTERVAL, PROXIES, HTTP_CACHE_MODE, HTTP_CACHE_DIR, PRODUCT_URL_TEMPLATE,
+    MAX_PAGE_BYTES
+)
+
+# Marker strings Amazon puts on bot-detection and CAPTCHA pages
+BLOCK_MARKERS = [
+    ("To discuss automated access to Amazon data please contact", "Bot detection triggered"),
+    ("api-services-support@amazon.com", "Bot detection triggered"),
+    ("Sorry, we just need to make sure you're not a robot", "CAPTCHA detected"),
+]
+
+# Outcomes of a product fetch; a skipped page (combo deal, no title, oversized) is finished, not failed
+CRAWLED = 'crawled'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+class BlockedError(Exception):
+    """Raised when a response is a bot-detection or CAPTCHA page."""
+
+def block_reason(message: str) -> str:
+    """Metrics label for a BLOCK_MARKERS message."""
+    return 'captcha' if 'CAPTCHA' in message else 'bot_detection'
+
+def listing_snapshot(card: ListingCard) -> Dict[str, Optional[str]]:
+    """Listing fields compared between runs in listing refresh mode."""
+    return {
+        "title": card.title,
+        "price": card.price,
+        "rating": card.rating,
+        "num_reviews": card.num_reviews,
+        "available": card.price is not None
+    }
+
+def product_url(asin: str, template: str = PRODUCT_URL_TEMPLATE) -> str:
+    """Product page URL for an ASIN."""
+    return template.format(asin=asin)
+
+def asin_from_url(url: str) -> str:
+    """Extract the ASIN from a /dp/ product URL."""
+    return url.split('/dp/')[-1].split('/')[0]
+
+def listing_task(base_url: str, page: int) -> Tuple[str, Dict]:
+    """Work queue item for one listing page."""
+    return f"{base_url}&page={page}", {"base_url": base_url, "page": page}
+
+@dataclass
+class WorkerStats:
+    """Counters kept by each product-page worker."""
+    worker_id: int
+    processed: int = 0
+    succeeded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+    def count(self, result: str):
+        """Count one processed task by its outcome."""
+        self.processed += 1
+        if result == CRAWLED:
+            self.succeeded += 1
+        elif result == SKIPPED:
+            self.skipped += 1
+        else:
+            self.failed += 1
 
 class RawCrawler:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager,
+                 concurrency: int = CONCURRENCY,
+                 queue_size: int = PRODUCT_QUEUE_SIZE,
+                 listing_concurrency: int = LISTING_CONCURRENCY,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 crawl_id: Optional[str] = None,
+                 incremental: bool = False,
+                 max_age: timedelta = timedelta(hours=INCREMENTAL_MAX_AGE_HOURS),
+                 parser_executor: str = PARSER_EXECUTOR,
+                 parser_workers: Optional[int] = PARSER_WORKERS,
+                 listing_refresh: bool = False,
+                 debug_store: Optional[DebugArtifactStore] = None,
+                 resume: bool = False,
+                 checkpoint_interval: float = CHECKPOINT_INTERVAL,
+                 proxies: Optional[List[str]] = None,
+                 http_cache: Optional[HttpCache] = None,
+                 product_url_template: str = PRODUCT_URL_TEMPLATE,
+                 metrics: Optional[Metrics] = None,
+                 urls: Optional[List[str]] = None,
+                 max_requests: Optional[int] = None,
+                 max_seconds: Optional[float] = None,
+                 max_page_bytes: int = MAX_PAGE_BYTES):
         self.db_manager = db_manager
         self.logger = logging.getLogger('RawCrawler')
-        self.urls = LAPTOP_URLS
+        self.urls = list(urls) if urls else LAPTOP_URLS
+        self.product_url_template = product_url_template
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.listing_concurrency = max(1, listing_concurrency)
+        self.worker_stats: List[WorkerStats] = []
+        self.proxies = PROXIES if proxies is None else proxies
+        self.crawl_id = crawl_id
+        self.dedup = AsinDeduplicator()
+        self.incremental = incremental
+        self.max_age = max_age
+        self.fresh_skipped = 0
+        # Stored content fingerprints of queued URLs, used to skip unchanged HTML writes
+        self.known_hashes: Dict[str, str] = {}
+        self.unchanged_pages = 0
+        # Listing refresh mode: known products are updated from search cards without a page fetch
+        self.listing_refresh = listing_refresh
+        self.pending_listings: Dict[str, Dict] = {}
+        self.listing_refreshed = 0
+        # Crawl frontier, checkpointed under the crawl id so a restart resumes instead of starting over
+        self.resume = resume
+        self.checkpoint_interval = checkpoint_interval
+        self.frontier = CrawlFrontier(max_attempts=CHECKPOINT_MAX_ATTEMPTS)
+        # Page and time limits; once used up no new page is started and the run winds down
+        self.budget = CrawlBudget(max_requests=max_requests, max_seconds=max_seconds)
+        self.budget_skipped = 0
+        # Larger response bodies are abandoned mid-stream
+        self.max_page_bytes = max_page_bytes
+        # The default limiter never goes faster than DELAY_BETWEEN_REQUESTS allows
+        ceiling = rate_ceiling(RATE_LIMIT_MAX, DELAY_BETWEEN_REQUESTS)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(
+            initial_rate=min(RATE_LIMIT_INITIAL, ceiling),
+            min_rate=RATE_LIMIT_MIN,
+            max_rate=ceiling,
+            burst_limit=RATE_LIMIT_BURST,
+            cooldown_time=RATE_LIMIT_COOLDOWN
+        )
+
+        # Parsing runs on a thread or process pool so it never blocks in-flight requests
+        self.parser_executor = parser_executor
+        self.parser_workers = parser_workers or os.cpu_count() or 1
+        self._executor: Optional[Executor] = None
+        self.debug_store = debug_store or DebugArtifactStore()
+        # Optional record/replay transport under _fetch
+        if http_cache is None and HTTP_CACHE_MODE:
+            http_cache = HttpCache(HTTP_CACHE_DIR, HTTP_CACHE_MODE)
+        self.http_cache = http_cache
+
+        # Per-stage counters and timings; product URLs remember the search URL they came from
+        self.metrics = metrics or Metrics()
+        self.sources: Dict[str, str] = {}
+        # Acknowledgement future and result label of each buffered page write, until a worker watches it
+        self.pending_writes: Dict[str, Tuple[asyncio.Future, str]] = {}
+        self.reopened: List[asyncio.Task] = []
+
+        # Distributed mode: identifies this process's leases in the shared work queue
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = WORK_QUEUE_POLL_INTERVAL
         
         # Keywords to identify combo deals
         self.combo_keywords = [
@@ -28,319 +190,787 @@ class RawCrawler:
             'with keyboard', '+ keyboard', '+ headphone'
         ]
 
-    async def create_session(self):
-        """Create an aiohttp session with ScraperAPI proxy"""
-        proxies = [
-            "Add your Api keys here"
-        ]
-        
-        connector = aiohttp.TCPConnector(
-            ssl=False,
-            limit=1  # Limit concurrent connections
-        )
-        
-        timeout = aiohttp.ClientTimeout(
-            total=60,      # Total timeout
-            connect=10,    # Connection timeout
-            sock_read=30   # Socket read timeout
-        )
-        
-        if proxies:
-            proxy = random.choice(proxies)
-            return aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout,
-                proxy=proxy
-            )
-        else:
-            return aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout
-            )
+    async def create_session(self) -> ProxyPool:
+        """Create the proxy pool requests are spread over; enter it to open its sessions."""
+        return ProxyPool(self.proxies)
+
+    def save_debug_html(self, content: str, name: str, failure: bool = False):
+        """Hand HTML to the debug artifact store, which samples and writes it off the loop."""
+        self.debug_store.save(content, name, failure=failure)
 
-    def save_debug_html(self, content: str, page: int):
-        """Save HTML content for debugging."""
+    def _source_label(self, base_url: str) -> str:
+        """Short metrics label for a search URL: its position in the URL list."""
         try:
-            debug_dir = Path("debug_html")
-            debug_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = debug_dir / f"page_{page}_{timestamp}.html"
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(content)
-                
-            self.logger.debug(f"Saved debug HTML to {filename}")
+            return f"search{self.urls.index(base_url) + 1}"
+        except ValueError:
+            return "other"
+
+    def _stage_and_source(self, url: str) -> Tuple[str, str]:
+        """Pipeline stage of a URL and the search URL it belongs to, as metrics labels."""
+        if '/dp/' in url:
+            return 'product', self.sources.get(url, 'unknown')
+        return 'listing', self._source_label(url.rsplit('&page=', 1)[0])
+
+    def _label_sources(self, base_url: str, links: List[str]):
+        """Remember which search URL queued each product, for per-source metrics."""
+        source = self._source_label(base_url)
+        for link in links:
+            self.sources[link] = source
+
+    async def _fetch(self, session: ProxyPool, url: str) -> Tuple[int, Optional[str]]:
+        """Fetch a URL through a pooled proxy and the rate limiter, reporting the outcome to both.
+
+        Returns the status and, for 200 responses, the page content. The body
+        is streamed: BlockedError is raised as soon as a bot-detection or
+        CAPTCHA marker arrives, and ResponseTooLargeError once the body
+        passes ``max_page_bytes``. In replay mode the recorded response is
+        served without touching the network.
+        """
+        metrics = self.metrics
+        stage, source = self._stage_and_source(url)
+        if self.http_cache is not None and self.http_cache.replaying:
+            status, content = self.http_cache.replay(url)
+            metrics.inc('crawler_responses_total', stage=stage, status=str(status))
+            if status != 200:
+                return status, None
+            blocked = find_marker(content, BLOCK_MARKERS)
+            if blocked is not None:
+                metrics.inc('crawler_blocked_total', stage=stage, reason=block_reason(blocked))
+                raise BlockedError(blocked)
+            return 200, content
+
+        proxy = await session.acquire()
+        key = limiter_key(url, proxy.url)
+        delay = await self.rate_limiter.acquire(key)
+        if delay:
+            metrics.inc('crawler_backoff_seconds_total', delay, stage=stage, reason='rate_limit')
+        started = time.monotonic()
+        try:
+            async with proxy.session.get(url, headers=get_random_headers(), proxy=proxy.url, timeout=30) as response:
+                metrics.inc('crawler_responses_total', stage=stage, status=str(response.status))
+                if response.status != 200:
+                    throttled = response.status in (429, 503)
+                    await self.rate_limiter.handle_response(key, False, throttled=throttled)
+                    outcome = THROTTLED if throttled else ERROR if response.status >= 500 else OK
+                    session.release(proxy, outcome, time.monotonic() - started)
+                    if self.http_cache is not None:
+                        await self.http_cache.record(url, response.status, None)
+                    return response.status, None
+                body = await read_body(response, BLOCK_MARKERS, self.max_page_bytes)
+        except ResponseTooLargeError:
+            # The page, not the proxy or the host, is at fault
+            metrics.inc('crawler_fetch_errors_total', stage=stage, error='ResponseTooLargeError')
+            await self.rate_limiter.handle_response(key, True)
+            session.release(proxy, OK, time.monotonic() - started)
+            raise
         except Exception as e:
-            self.logger.error(f"Failed to save debug HTML: {str(e)}")
+            metrics.inc('crawler_fetch_errors_total', stage=stage, error=type(e).__name__)
+            await self.rate_limiter.handle_response(key, False)
+            session.release(proxy, ERROR, time.monotonic() - started)
+            raise
+        latency = time.monotonic() - started
+        content = body.content
+        metrics.observe('crawler_fetch_seconds', latency, stage=stage, source=source)
+        metrics.inc('crawler_fetch_bytes_total', body.size, stage=stage, source=source)
+        if self.http_cache is not None:
+            # A blocked page is recorded up to its marker, which is enough to replay the block
+            await self.http_cache.record(url, 200, content)
 
-    async def extract_product_links(self, session: aiohttp.ClientSession, base_url: str, page: int) -> List[str]:
-        """Extract product URLs from a listing page."""
+        if body.blocked is not None:
+            await self.rate_limiter.handle_response(key, False, throttled=True)
+            session.release(proxy, BANNED, latency)
+            metrics.inc('crawler_blocked_total', stage=stage, reason=block_reason(body.blocked))
+            self.save_debug_html(content, f"blocked_{urlsplit(url).path.strip('/').replace('/', '_')}", failure=True)
+            raise BlockedError(body.blocked)
+
+        await self.rate_limiter.handle_response(key, True)
+        session.release(proxy, OK, latency)
+        return 200, content
+
+    async def _fetch_listing_page(self, session: ProxyPool, base_url: str, page: int) -> Optional[str]:
+        """Fetch a listing page, retrying on throttling and errors."""
         retries = 0
         max_retries = 5
-        base_delay = 10  # Base delay in seconds
         
         while retries < max_retries:
             try:
                 url = f"{base_url}&page={page}"
-                headers = get_random_headers()
-                
-                # Add random delay between requests
-                await asyncio.sleep(random.uniform(5, 15))
-                
-                async with session.get(url, headers=headers, timeout=30) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        
-                        # Save HTML for debugging
-                        self.save_debug_html(content, page)
-                        
-                        # Debug log to check the content
-                        self.logger.debug(f"Page content length: {len(content)}")
-                        
-                        # Check for bot detection
-                        if "To discuss automated access to Amazon data please contact" in content:
-                            raise Exception("Bot detection triggered")
-                        if "api-services-support@amazon.com" in content:
-                            raise Exception("Bot detection triggered")
-                        if "Sorry, we just need to make sure you're not a robot" in content:
-                            raise Exception("CAPTCHA detected")
-                            
-                        soup = BeautifulSoup(content, 'lxml')
-                        
-                        # Try different selectors that Amazon might use
-                        products = []
-                        selectors = [
-                            'div[data-asin]:not([data-asin=""])',  # Standard product cards
-                            'div.s-result-item[data-asin]:not([data-asin=""])',  # Alternative format
-                            'div.sg-col-inner div[data-asin]:not([data-asin=""])',  # Another variation
-                            '.s-main-slot div[data-asin]:not([data-asin=""])'  # Main slot products
-                        ]
-                        
-                        for selector in selectors:
-                            products = soup.select(selector)
-                            if products:
-                                self.logger.debug(f"Found products using selector: {selector}")
-                                break
-                        
-                        if not products:
-                            self.logger.warning(f"No products found on page {page} using any selector")
-                            # Save the HTML content for inspection
-                            debug_file = f"debug_html/no_products_page_{page}_{int(time.time())}.html"
-                            with open(debug_file, 'w', encoding='utf-8') as f:
-                                f.write(content)
-                            return []
-                            
-                        links = []
-                        for product in products:
-                            try:
-                                asin = product.get('data-asin')
-                                if not asin:
-                                    continue
-                                    
-                                # Try different title selectors
-                                title_elem = None
-                                title_selectors = [
-                                    'h2 a.a-text-normal',
-                                    'h2 span.a-text-normal',
-                                    '.a-size-medium.a-text-normal',
-                                    '.a-size-base-plus.a-text-normal',
-                                    'h2 a span'  # Another common pattern
-                                ]
-                                
-                                for selector in title_selectors:
-                                    title_elem = product.select_one(selector)
-                                    if title_elem:
-                                        break
-                                
-                                if not title_elem:
-                                    continue
-                                    
-                                title = title_elem.text.strip().lower()
-                                
-                                # Skip combo deals
-                                if any(keyword in title for keyword in self.combo_keywords):
-                                    self.logger.debug(f"Skipping combo deal: {title}")
-                                    continue
-                                
-                                # Extract price if available
-                                price_elem = product.select_one('.a-price-whole')
-                                price = price_elem.text.strip() if price_elem else None
-                                
-                                product_url = f"https://www.amazon.in/dp/{asin}"
-                                links.append(product_url)
-                                self.logger.debug(f"Found product: {title} ({product_url}) - Price: {price}")
-                                
-                            except Exception as e:
-                                self.logger.error(f"Error processing product: {str(e)}")
-                                continue
-                        
-                        self.logger.info(f"Found {len(links)} valid products on page {page}")
-                        return links
-                        
-                    elif response.status == 503 or response.status == 429:
-                        retries += 1
-                        delay = base_delay * (2 ** retries) + random.uniform(1, 5)
-                        self.logger.warning(f"Rate limited (Status {response.status}). Retrying in {delay:.2f} seconds...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        self.logger.error(f"Failed to fetch page {page}: Status {response.status}")
-                        return []
-                        
+                status, content = await self._fetch(session, url)
+
+                if status == 200:
+                    # Save HTML for debugging
+                    self.save_debug_html(content, f"page_{page}")
+                    
+                    # Debug log to check the content
+                    self.logger.debug(f"Page content length: {len(content)}")
+                    return content
+
+                elif status in (503, 429):
+                    # The limiter has already cooled this host down; the next attempt waits for it
+                    retries += 1
+                    self.metrics.inc('crawler_retries_total', stage='listing')
+                    self.logger.warning(f"Rate limited (Status {status}) on page {page}, retry {retries}/{max_retries}")
+                    continue
+                else:
+                    self.logger.error(f"Failed to fetch page {page}: Status {status}")
+                    return None
+
+            except ResponseTooLargeError as e:
+                # The same page would be just as large on a retry
+                self.logger.error(f"Skipping page {page}: {str(e)}")
+                return None
             except Exception as e:
                 self.logger.error(f"Error on page {page}: {str(e)}")
                 retries += 1
-                if retries < max_retries:
-                    delay = base_delay * (2 ** retries) + random.uniform(1, 5)
-                    self.logger.warning(f"Retrying in {delay:.2f} seconds...")
-                    await asyncio.sleep(delay)
-                else:
+                self.metrics.inc('crawler_retries_total', stage='listing')
+                if retries >= max_retries:
                     self.logger.error(f"Max retries reached for page {page}")
-                    return []
+                    return None
                     
-        return []
+        return None
+
+    async def _parse(self, func, *args):
+        """Run a CPU-bound parser on the parser executor, off the event loop."""
+        if self._executor is None:
+            self._executor = self._create_executor()
+        # Includes time queued for a free pool worker, which is what the pipeline waits on
+        with self.metrics.timer('crawler_parse_seconds', parser=func.__name__):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _create_executor(self) -> Executor:
+        """Build the thread or process pool used for page parsing."""
+        if self.parser_executor == 'process':
+            # spawn: forking a process that already runs Motor's threads is not safe
+            return ProcessPoolExecutor(max_workers=self.parser_workers,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=self.parser_workers, thread_name_prefix='parser')
+
+    def _shutdown_executor(self):
+        """Stop the parser pool; a new one is created on the next parse."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def parse_listing_page(self, content: str, page: int) -> Tuple[List[ListingCard], Optional[int]]:
+        """Parse a listing page into product cards and the last page number, if shown."""
+        cards, last_page, found = await self._parse(parse_listing_page, content, self.combo_keywords)
+        if not found:
+            self.logger.warning(f"No products found on page {page} using any selector")
+            # Save the HTML content for inspection
+            self.save_debug_html(content, f"no_products_page_{page}", failure=True)
+            return [], last_page
+
+        self.logger.info(f"Found {len(cards)} valid products on page {page}")
+        return cards, last_page
+
+    async def extract_product_links(self, session: ProxyPool, base_url: str, page: int) -> List[str]:
+        """Extract product URLs from a listing page."""
+        content = await self._fetch_listing_page(session, base_url, page)
+        if not content:
+            return []
+        cards, _ = await self.parse_listing_page(content, page)
+        return [product_url(card.asin, self.product_url_template) for card in cards]
 
-    async def crawl_product(self, session: aiohttp.ClientSession, url: str) -> bool:
-        """Crawl a single product page."""
+    async def crawl_product(self, session: ProxyPool, url: str) -> str:
+        """Crawl a single product page, returning CRAWLED, SKIPPED or FAILED."""
         retries = 0
         max_retries = 3
-        base_delay = 5
         
         while retries < max_retries:
             try:
-                headers = get_random_headers()
-                await asyncio.sleep(random.uniform(2, 5))  # Random delay
-                
-                async with session.get(url, headers=headers, timeout=30) as response:
-                    if response.status != 200:
-                        if response.status in [503, 429]:
-                            retries += 1
-                            delay = base_delay * (2 ** retries) + random.uniform(1, 3)
-                            self.logger.warning(f"Rate limited on product page. Retrying in {delay:.2f} seconds...")
-                            await asyncio.sleep(delay)
-                            continue
-                        self.logger.error(f"Failed to fetch {url}: Status {response.status}")
-                        return False
-                        
-                    content = await response.text()
-                    
-                    # Check for bot detection
-                    if "To discuss automated access to Amazon data please contact" in content:
-                        raise Exception("Bot detection triggered")
-                    if "Sorry, we just need to make sure you're not a robot" in content:
-                        raise Exception("CAPTCHA detected")
-                    
-                    # Basic validation that it's a laptop product page
-                    soup = BeautifulSoup(content, 'lxml')
-                    title_elem = soup.select_one('#productTitle')
-                    if not title_elem:
-                        self.logger.warning(f"No product title found for {url}")
-                        return False
-                    
-                    title = title_elem.text.strip()
-                    
-                    # Skip if it's a combo deal
-                    if any(keyword in title.lower() for keyword in self.combo_keywords):
-                        self.logger.debug(f"Skipping combo deal product: {title}")
-                        return False
-                    
-                    # Extract additional metadata
-                    metadata = {
-                        'title': title,
-                        'asin': url.split('/dp/')[-1].split('/')[0],
-                        'crawled_at': datetime.utcnow(),
-                        'price': None,
-                        'rating': None,
-                        'num_reviews': None
-                    }
-                    
-                    # Try to extract price
-                    price_elem = soup.select_one('#priceblock_ourprice, #priceblock_dealprice, .a-price .a-offscreen')
-                    if price_elem:
-                        metadata['price'] = price_elem.text.strip()
-                    
-                    # Try to extract rating
-                    rating_elem = soup.select_one('#acrPopover .a-text-normal')
-                    if rating_elem:
-                        metadata['rating'] = rating_elem.text.strip()
-                    
-                    # Try to extract number of reviews
-                    reviews_elem = soup.select_one('#acrCustomerReviewText')
-                    if reviews_elem:
-                        metadata['num_reviews'] = reviews_elem.text.strip()
-                    
-                    # Store raw data
-                    await self.db_manager.save_raw_data(
-                        url=url,
-                        html_content=content,
-                        metadata=metadata
-                    )
-                    
-                    self.logger.info(f"Successfully crawled {url}")
-                    return True
+                status, content = await self._fetch(session, url)
+                if status != 200:
+                    if status in (503, 429):
+                        retries += 1
+                        self.metrics.inc('crawler_retries_total', stage='product')
+                        self.logger.warning(f"Rate limited on product page {url}, retry {retries}/{max_retries}")
+                        continue
+                    self.logger.error(f"Failed to fetch {url}: Status {status}")
+                    return FAILED
                     
+                # Validation and metadata extraction run on the parser pool
+                parsed = await self._parse(parse_product_page, content, self.combo_keywords)
+                if parsed["status"] == "no_title":
+                    self.logger.warning(f"No product title found for {url}")
+                    self.metrics.inc('crawler_products_total', result='no_title')
+                    return SKIPPED
+                if parsed["status"] == "combo":
+                    self.logger.debug(f"Skipping combo deal product: {parsed['title']}")
+                    self.metrics.inc('crawler_products_total', result='combo')
+                    return SKIPPED
+
+                metadata = {
+                    **parsed["metadata"],
+                    'asin': asin_from_url(url),
+                    'crawled_at': datetime.utcnow()
+                }
+                content_hash = parsed["content_hash"]
+                
+                # Store raw data, skipping the HTML when the relevant parts are unchanged
+                listing = self.pending_listings.pop(url, None)
+                if listing is not None:
+                    listing = {**listing, "seen_at": datetime.utcnow()}
+                if self.known_hashes.pop(url, None) == content_hash:
+                    self.unchanged_pages += 1
+                    with self.metrics.timer('crawler_db_write_seconds', op='touch'):
+                        acked = await self.db_manager.touch_raw_data(url=url, metadata=metadata, listing=listing)
+                    label = 'unchanged'
+                else:
+                    with self.metrics.timer('crawler_db_write_seconds', op='save'):
+                        acked = await self.db_manager.save_raw_data(
+                            url=url,
+                            html_content=content,
+                            metadata=metadata,
+                            content_hash=content_hash,
+                            listing=listing
+                        )
+                    label = 'saved'
+
+                # The write is only buffered; the worker counts the page once it is acknowledged
+                self.pending_writes[url] = (acked, label)
+                return CRAWLED
+
+            except ResponseTooLargeError as e:
+                self.logger.error(f"Skipping {url}: {str(e)}")
+                self.metrics.inc('crawler_products_total', result='too_large')
+                return SKIPPED
             except Exception as e:
                 self.logger.error(f"Error crawling {url}: {str(e)}")
                 retries += 1
-                if retries < max_retries:
-                    delay = base_delay * (2 ** retries)
-                    await asyncio.sleep(delay)
-                    continue
-                return False
+                if retries >= max_retries:
+                    self.metrics.inc('crawler_products_total', result='failed')
+                    return FAILED
+                self.metrics.inc('crawler_retries_total', stage='product')
         
-        return False
+        self.metrics.inc('crawler_products_total', result='failed')
+        return FAILED
+
+    async def _product_worker(self, worker_id: int, session: ProxyPool,
+                              queue: asyncio.Queue, stats: WorkerStats):
+        """Drain product URLs from the queue until a None sentinel arrives."""
+        while True:
+            url = await queue.get()
+            try:
+                if url is None:
+                    return
+                if not self._within_budget():
+                    # Left pending in the frontier, so a resumed crawl fetches it
+                    self.budget_skipped += 1
+                    self.sources.pop(url, None)
+                    continue
+                started = time.monotonic()
+                asin = asin_from_url(url)
+                self.frontier.product_started(asin)
+                try:
+                    result = await self.crawl_product(session, url)
+                except Exception as e:
+                    self.logger.error(f"Worker {worker_id} failed on {url}: {str(e)}")
+                    result = FAILED
+                self.sources.pop(url, None)
+                # Skipped pages are not fetched again on resume
+                self.frontier.product_finished(asin, result != FAILED)
+                stats.count(result)
+                if result == CRAWLED:
+                    self._watch_write(url, stats, self._product_write_failed)
+                stats.busy_seconds += time.monotonic() - started
+            finally:
+                queue.task_done()
+
+    async def _discover_page(self, session: ProxyPool, base_url: str, page: int,
+                             queue: asyncio.Queue, semaphore: asyncio.Semaphore) -> Tuple[List[ListingCard], Optional[int]]:
+        """Fetch and parse one listing page under the global limit, queueing its products.
+
+        The slot is held until the page's products are queued, so at most
+        ``listing_concurrency`` pages are in flight and a full queue stops
+        discovery instead of piling up fetched pages behind it.
+        """
+        async with semaphore:
+            if not self._within_budget():
+                return [], None
+            content = await self._fetch_listing_page(session, base_url, page)
+            if not content:
+                return [], None
+            cards, last_page = await self.parse_listing_page(content, page)
+            # Only the parsed cards are kept while waiting on the queue
+            del content
+            new_links = await self._select_links(cards)
+            self._label_sources(base_url, new_links)
+
+            # Recorded before queueing, so a crash while waiting on the queue still leaves them to resume
+            for link in new_links:
+                self.frontier.product_queued(asin_from_url(link))
+            for link in new_links:
+                await queue.put(link)
+        self.frontier.page_done(base_url, page, last_page)
+        return cards, last_page
+
+    async def _select_links(self, cards: List[ListingCard], dedup: bool = True) -> List[str]:
+        """Product URLs of listing cards that need a fetch after dedup and the incremental or refresh filter."""
+        new_cards = [card for card in cards if not dedup or self.dedup.add(card.asin)]
+        new_links = [product_url(card.asin, self.product_url_template) for card in new_cards]
+        if not new_links:
+            return []
+
+        # One batched lookup per listing page rather than one per product
+        states = await self.db_manager.get_url_states(new_links)
+        for url, state in states.items():
+            if state.get("content_hash"):
+                self.known_hashes[url] = state["content_hash"]
+        if self.listing_refresh:
+            return await self._refresh_from_listing(new_cards, states)
+        if self.incremental:
+            cutoff = datetime.utcnow() - self.max_age
+            fresh = {url for url, state in states.items()
+                     if state.get("last_updated") and state["last_updated"] >= cutoff}
+            self.fresh_skipped += len(fresh)
+            return [link for link in new_links if link not in fresh]
+        return new_links
+
+    async def _refresh_from_listing(self, cards: List[ListingCard], states: Dict[str, Dict]) -> List[str]:
+        """Update listing data of known products in place; return the URLs that still need a product fetch."""
+        to_fetch = []
+        updates = []
+        for card in cards:
+            url = product_url(card.asin, self.product_url_template)
+            snapshot = listing_snapshot(card)
+            stored = states.get(url, {}).get("listing")
+            if url in states and stored and all(stored.get(k) == v for k, v in snapshot.items()):
+                updates.append(self.db_manager.update_listing(url, {**snapshot, "seen_at": datetime.utcnow()}))
+            else:
+                # New ASIN or changed listing data: the product page is fetched and saved with the snapshot
+                self.pending_listings[url] = snapshot
+                to_fetch.append(url)
+        if updates:
+            # Buffered by the DatabaseManager into one bulk write
+            with self.metrics.timer('crawler_db_write_seconds', op='update_listing'):
+                await asyncio.gather(*updates)
+        self.listing_refreshed += len(updates)
+        return to_fetch
+
+    async def _discover_url(self, session: ProxyPool, base_url: str, max_pages: int,
+                            queue: asyncio.Queue, semaphore: asyncio.Semaphore):
+        """Paginate one search URL, fetching pages concurrently once the last page is known.
+
+        Pages already recorded in the frontier are skipped, so a resumed crawl
+        only reads the listing pages an earlier attempt did not finish.
+        """
+        progress = self.frontier.listing(base_url)
+        if progress["complete"]:
+            return
+        done = progress["done"]
+
+        if 1 in done:
+            last_page = progress["last_page"]
+        else:
+            cards, last_page = await self._discover_page(session, base_url, 1, queue, semaphore)
+            if not cards:
+                if self.budget.reason is None:
+                    self.logger.info(f"No products found on page 1 of {base_url}")
+                if 1 in done:
+                    self.frontier.listing_complete(base_url)
+                return
+
+        if last_page is not None:
+            last_page = min(last_page, max_pages)
+            self.logger.info(f"{base_url} has {last_page} pages to crawl")
+            await asyncio.gather(*(
+                self._discover_page(session, base_url, page, queue, semaphore)
+                for page in range(2, last_page + 1) if page not in done
+            ))
+            if all(page in done for page in range(1, last_page + 1)):
+                self.frontier.listing_complete(base_url)
+            return
+
+        # No pagination control on page 1: walk pages until one comes back empty
+        for page in range(max(done) + 1, max_pages + 1):
+            cards, _ = await self._discover_page(session, base_url, page, queue, semaphore)
+            if not cards:
+                self.logger.info(f"No more products found after page {page}")
+                if page not in done:
+                    # The fetch failed rather than the results ending; leave it for a resume
+                    return
+                break
+        self.frontier.listing_complete(base_url)
+
+    async def _produce_links(self, session: ProxyPool, queue: asyncio.Queue, max_pages: int):
+        """Discover listing pages for every search URL and feed product URLs into the queue."""
+        # Products an earlier attempt queued but did not finish go first
+        retry = self.frontier.retry_products()
+        if retry:
+            self.logger.info(f"Requeueing {len(retry)} unfinished products from the checkpoint")
+        for asin in retry:
+            await queue.put(product_url(asin, self.product_url_template))
+
+        semaphore = asyncio.Semaphore(self.listing_concurrency)
+        await asyncio.gather(*(
+            self._discover_url(session, base_url, max_pages, queue, semaphore)
+            for base_url in self.urls
+        ))
+
+    async def _run_listing_task(self, session: ProxyPool, work_queue: WorkQueue,
+                                task: Dict, max_pages: int) -> bool:
+        """Process a leased listing page: queue its products and, from page 1, the pages after it."""
+        base_url, page = task["payload"]["base_url"], task["payload"]["page"]
+        content = await self._fetch_listing_page(session, base_url, page)
+        if not content:
+            return False
+        cards, last_page = await self.parse_listing_page(content, page)
+
+        # The shared queue dedups by URL, so a retried listing task must queue all of its products again
+        links = await self._select_links(cards, dedup=False)
+        # Stored fingerprints and listing snapshots travel with the task, since any node may fetch it
+        source = self._source_label(base_url)
+        await work_queue.enqueue('product', [
+            (link, {"content_hash": self.known_hashes.pop(link, None),
+                    "listing": self.pending_listings.pop(link, None),
+                    "source": source})
+            for link in links
+        ])
+
+        if page == 1 and last_page is not None:
+            pages = range(2, min(last_page, max_pages) + 1)
+        elif last_page is None and cards and page < max_pages:
+            # No pagination control: walk on while pages have products
+            pages = range(page + 1, page + 2)
+        else:
+            pages = range(0)
+        await work_queue.enqueue('listing', [listing_task(base_url, p) for p in pages])
+        return True
+
+    async def _run_product_task(self, session: ProxyPool, task: Dict) -> str:
+        """Fetch a leased product page with the state the listing node attached to it."""
+        url, payload = task["url"], task["payload"]
+        if payload.get("content_hash"):
+            self.known_hashes[url] = payload["content_hash"]
+        if payload.get("listing") is not None:
+            self.pending_listings[url] = payload["listing"]
+        self.sources[url] = payload.get("source", "unknown")
+        try:
+            return await self.crawl_product(session, url)
+        finally:
+            self.sources.pop(url, None)
+
+    async def _keep_lease(self, work_queue: WorkQueue, task: Dict, owner: str):
+        """Extend a task's lease while it is being worked on, so no other node picks it up."""
+        while True:
+            await asyncio.sleep(work_queue.visibility_timeout.total_seconds() / 3)
+            if not await work_queue.extend(task, owner):
+                self.logger.warning(f"Lost lease on {task['url']}")
+                return
+
+    async def _queue_worker(self, kind: str, session: ProxyPool, work_queue: WorkQueue,
+                            stats: WorkerStats, max_pages: int):
+        """Lease and process tasks of one kind until the shared queue is drained."""
+        owner = f"{self.node_id}:{kind}:{stats.worker_id}"
+        while True:
+            if self._budget_exceeded():
+                # Unleased tasks stay in the shared queue for other nodes or a later run
+                return
+            task = await work_queue.lease(kind, owner)
+            if task is None:
+                if await work_queue.is_drained():
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self.budget.charge()
+
+            started = time.monotonic()
+            keepalive = asyncio.create_task(self._keep_lease(work_queue, task, owner))
+            try:
+                if kind == 'listing':
+                    done = await self._run_listing_task(session, work_queue, task, max_pages)
+                    result = CRAWLED if done else FAILED
+                else:
+                    result = await self._run_product_task(session, task)
+            except Exception as e:
+                self.logger.error(f"{owner} failed on {task['url']}: {str(e)}")
+                result = FAILED
+            finally:
+                keepalive.cancel()
+
+            # Skipped pages are acked, so they are not leased again
+            if result == FAILED:
+                await work_queue.nack(task, owner)
+            else:
+                await work_queue.ack(task, owner)
+            stats.count(result)
+            if kind == 'product' and result == CRAWLED:
+                self._watch_write(task["url"], stats, partial(self._reopen_product, work_queue))
+            stats.busy_seconds += time.monotonic() - started
 
-    async def run(self, max_pages: int = 20):
-        """Main crawler function."""
-        self.logger.info("Starting crawler")
+    def _budget_exceeded(self) -> bool:
+        """Whether the crawl budget is used up, logging the stop the first time."""
+        already_stopped = self.budget.reason is not None
+        reason = self.budget.exceeded()
+        if reason and not already_stopped:
+            self.logger.warning(f"Stopping the crawl: {reason}; finishing pages in flight")
+        return reason is not None
+
+    def _within_budget(self) -> bool:
+        """Charge one page fetch to the budget, unless it is used up."""
+        if self._budget_exceeded():
+            return False
+        self.budget.charge()
+        return True
+
+    async def _stop_workers(self, workers: List[asyncio.Task]):
+        """Cancel any worker still running and wait for it to exit."""
+        for worker in workers:
+            if not worker.done():
+                worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _load_dedup(self) -> AsinDeduplicator:
+        """Create the ASIN dedup layer, restoring the persisted filter for this crawl id when resuming.
+
+        A new run under an existing crawl id starts from an empty filter, which
+        replaces the stored one at the next checkpoint.
+        """
+        if not self.crawl_id:
+            return AsinDeduplicator()
+        doc = await self.db_manager.load_seen_filter(self.crawl_id) if self.resume else None
+        if doc:
+            bloom = BloomFilter.from_document(doc)
+            self.logger.info(f"Restored seen-ASIN filter for crawl {self.crawl_id}")
+        else:
+            bloom = BloomFilter(capacity=DEDUP_BLOOM_CAPACITY, error_rate=DEDUP_BLOOM_ERROR_RATE)
+        return AsinDeduplicator(persistent=bloom)
+
+    async def _save_dedup(self):
+        """Persist the seen-ASIN filter when the crawl has an id and new ASINs were added."""
+        if self.crawl_id and self.dedup.persistent is not None and self.dedup.dirty:
+            self.dedup.dirty = False
+            await self.db_manager.save_seen_filter(self.crawl_id, self.dedup.persistent.to_document())
+
+    async def _load_frontier(self) -> CrawlFrontier:
+        """Restore the checkpointed frontier when resuming, or start an empty one."""
+        if self.resume and self.crawl_id:
+            doc = await self.db_manager.load_checkpoint(self.crawl_id)
+            if doc:
+                frontier = CrawlFrontier.from_document(doc, max_attempts=CHECKPOINT_MAX_ATTEMPTS)
+                self.logger.info(f"Resuming crawl {self.crawl_id}: {frontier.counts()}")
+                return frontier
+            self.logger.warning(f"No checkpoint found for crawl {self.crawl_id}, starting from the beginning")
+        return CrawlFrontier(max_attempts=CHECKPOINT_MAX_ATTEMPTS)
+
+    def _watch_write(self, url: str, stats: WorkerStats, on_failure: Callable[[str], None]):
+        """Count a crawled page once its buffered write settles; a failed write turns its success into a failure."""
+        pending = self.pending_writes.pop(url, None)
+        if pending is None:
+            return
+        acked, label = pending
+
+        def settled(future: asyncio.Future):
+            if not future.cancelled() and future.result():
+                self.metrics.inc('crawler_products_total', result=label)
+                self.logger.info(f"Successfully crawled {url}")
+                return
+            self.metrics.inc('crawler_products_total', result='write_failed')
+            stats.succeeded -= 1
+            stats.failed += 1
+            on_failure(url)
+
+        acked.add_done_callback(settled)
+
+    def _product_write_failed(self, url: str):
+        """Mark a product whose buffered page write failed, so a resumed crawl fetches it again."""
+        asin = asin_from_url(url)
+        if asin in self.frontier.products:
+            self.frontier.product_finished(asin, False)
+
+    def _reopen_product(self, work_queue: WorkQueue, url: str):
+        """Put a product whose buffered page write failed back in the shared queue."""
+        self.reopened.append(asyncio.create_task(work_queue.reopen('product', url)))
+
+    async def _settle_writes(self):
+        """Flush buffered page writes and let their acknowledgement callbacks run."""
+        await self.db_manager.flush()
+        await asyncio.sleep(0)
+
+    async def _save_checkpoint(self):
+        """Persist the frontier and the seen-ASIN filter when the crawl has an id and something changed.
+
+        Buffered page writes are flushed first, so no product is checkpointed
+        as done before its write is confirmed. The frontier goes before the
+        filter: an ASIN in the filter but missing from the frontier would never
+        be fetched, while the reverse is harmless since frontier ASINs are
+        added back to the dedup set on resume.
+        """
+        if self.crawl_id:
+            await self._settle_writes()
+        if self.crawl_id and self.frontier.dirty:
+            await self.db_manager.save_checkpoint(self.crawl_id, self.frontier.to_document())
+        await self._save_dedup()
+
+    async def _checkpoint_periodically(self):
+        """Save the frontier every checkpoint interval until cancelled."""
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            await self._save_checkpoint()
+
+    def _close_http_cache(self):
+        """Release the HTTP cache files, logging replay hits and misses."""
+        if self.http_cache is None:
+            return
+        if self.http_cache.replaying:
+            self.logger.info(f"Replayed {self.http_cache.hits} responses, {self.http_cache.misses} not recorded")
+        self.http_cache.close()
+
+    def _log_proxy_stats(self, pool: ProxyPool):
+        """Log request counts and health per proxy."""
+        for stats in pool.summary():
+            self.logger.info(
+                f"Proxy {stats['proxy']}: requests={stats['requests']} successes={stats['successes']} "
+                f"bans={stats['bans']} errors={stats['errors']} latency={stats['latency']}s"
+            )
+
+    def _log_worker_stats(self):
+        """Log a summary line per worker."""
+        for stats in self.worker_stats:
+            self.logger.info(
+                f"Worker {stats.worker_id}: processed={stats.processed} "
+                f"succeeded={stats.succeeded} skipped={stats.skipped} failed={stats.failed} "
+                f"busy={stats.busy_seconds:.1f}s"
+            )
+
+    async def run(self, max_pages: int = MAX_PAGES):
+        """Main crawler function.
+
+        ``max_pages`` caps the listing pages read per search URL. When the
+        crawl budget runs out, pages in flight finish, the rest stays in the
+        checkpoint and the run returns normally.
+        """
+        self.logger.info(f"Starting crawler with {self.concurrency} workers")
         total_products = 0
         retry_count = 0
         max_retries = 3
+        # Shared by every attempt, so a retried crawl does not refetch products
+        self.dedup = await self._load_dedup()
+        self.frontier = await self._load_frontier()
+        # Products already in the frontier are requeued from it, never again from a listing page
+        self.dedup.seen.update(self.frontier.products)
+        self.fresh_skipped = 0
+        self.unchanged_pages = 0
+        self.listing_refreshed = 0
+        self.budget_skipped = 0
+        self.budget.start()
+        await self.db_manager.ensure_indexes()
+        if self.listing_refresh:
+            self.logger.info("Listing refresh mode: fetching product pages only for new or changed listings")
+        elif self.incremental:
+            self.logger.info(f"Incremental mode: skipping pages saved within {self.max_age}")
         
         while retry_count < max_retries:
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+            self.worker_stats = [WorkerStats(worker_id=i) for i in range(1, self.concurrency + 1)]
+            workers: List[asyncio.Task] = []
+            checkpointer = asyncio.create_task(self._checkpoint_periodically())
             try:
                 session = await self.create_session()
                 async with session:
-                    # Process each URL
-                    for url_index, base_url in enumerate(self.urls, 1):
-                        self.logger.info(f"Processing URL {url_index}/{len(self.urls)}")
-                        
-                        # Crawl listing pages
-                        for page in range(1, max_pages + 1):
-                            self.logger.info(f"Processing page {page}")
-                            
-                            # Get product links from the page
-                            links = await self.extract_product_links(session, base_url, page)
-                            if not links:
-                                self.logger.info(f"No more products found after page {page}")
-                                break
-                            
-                            # Crawl each product
-                            for link in links:
-                                success = await self.crawl_product(session, link)
-                                if success:
-                                    total_products += 1
-                                await asyncio.sleep(random.uniform(1, 3))  # Random delay between products
-                            
-                            await asyncio.sleep(random.uniform(2, 5))  # Random delay between pages
-                        
-                        # Delay between URLs
-                        if url_index < len(self.urls):
-                            await asyncio.sleep(random.uniform(5, 10))
-                    
-                    self.logger.info(f"Crawling completed. Total products processed: {total_products}")
-                    return
+                    workers = [
+                        asyncio.create_task(self._product_worker(stats.worker_id, session, queue, stats))
+                        for stats in self.worker_stats
+                    ]
+
+                    try:
+                        await self._produce_links(session, queue, max_pages)
+                    except asyncio.CancelledError:
+                        await self._stop_workers(workers)
+                        raise
+
+                    # Graceful shutdown: let the workers finish what is queued, then stop them
+                    await queue.join()
+                    for _ in workers:
+                        await queue.put(None)
+                    await asyncio.gather(*workers)
+                    await self._settle_writes()
+
+                    total_products += sum(stats.succeeded for stats in self.worker_stats)
+                    self._log_worker_stats()
+                    self._log_proxy_stats(session)
+                    break
                     
             except Exception as e:
                 self.logger.error(f"Error in crawler run: {str(e)}")
+                await self._stop_workers(workers)
+                total_products += sum(stats.succeeded for stats in self.worker_stats)
+                self._log_worker_stats()
                 retry_count += 1
+                if self.budget.reason is not None:
+                    break
                 if retry_count < max_retries:
                     delay = 60 * retry_count  # Increase delay with each retry
-                    self.logger.warning(f"Retrying entire crawl in {delay} seconds...")
+                    self.logger.warning(f"Resuming crawl where it stopped in {delay} seconds...")
+                    self.metrics.inc('crawler_backoff_seconds_total', delay, stage='run', reason='crawl_retry')
                     await asyncio.sleep(delay)
                 else:
                     self.logger.error("Max retries reached for crawler run")
                     break
+            finally:
+                checkpointer.cancel()
+                await asyncio.gather(checkpointer, return_exceptions=True)
+                await self._save_checkpoint()
         
-        self.logger.info(f"Crawling completed with {total_products} products processed")
\ No newline at end of file
+        self._shutdown_executor()
+        await self.debug_store.close()
+        self._close_http_cache()
+        self.logger.info(f"Deduplication saved {self.dedup.skipped} repeat product fetches "
+                         f"({len(self.dedup)} unique ASINs)")
+        if self.incremental:
+            self.logger.info(f"Incremental mode skipped {self.fresh_skipped} fresh product pages")
+        self.logger.info(f"{self.unchanged_pages} product pages were unchanged; only metadata was written")
+        if self.listing_refresh:
+            self.logger.info(f"Listing refresh updated {self.listing_refreshed} products without a page fetch")
+        if self.crawl_id:
+            self.logger.info(f"Checkpoint for crawl {self.crawl_id}: {self.frontier.counts()}")
+        if self.budget.reason is not None:
+            self.logger.info(f"Stopped early ({self.budget.reason}) after {self.budget.used} pages; "
+                             f"{self.budget_skipped} queued products left for a resume")
+        self.logger.info(f"Crawling completed with {total_products} products processed")
+
+    async def run_distributed(self, work_queue: WorkQueue, max_pages: int = MAX_PAGES):
+        """Crawl as one node of a distributed crawl, leasing listing and product tasks from a shared queue.
+
+        Any number of processes can run this against the same crawl id; each
+        returns once the queue holds no waiting or leased task.
+        """
+        self.logger.info(f"Joining crawl {work_queue.crawl_id} as {self.node_id} with {self.concurrency} workers")
+        self.fresh_skipped = 0
+        self.unchanged_pages = 0
+        self.listing_refreshed = 0
+        self.budget.start()
+        self.reopened = []
+        await self.db_manager.ensure_indexes()
+        await work_queue.ensure_indexes()
+        # Every node seeds page 1 of each search URL; the task ids make this a no-op after the first
+        await work_queue.enqueue('listing', [listing_task(base_url, 1) for base_url in self.urls])
+
+        self.worker_stats = [WorkerStats(worker_id=i) for i in range(1, self.concurrency + 1)]
+        listing_stats = [WorkerStats(worker_id=i) for i in range(1, self.listing_concurrency + 1)]
+        session = await self.create_session()
+        async with session:
+            workers = [
+                asyncio.create_task(self._queue_worker('product', session, work_queue, stats, max_pages))
+                for stats in self.worker_stats
+            ] + [
+                asyncio.create_task(self._queue_worker('listing', session, work_queue, stats, max_pages))
+                for stats in listing_stats
+            ]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                await self._stop_workers(workers)
+                # A product whose buffered page write failed goes back to the shared queue
+                await self._settle_writes()
+                await asyncio.gather(*self.reopened)
+            self._log_proxy_stats(session)
+
+        self._shutdown_executor()
+        await self.debug_store.close()
+        self._close_http_cache()
+        self._log_worker_stats()
+        self.logger.info(f"Listing pages processed on this node: {sum(s.succeeded for s in listing_stats)}")
+        if self.budget.reason is not None:
+            self.logger.info(f"Left the crawl early ({self.budget.reason}) after {self.budget.used} pages")
+        self.logger.info(f"Work queue for crawl {work_queue.crawl_id}: {await work_queue.stats()}")
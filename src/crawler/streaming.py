@@ -0,0 +1,84 @@
+# src/crawler/streaming.py
+
+import codecs
+import re
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+from ..utils.config import MAX_PAGE_BYTES, STREAM_CHUNK_SIZE
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_:.-]+)', re.IGNORECASE)
+# The charset declaration is looked for this far into the body
+CHARSET_SNIFF_BYTES = 4096
+
+class ResponseTooLargeError(Exception):
+    """Raised when a response body exceeds the page size cap."""
+
+@dataclass
+class StreamedBody:
+    """Decoded body of a streamed response.
+
+    When ``blocked`` is set the read stopped at that block marker and
+    ``content`` holds only the part received up to it.
+    """
+    content: str
+    size: int  # Bytes read, after transfer decompression
+    blocked: Optional[str] = None
+
+def find_marker(text: str, markers: Sequence[Tuple[str, str]]) -> Optional[str]:
+    """Message of the first marker found in ``text``, if any."""
+    for marker, message in markers:
+        if marker in text:
+            return message
+    return None
+
+def response_charset(content_type: str, head: bytes, default: str = 'utf-8') -> str:
+    """Charset from the Content-Type header, else from a <meta> tag near the start of the body."""
+    match = re.search(r'charset=["\']?([^;"\'\s]+)', content_type or '', re.IGNORECASE)
+    candidate = match.group(1) if match else None
+    if candidate is None:
+        meta = META_CHARSET.search(head[:CHARSET_SNIFF_BYTES])
+        candidate = meta.group(1).decode('ascii') if meta else None
+    if candidate:
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            pass
+    return default
+
+async def read_body(response, markers: Sequence[Tuple[str, str]], max_bytes: int = MAX_PAGE_BYTES,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> StreamedBody:
+    """Stream and decode a response body, stopping early at a block marker.
+
+    Each chunk is decoded as it arrives and scanned for ``markers`` (with an
+    overlap, so a marker split across chunks is still found), so a CAPTCHA
+    page costs its first chunk rather than a full download. Raises
+    ResponseTooLargeError once more than ``max_bytes`` have been read. On
+    either early exit the connection is closed instead of being drained.
+    """
+    overlap = max((len(marker) for marker, _ in markers), default=1) - 1
+    decoder = None
+    parts = []
+    tail = ''
+    size = 0
+    async for chunk in response.content.iter_chunked(chunk_size):
+        size += len(chunk)
+        if size > max_bytes:
+            response.close()
+            raise ResponseTooLargeError(f"Response exceeds {max_bytes} bytes")
+        if decoder is None:
+            # Undecodable bytes are replaced rather than failing the whole page
+            encoding = response_charset(response.headers.get('Content-Type', ''), chunk)
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        text = decoder.decode(chunk)
+        parts.append(text)
+        window = tail + text
+        blocked = find_marker(window, markers)
+        if blocked is not None:
+            response.close()
+            return StreamedBody(''.join(parts), size, blocked)
+        tail = window[-overlap:] if overlap else ''
+    if decoder is not None:
+        parts.append(decoder.decode(b'', final=True))
+    return StreamedBody(''.join(parts), size)
@@ -1,42 +1,200 @@
 # src/database/db_manager.py
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, List, Tuple
+import asyncio
 import logging
-from ..utils.config import MONGODB_URI, DATABASE_NAME, COLLECTION_NAME
+from .price_history import PriceHistory
+from ..utils.compression import compress_html, decompress_html, load_zstd_dictionary
+from ..utils.config import (
+    MONGODB_URI, DATABASE_NAME, COLLECTION_NAME, BULK_WRITE_SIZE, BULK_FLUSH_INTERVAL,
+    HTML_COMPRESSION, HTML_COMPRESSION_LEVEL, ZSTD_DICT_PATH
+)
 
 class DatabaseManager:
-    def __init__(self, connection_string: str = MONGODB_URI):
+    def __init__(self, connection_string: str = MONGODB_URI,
+                 bulk_size: int = BULK_WRITE_SIZE,
+                 flush_interval: float = BULK_FLUSH_INTERVAL,
+                 compression: Optional[str] = HTML_COMPRESSION,
+                 compression_level: Optional[int] = HTML_COMPRESSION_LEVEL,
+                 zstd_dict_path: Optional[str] = ZSTD_DICT_PATH):
         self.client = AsyncIOMotorClient(connection_string)
         self.db = self.client[DATABASE_NAME]
         self.collection = self.db[COLLECTION_NAME]
+        self.seen_collection = self.db[f"{COLLECTION_NAME}_seen"]
+        self.checkpoint_collection = self.db[f"{COLLECTION_NAME}_checkpoints"]
+        self.task_collection = self.db[f"{COLLECTION_NAME}_tasks"]
         self.logger = logging.getLogger('DatabaseManager')
+
+        # Price, rating and review count per ASIN over time; metadata on the page document is overwritten
+        self.price_history = PriceHistory(self.db, f"{COLLECTION_NAME}_price_history",
+                                          bulk_size=bulk_size, flush_interval=flush_interval)
+
+        # Write-behind buffer: upserts are grouped into unordered bulk writes.
+        # Writers do not wait for their batch; each gets a future that
+        # resolves to whether its own write was acknowledged.
+        self.bulk_size = bulk_size
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[UpdateOne, str, asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.Task] = None
+
+        # Opt-in compressed storage of html_content
+        self.compression = compression
+        self.compression_level = compression_level
+        self.zstd_dict_id = load_zstd_dictionary(zstd_dict_path) if compression == 'zstd' and zstd_dict_path else None
         
-    async def save_raw_data(self, url: str, html_content: str, metadata: Dict[str, Any]) -> bool:
-        """Save raw HTML content with metadata to MongoDB."""
+    async def ensure_indexes(self):
+        """Create the indexes used for URL lookups and freshness checks."""
         try:
-            result = await self.collection.update_one(
-                {"url": url},
-                {
-                    "$set": {
-                        "html_content": html_content,
-                        "metadata": metadata,
-                        "last_updated": datetime.utcnow()
-                    }
-                },
-                upsert=True
-            )
-            return bool(result.acknowledged)
-            
+            # Compound index covers both plain URL lookups and the url/last_updated freshness query
+            await self.collection.create_index([("url", 1), ("last_updated", 1)])
+            await self.collection.create_index("last_updated")
+        except Exception as e:
+            self.logger.error(f"Error creating indexes: {str(e)}")
+        await self.price_history.ensure_collection()
+
+    async def save_raw_data(self, url: str, html_content: str, metadata: Dict[str, Any],
+                            content_hash: Optional[str] = None,
+                            listing: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """Save raw HTML content with metadata to MongoDB.
+
+        Returns once the write is buffered, with a future that resolves to
+        True when the write is acknowledged and False when it failed.
+        """
+        now = datetime.utcnow()
+        encoded = await self._encode_html(html_content)
+        update: Dict[str, Any] = {
+            "$set": {
+                **encoded,
+                "metadata": metadata,
+                "content_hash": content_hash,
+                "html_updated": now,
+                "last_updated": now
+            }
+        }
+        if listing is not None:
+            update["$set"]["listing"] = listing
+        if not self.compression:
+            # A plain string replaces any earlier compressed copy, so drop its marker
+            update["$unset"] = {"html_codec": "", "html_dict_id": "", "html_size": ""}
+        elif "html_dict_id" not in encoded:
+            # Compressed without a dictionary; a stale id would make decompression fail
+            update["$unset"] = {"html_dict_id": ""}
+        operation = UpdateOne({"url": url}, update, upsert=True)
+        return await self._write_with_history(operation, url, metadata, now)
+
+    async def touch_raw_data(self, url: str, metadata: Dict[str, Any],
+                             listing: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """Refresh metadata and last_updated of a page whose content has not changed.
+
+        Returns the write's acknowledgement future, like save_raw_data.
+        """
+        now = datetime.utcnow()
+        fields: Dict[str, Any] = {"metadata": metadata, "last_updated": now}
+        if listing is not None:
+            fields["listing"] = listing
+        operation = UpdateOne({"url": url}, {"$set": fields})
+        return await self._write_with_history(operation, url, metadata, now)
+
+    async def update_listing(self, url: str, listing: Dict[str, Any]) -> asyncio.Future:
+        """Store price and availability read from a search results card for a known page.
+
+        Returns the write's acknowledgement future, like save_raw_data.
+        """
+        operation = UpdateOne({"url": url}, {"$set": {"listing": listing}})
+        return await self._write(operation, url)
+
+    async def _encode_html(self, html_content: str) -> Dict[str, Any]:
+        """Build the html_content fields, compressing off the event loop when enabled."""
+        if not self.compression:
+            return {"html_content": html_content}
+        return await asyncio.to_thread(
+            compress_html, html_content, self.compression, self.compression_level, self.zstd_dict_id
+        )
+
+    async def _write_with_history(self, operation: UpdateOne, url: str,
+                                  metadata: Dict[str, Any], now: datetime) -> asyncio.Future:
+        """Write a page and append its metadata to the price history if it changed."""
+        acked = await self._write(operation, url)
+        await self.price_history.record(metadata.get("asin"), metadata, now)
+        return acked
+
+    async def _write(self, operation: UpdateOne, url: str) -> asyncio.Future:
+        """Buffer a write and return its acknowledgement future; only a full buffer makes the caller wait."""
+        future = asyncio.get_running_loop().create_future()
+        if self.bulk_size <= 1:
+            future.set_result(await self._write_one(operation, url))
+            return future
+
+        self._pending.append((operation, url, future))
+        if len(self._pending) >= self.bulk_size:
+            await self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_later())
+        return future
+
+    async def _write_one(self, operation: UpdateOne, url: str) -> bool:
+        """Apply a single write without buffering."""
+        try:
+            result = await self.collection.bulk_write([operation], ordered=False)
+            if result.acknowledged:
+                return True
+            self.logger.error(f"Error saving data for {url}: write not acknowledged")
         except Exception as e:
             self.logger.error(f"Error saving data for {url}: {str(e)}")
-            return False
-            
+        return False
+
+    async def _flush_later(self):
+        """Flush the buffer once the flush interval has passed."""
+        await asyncio.sleep(self.flush_interval)
+        self._flush_timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Send all buffered writes as one unordered bulk write.
+
+        Every write's future is resolved, to False for writes that were not
+        confirmed, including when the bulk write itself is cancelled.
+        """
+        if self._flush_timer is not None and self._flush_timer is not asyncio.current_task():
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Until the server answers, the whole batch counts as failed
+        failed: Dict[int, str] = {index: "write interrupted" for index in range(len(batch))}
+        try:
+            result = await self.collection.bulk_write([op for op, _, _ in batch], ordered=False)
+            if result.acknowledged:
+                failed = {}
+            else:
+                failed = {index: "write not acknowledged" for index in range(len(batch))}
+        except BulkWriteError as e:
+            # Unordered: everything except the reported indexes was applied
+            failed = {err["index"]: err.get("errmsg", "") for err in e.details.get("writeErrors", [])}
+        except Exception as e:
+            self.logger.error(f"Error flushing {len(batch)} writes: {str(e)}")
+            failed = {index: str(e) for index in range(len(batch))}
+        finally:
+            for index, (_, url, future) in enumerate(batch):
+                if index in failed:
+                    self.logger.error(f"Error saving data for {url}: {failed[index]}")
+                if not future.done():
+                    future.set_result(index not in failed)
+
     async def get_raw_data(self, url: str) -> Optional[Dict[str, Any]]:
-        """Retrieve raw data for a specific URL."""
+        """Retrieve raw data for a specific URL, with html_content decompressed."""
         try:
-            return await self.collection.find_one({"url": url})
+            doc = await self.collection.find_one({"url": url})
+            if doc is not None:
+                doc["html_content"] = decompress_html(doc)
+            return doc
         except Exception as e:
             self.logger.error(f"Error retrieving data for {url}: {str(e)}")
             return None
@@ -53,15 +211,127 @@ class DatabaseManager:
             self.logger.error(f"Error cleaning up old data: {str(e)}")
             return 0
 
+    async def get_url_states(self, urls: List[str], batch_size: int = 500) -> Dict[str, Dict[str, Any]]:
+        """Return last_updated, content_hash and listing data for the stored pages among ``urls``, keyed by URL."""
+        states: Dict[str, Dict[str, Any]] = {}
+        try:
+            for start in range(0, len(urls), batch_size):
+                cursor = self.collection.find(
+                    {"url": {"$in": urls[start:start + batch_size]}},
+                    {"url": 1, "last_updated": 1, "content_hash": 1, "listing": 1, "_id": 0}
+                )
+                async for doc in cursor:
+                    states[doc["url"]] = doc
+        except Exception as e:
+            self.logger.error(f"Error loading URL state: {str(e)}")
+        return states
+
+    async def iter_url_state(self, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the url, last_updated and content_hash of every stored page, one cursor batch at a time."""
+        cursor = self.collection.find(
+            {}, {"url": 1, "last_updated": 1, "content_hash": 1, "_id": 0}, batch_size=batch_size
+        )
+        async for doc in cursor:
+            yield doc
+
     async def get_all_urls(self) -> list:
-        """Get all URLs in the database."""
+        """Get all URLs in the database.
+
+        Deprecated: this holds every URL in memory; iterate iter_url_state instead.
+        """
         try:
-            cursor = self.collection.find({}, {"url": 1})
-            return [doc["url"] async for doc in cursor]
+            return [doc["url"] async for doc in self.iter_url_state()]
         except Exception as e:
             self.logger.error(f"Error retrieving URLs: {str(e)}")
             return []
 
+    async def migrate_html_compression(self, batch_size: int = 100) -> int:
+        """Compress html_content of stored documents that are not yet in the configured codec."""
+        if not self.compression:
+            raise ValueError("Set a compression codec before migrating")
+
+        migrated = 0
+        batch: List[UpdateOne] = []
+        cursor = self.collection.find(
+            {"html_codec": {"$ne": self.compression}, "html_content": {"$exists": True}},
+            {"html_content": 1, "html_codec": 1, "html_dict_id": 1},
+            batch_size=batch_size
+        )
+        async for doc in cursor:
+            html_content = decompress_html(doc)
+            if html_content is None:
+                continue
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": await self._encode_html(html_content)}))
+            if len(batch) >= batch_size:
+                migrated += await self._apply_migration_batch(batch)
+                batch = []
+        if batch:
+            migrated += await self._apply_migration_batch(batch)
+        return migrated
+
+    async def _apply_migration_batch(self, batch: List[UpdateOne]) -> int:
+        """Write one batch of migrated documents, returning how many changed."""
+        try:
+            result = await self.collection.bulk_write(batch, ordered=False)
+            self.logger.info(f"Compressed {result.modified_count} stored pages")
+            return result.modified_count
+        except Exception as e:
+            self.logger.error(f"Error migrating batch of {len(batch)} pages: {str(e)}")
+            return 0
+
+    async def load_seen_filter(self, crawl_id: str) -> Optional[Dict[str, Any]]:
+        """Load the persisted seen-ASIN filter for a crawl."""
+        try:
+            return await self.seen_collection.find_one({"_id": crawl_id})
+        except Exception as e:
+            self.logger.error(f"Error loading seen filter for {crawl_id}: {str(e)}")
+            return None
+
+    async def save_seen_filter(self, crawl_id: str, filter_doc: Dict[str, Any]) -> bool:
+        """Store the seen-ASIN filter for a crawl next to the raw pages."""
+        try:
+            result = await self.seen_collection.replace_one(
+                {"_id": crawl_id},
+                {**filter_doc, "last_updated": datetime.utcnow()},
+                upsert=True
+            )
+            return bool(result.acknowledged)
+        except Exception as e:
+            self.logger.error(f"Error saving seen filter for {crawl_id}: {str(e)}")
+            return False
+
+    async def load_checkpoint(self, crawl_id: str) -> Optional[Dict[str, Any]]:
+        """Load the saved frontier of a crawl."""
+        try:
+            return await self.checkpoint_collection.find_one({"_id": crawl_id})
+        except Exception as e:
+            self.logger.error(f"Error loading checkpoint for {crawl_id}: {str(e)}")
+            return None
+
+    async def latest_checkpoint_id(self) -> Optional[str]:
+        """Crawl id of the most recently saved checkpoint."""
+        try:
+            doc = await self.checkpoint_collection.find_one({}, {"_id": 1}, sort=[("last_updated", -1)])
+            return doc["_id"] if doc else None
+        except Exception as e:
+            self.logger.error(f"Error finding latest checkpoint: {str(e)}")
+            return None
+
+    async def save_checkpoint(self, crawl_id: str, checkpoint: Dict[str, Any]) -> bool:
+        """Store the frontier of a crawl, replacing the previous checkpoint."""
+        try:
+            result = await self.checkpoint_collection.replace_one(
+                {"_id": crawl_id},
+                {**checkpoint, "last_updated": datetime.utcnow()},
+                upsert=True
+            )
+            return bool(result.acknowledged)
+        except Exception as e:
+            self.logger.error(f"Error saving checkpoint for {crawl_id}: {str(e)}")
+            return False
+
     async def close(self):
-        """Close database connection."""
+        """Flush buffered writes and close database connection."""
+        await self.flush()
+        await self.price_history.flush()
         self.client.close()
\ No newline at end of file
@@ -0,0 +1,193 @@
+# src/database/price_history.py
+
+from pymongo.errors import CollectionInvalid, OperationFailure
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, Optional, List, Tuple
+import asyncio
+import logging
+import re
+from ..utils.config import BULK_WRITE_SIZE, BULK_FLUSH_INTERVAL
+
+# (price in paise, rating, review count); the values compared to decide whether a point is written
+Snapshot = Tuple[Optional[int], Optional[float], Optional[int]]
+
+NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+def price_to_paise(text: Optional[str]) -> Optional[int]:
+    """'₹54,990.00' or '54,990' as an integer number of paise."""
+    match = NUMBER.search(text or '')
+    if not match:
+        return None
+    try:
+        return int(Decimal(match.group().replace(',', '')) * 100)
+    except InvalidOperation:
+        return None
+
+def parse_rating(text: Optional[str]) -> Optional[float]:
+    """'4.2 out of 5 stars' as 4.2."""
+    match = NUMBER.search(text or '')
+    return float(match.group().replace(',', '')) if match else None
+
+def parse_count(text: Optional[str]) -> Optional[int]:
+    """'1,234 ratings' as 1234."""
+    match = NUMBER.search(text or '')
+    return int(float(match.group().replace(',', ''))) if match else None
+
+def snapshot_of(metadata: Dict[str, Any]) -> Snapshot:
+    """Compact values of a product's scraped price, rating and review count."""
+    return (price_to_paise(metadata.get('price')),
+            parse_rating(metadata.get('rating')),
+            parse_count(metadata.get('num_reviews')))
+
+class PriceHistory:
+    """Append-only per-ASIN price, rating and review-count history.
+
+    Points live in a MongoDB time-series collection (``asin`` is the meta
+    field, so each ASIN's points share compressed buckets) and are written
+    only when a value differs from the ASIN's last point. Each point also
+    carries the previous price, so drops over a window need no self-join.
+    Writes are buffered and sent with insert_many, like the raw page writes,
+    and callers do not wait for them; a failed batch is logged.
+    """
+
+    def __init__(self, db, name: str,
+                 bulk_size: int = BULK_WRITE_SIZE,
+                 flush_interval: float = BULK_FLUSH_INTERVAL):
+        self.db = db
+        self.name = name
+        self.collection = db[name]
+        self.bulk_size = bulk_size
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger('PriceHistory')
+        # Last written snapshot per ASIN, loaded from the collection on first sight
+        self.latest: Dict[str, Snapshot] = {}
+        self._pending: List[Tuple[str, datetime, Snapshot]] = []
+        self._flush_timer: Optional[asyncio.Task] = None
+
+    async def ensure_collection(self):
+        """Create the time-series collection and its indexes.
+
+        Servers without time-series support (before MongoDB 5.0) get a plain
+        collection with the same indexes.
+        """
+        try:
+            await self.db.create_collection(
+                self.name, timeseries={"timeField": "ts", "metaField": "asin", "granularity": "hours"}
+            )
+        except CollectionInvalid:
+            pass  # Already exists
+        except OperationFailure as e:
+            self.logger.warning(f"Time-series collections unavailable, using a plain collection: {str(e)}")
+        try:
+            # "History of ASIN X" and the per-batch latest-point lookup
+            await self.collection.create_index([("asin", 1), ("ts", -1)])
+            # "Biggest drops in the last N hours" scans a time range across ASINs
+            await self.collection.create_index([("ts", -1)])
+        except Exception as e:
+            self.logger.error(f"Error creating price history indexes: {str(e)}")
+
+    async def record(self, asin: Optional[str], metadata: Dict[str, Any],
+                     at: Optional[datetime] = None):
+        """Queue a snapshot of a product's metadata; it is written only if it changed.
+
+        Only a full buffer makes the caller wait, for its flush.
+        """
+        snapshot = snapshot_of(metadata)
+        if not asin or snapshot == (None, None, None) or self.latest.get(asin) == snapshot:
+            return
+        self._pending.append((asin, at or datetime.utcnow(), snapshot))
+        if len(self._pending) >= self.bulk_size:
+            await self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        """Flush the buffer once the flush interval has passed."""
+        await asyncio.sleep(self.flush_interval)
+        self._flush_timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Write the buffered snapshots that differ from each ASIN's last point.
+
+        If the write fails or is cancelled, the cached last points of the
+        batch's ASINs are dropped, so they are reloaded from the collection.
+        """
+        if self._flush_timer is not None and self._flush_timer is not asyncio.current_task():
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        written = False
+        asins = {asin for asin, _, _ in batch}
+        try:
+            await self._load_latest([asin for asin in asins if asin not in self.latest])
+            points = []
+            for asin, at, snapshot in batch:
+                previous = self.latest.get(asin)
+                if previous == snapshot:
+                    continue
+                price, rating, reviews = snapshot
+                points.append({
+                    "ts": at, "asin": asin, "price": price, "rating": rating, "reviews": reviews,
+                    "prev_price": previous[0] if previous else None
+                })
+                self.latest[asin] = snapshot
+            if points:
+                await self.collection.insert_many(points, ordered=False)
+            written = True
+        except Exception as e:
+            self.logger.error(f"Error writing {len(batch)} price history points: {str(e)}")
+        finally:
+            if not written:
+                # Reload from the collection next time instead of trusting the cache
+                for asin in asins:
+                    self.latest.pop(asin, None)
+
+    async def _load_latest(self, asins: List[str]):
+        """Cache the last stored snapshot of each ASIN, in one query."""
+        if not asins:
+            return
+        pipeline = [
+            {"$match": {"asin": {"$in": asins}}},
+            {"$sort": {"asin": 1, "ts": -1}},
+            {"$group": {"_id": "$asin", "price": {"$first": "$price"},
+                        "rating": {"$first": "$rating"}, "reviews": {"$first": "$reviews"}}}
+        ]
+        async for doc in self.collection.aggregate(pipeline):
+            self.latest[doc["_id"]] = (doc["price"], doc["rating"], doc["reviews"])
+
+    async def history(self, asin: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Points recorded for an ASIN, oldest first."""
+        query: Dict[str, Any] = {"asin": asin}
+        if since is not None:
+            query["ts"] = {"$gte": since}
+        cursor = self.collection.find(query, {"_id": 0}).sort("ts", 1)
+        return await cursor.to_list(length=None)
+
+    async def biggest_drops(self, hours: float = 24, limit: int = 20,
+                            now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """ASINs whose price fell most within the last ``hours``, largest drop in paise first.
+
+        A drop runs from the price before the window to the latest price in
+        it; products with no price at either end are left out.
+        """
+        since = (now or datetime.utcnow()) - timedelta(hours=hours)
+        pipeline = [
+            {"$match": {"ts": {"$gte": since}}},
+            {"$sort": {"asin": 1, "ts": 1}},
+            {"$group": {"_id": "$asin", "before": {"$first": "$prev_price"},
+                        "price": {"$last": "$price"}, "ts": {"$last": "$ts"}}},
+            {"$match": {"before": {"$ne": None}, "price": {"$ne": None}}},
+            {"$project": {"_id": 0, "asin": "$_id", "before": 1, "price": 1, "ts": 1,
+                          "drop": {"$subtract": ["$before", "$price"]}}},
+            {"$match": {"drop": {"$gt": 0}}},
+            {"$addFields": {"drop_pct": {"$round": [{"$multiply": [{"$divide": ["$drop", "$before"]}, 100]}, 1]}}},
+            {"$sort": {"drop": -1}},
+            {"$limit": limit}
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=None)
@@ -0,0 +1,187 @@
+# src/database/work_queue.py
+
+from pymongo import ReturnDocument, UpdateOne
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Tuple
+import hashlib
+import logging
+from ..utils.config import WORK_QUEUE_VISIBILITY_TIMEOUT, WORK_QUEUE_MAX_ATTEMPTS, WORK_QUEUE_RETRY_DELAY
+
+READY = 'ready'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+
+def task_id(crawl_id: str, kind: str, url: str) -> str:
+    """Deterministic task id, so every node enqueueing the same URL hits the same document."""
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=12).hexdigest()
+    return f"{crawl_id}:{kind}:{digest}"
+
+class WorkQueue:
+    """Task queue in a MongoDB collection, shared by crawler processes on any number of hosts.
+
+    A task is leased atomically with find_one_and_update and stays invisible
+    to other workers until its lease expires. The owner acks it when done or
+    nacks it to make it available again after a delay; a task leased
+    ``max_attempts`` times without an ack is marked dead. Task ids are derived
+    from the URL, so a URL is queued once per crawl however many nodes find it.
+    """
+
+    def __init__(self, collection, crawl_id: str,
+                 visibility_timeout: float = WORK_QUEUE_VISIBILITY_TIMEOUT,
+                 max_attempts: int = WORK_QUEUE_MAX_ATTEMPTS,
+                 retry_delay: float = WORK_QUEUE_RETRY_DELAY):
+        self.collection = collection
+        self.crawl_id = crawl_id
+        self.visibility_timeout = timedelta(seconds=visibility_timeout)
+        self.max_attempts = max_attempts
+        self.retry_delay = timedelta(seconds=retry_delay)
+        self.logger = logging.getLogger('WorkQueue')
+
+    async def ensure_indexes(self):
+        """Create the indexes used to lease tasks and reap expired leases."""
+        try:
+            await self.collection.create_index([("crawl_id", 1), ("kind", 1), ("status", 1), ("available_at", 1)])
+            await self.collection.create_index([("crawl_id", 1), ("status", 1), ("lease_expires", 1)])
+        except Exception as e:
+            self.logger.error(f"Error creating work queue indexes: {str(e)}")
+
+    async def enqueue(self, kind: str, items: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """Add (url, payload) tasks of one kind; URLs already queued in this crawl are left as they are."""
+        if not items:
+            return 0
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": task_id(self.crawl_id, kind, url)},
+                {"$setOnInsert": {
+                    "crawl_id": self.crawl_id,
+                    "kind": kind,
+                    "url": url,
+                    "payload": payload,
+                    "status": READY,
+                    "attempts": 0,
+                    "available_at": now,
+                    "created": now
+                }},
+                upsert=True
+            )
+            for url, payload in items
+        ]
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            return result.upserted_count
+        except Exception as e:
+            self.logger.error(f"Error enqueueing {len(items)} {kind} tasks: {str(e)}")
+            return 0
+
+    async def lease(self, kind: str, owner: str) -> Optional[Dict[str, Any]]:
+        """Claim the next available task of a kind, or return None when there is none."""
+        now = datetime.utcnow()
+        try:
+            return await self.collection.find_one_and_update(
+                {
+                    "crawl_id": self.crawl_id,
+                    "kind": kind,
+                    "attempts": {"$lt": self.max_attempts},
+                    "$or": [
+                        {"status": READY, "available_at": {"$lte": now}},
+                        {"status": LEASED, "lease_expires": {"$lt": now}}
+                    ]
+                },
+                {
+                    "$set": {"status": LEASED, "lease_owner": owner, "lease_expires": now + self.visibility_timeout},
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("available_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            self.logger.error(f"Error leasing {kind} task: {str(e)}")
+            return None
+
+    async def extend(self, task: Dict[str, Any], owner: str) -> bool:
+        """Push the lease expiry of a task still being worked on; False if the lease was lost."""
+        try:
+            result = await self.collection.update_one(
+                {"_id": task["_id"], "status": LEASED, "lease_owner": owner},
+                {"$set": {"lease_expires": datetime.utcnow() + self.visibility_timeout}}
+            )
+            return result.matched_count == 1
+        except Exception as e:
+            self.logger.error(f"Error extending lease on {task['url']}: {str(e)}")
+            return False
+
+    async def ack(self, task: Dict[str, Any], owner: str) -> bool:
+        """Mark a leased task done."""
+        try:
+            result = await self.collection.update_one(
+                {"_id": task["_id"], "status": LEASED, "lease_owner": owner},
+                {"$set": {"status": DONE, "finished": datetime.utcnow()}, "$unset": {"lease_expires": ""}}
+            )
+            if result.matched_count != 1:
+                self.logger.warning(f"Lease on {task['url']} expired before it was acked")
+            return result.matched_count == 1
+        except Exception as e:
+            self.logger.error(f"Error acking {task['url']}: {str(e)}")
+            return False
+
+    async def nack(self, task: Dict[str, Any], owner: str) -> bool:
+        """Release a failed task for a later retry, or mark it dead when out of attempts."""
+        now = datetime.utcnow()
+        if task["attempts"] >= self.max_attempts:
+            fields = {"status": DEAD, "finished": now}
+        else:
+            fields = {"status": READY, "available_at": now + self.retry_delay}
+        try:
+            result = await self.collection.update_one(
+                {"_id": task["_id"], "status": LEASED, "lease_owner": owner},
+                {"$set": fields, "$unset": {"lease_expires": ""}}
+            )
+            return result.matched_count == 1
+        except Exception as e:
+            self.logger.error(f"Error releasing {task['url']}: {str(e)}")
+            return False
+
+    async def reopen(self, kind: str, url: str) -> bool:
+        """Make a finished or leased task available again, e.g. when its result could not be stored."""
+        try:
+            result = await self.collection.update_one(
+                {"_id": task_id(self.crawl_id, kind, url), "status": {"$in": [LEASED, DONE]}},
+                {"$set": {"status": READY, "available_at": datetime.utcnow() + self.retry_delay},
+                 "$unset": {"lease_expires": "", "finished": ""}}
+            )
+            return result.matched_count == 1
+        except Exception as e:
+            self.logger.error(f"Error reopening {url}: {str(e)}")
+            return False
+
+    async def is_drained(self) -> bool:
+        """True when no task of this crawl is waiting or leased, after reaping abandoned leases."""
+        try:
+            await self.collection.update_many(
+                {"crawl_id": self.crawl_id, "status": LEASED,
+                 "lease_expires": {"$lt": datetime.utcnow()}, "attempts": {"$gte": self.max_attempts}},
+                {"$set": {"status": DEAD, "finished": datetime.utcnow()}}
+            )
+            remaining = await self.collection.count_documents(
+                {"crawl_id": self.crawl_id, "status": {"$in": [READY, LEASED]}}, limit=1
+            )
+            return remaining == 0
+        except Exception as e:
+            self.logger.error(f"Error checking work queue: {str(e)}")
+            return False
+
+    async def stats(self) -> Dict[str, int]:
+        """Number of tasks per status in this crawl."""
+        counts = {READY: 0, LEASED: 0, DONE: 0, DEAD: 0}
+        try:
+            cursor = self.collection.aggregate([
+                {"$match": {"crawl_id": self.crawl_id}},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ])
+            async for doc in cursor:
+                counts[doc["_id"]] = doc["count"]
+        except Exception as e:
+            self.logger.error(f"Error reading work queue stats: {str(e)}")
+        return counts
@@ -0,0 +1,73 @@
+# src/utils/compression.py
+
+import zlib
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+CODECS = ('zlib', 'zstd')
+
+# Trained zstd dictionaries by dict id, needed again to decompress
+_zstd_dicts: Dict[int, Any] = {}
+
+def _require_zstd():
+    """Fail with a clear message when zstd is requested but not installed."""
+    if zstandard is None:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+
+def load_zstd_dictionary(path: str) -> int:
+    """Load a trained zstd dictionary from disk and register it; returns its id."""
+    _require_zstd()
+    with open(path, 'rb') as f:
+        dictionary = zstandard.ZstdCompressionDict(f.read())
+    dict_id = dictionary.dict_id()
+    _zstd_dicts[dict_id] = dictionary
+    return dict_id
+
+def train_zstd_dictionary(samples: List[str], size: int = 112_640) -> bytes:
+    """Train a zstd dictionary from sample pages; save the bytes and load them with load_zstd_dictionary."""
+    _require_zstd()
+    dictionary = zstandard.train_dictionary(size, [sample.encode('utf-8') for sample in samples])
+    return dictionary.as_bytes()
+
+def compress_html(html: str, codec: str, level: Optional[int] = None,
+                  dict_id: Optional[int] = None) -> Dict[str, Any]:
+    """Compress HTML and return the document fields to store, including the codec marker."""
+    raw = html.encode('utf-8')
+    fields: Dict[str, Any] = {"html_codec": codec, "html_size": len(raw)}
+
+    if codec == 'zlib':
+        fields["html_content"] = zlib.compress(raw, 6 if level is None else level)
+    elif codec == 'zstd':
+        _require_zstd()
+        params = {"level": 3 if level is None else level}
+        if dict_id is not None:
+            params["dict_data"] = _zstd_dicts[dict_id]
+            fields["html_dict_id"] = dict_id
+        fields["html_content"] = zstandard.ZstdCompressor(**params).compress(raw)
+    else:
+        raise ValueError(f"Unknown HTML codec: {codec}")
+    return fields
+
+def decompress_html(doc: Dict[str, Any]) -> Optional[str]:
+    """Return the HTML of a raw page document, decompressing it if it carries a codec marker."""
+    content = doc.get('html_content')
+    codec = doc.get('html_codec')
+    if content is None or codec is None:
+        return content
+
+    if codec == 'zlib':
+        raw = zlib.decompress(content)
+    elif codec == 'zstd':
+        _require_zstd()
+        dict_id = doc.get('html_dict_id')
+        if dict_id is not None and dict_id not in _zstd_dicts:
+            raise RuntimeError(f"zstd dictionary {dict_id} is not loaded")
+        params = {"dict_data": _zstd_dicts[dict_id]} if dict_id is not None else {}
+        raw = zstandard.ZstdDecompressor(**params).decompress(content)
+    else:
+        raise ValueError(f"Unknown HTML codec: {codec}")
+    return raw.decode('utf-8')
@@ -0,0 +1,164 @@
+# src/utils/metrics.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Sequence, Tuple
+
+from aiohttp import web
+
+# Upper bounds in seconds for latency histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs, each count including every lower bucket."""
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            buckets.append(('+Inf' if bound == float('inf') else repr(bound), total))
+        return buckets
+
+class Metrics:
+    """In-process counters and histograms keyed by name and labels.
+
+    Updating a metric is a dict lookup and an addition, so the crawler can
+    record every request. Read it out with ``render_prometheus`` or
+    ``snapshot``.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        """Add to a counter."""
+        series = self.counters.setdefault(name, {})
+        key = tuple(labels.items())
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        """Record a value (usually seconds) in a histogram."""
+        series = self.histograms.setdefault(name, {})
+        key = tuple(labels.items())
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def timer(self, name: str, **labels: str) -> '_Timer':
+        """Context manager observing the elapsed time of its block."""
+        return _Timer(self, name, labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable view of every series."""
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "counters": {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self.counters.items()
+            },
+            "histograms": {
+                name: [
+                    {"labels": dict(key), "count": h.count, "sum": round(h.sum, 6),
+                     "buckets": dict(h.cumulative())}
+                    for key, h in series.items()
+                ]
+                for name, series in self.histograms.items()
+            }
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                for le, count in h.cumulative():
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', le),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {h.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics: Metrics, name: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+def _format_labels(key: Labels) -> str:
+    if not key:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+def write_snapshot(metrics: Metrics, path: str):
+    """Write a JSON snapshot atomically, so readers never see a partial file."""
+    _write_json(metrics.snapshot(), path)
+
+def _write_json(data: Dict[str, Any], path: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+async def write_snapshots(metrics: Metrics, path: str, interval: float):
+    """Write a JSON snapshot every ``interval`` seconds until cancelled, and once more on the way out."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            # Taken on the loop, so the series cannot change while they are serialized
+            await asyncio.to_thread(_write_json, metrics.snapshot(), path)
+    finally:
+        write_snapshot(metrics, path)
+
+async def serve_metrics(metrics: Metrics, host: str = '0.0.0.0', port: int = 9100):
+    """Serve /metrics in Prometheus text format; returns the runner to clean up."""
+    async def handle(request):
+        return web.Response(text=metrics.render_prometheus(), content_type='text/plain')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.getLogger('Metrics').info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,211 @@
+# src/utils/profiling.py
+
+import asyncio
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Dict, List, Optional
+
+# Allocation sites are attributed to the first stage whose pattern appears in a frame's file name
+STAGE_PATTERNS = [
+    ('parse', ('/bs4/', '/lxml/', 'page_parser.py', 'listing_extractor.py')),
+    ('db', ('/motor/', '/pymongo/', '/bson/', 'db_manager.py', 'work_queue.py')),
+    ('fetch', ('/aiohttp/', '/yarl/', '/multidict/', 'proxy_pool.py', 'http_cache.py')),
+    ('crawler', ('raw_crawler.py', 'checkpoint.py', 'dedup.py')),
+]
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def thread_stack(frame: Optional[FrameType]) -> List[str]:
+    """Labels of a thread's frames, outermost first."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+def await_stack(task: asyncio.Task) -> List[str]:
+    """Labels along a task's chain of awaited coroutines, outermost first."""
+    labels = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        labels.append(frame_label(frame))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return labels
+
+def stage_of(traceback: tracemalloc.Traceback) -> str:
+    """Stage of an allocation, from the innermost frame that belongs to a known stage."""
+    # Traceback frames run from the oldest call to the allocating frame
+    for frame in reversed(traceback):
+        for stage, patterns in STAGE_PATTERNS:
+            if any(pattern in frame.filename for pattern in patterns):
+                return stage
+    return 'other'
+
+class CrawlProfiler:
+    """Profiles a bounded crawl and writes the results to a directory.
+
+    - ``loop.pstats``: cProfile of the event loop thread (wall clock).
+    - ``wall.collapsed`` / ``cpu.collapsed``: sampled stacks of every thread,
+      weighted by wall time and by that thread's CPU time, in microseconds.
+    - ``tasks.collapsed``: sampled await chains of every asyncio task, i.e.
+      what each coroutine is waiting on, weighted by wall time.
+    - ``peak.tracemalloc`` and ``memory.txt``: tracemalloc snapshot at the
+      peak, with traced memory broken down by stage.
+
+    Collapsed files feed straight into flamegraph.pl or speedscope. Only this
+    process is visible, so parsing should run on a thread pool while profiling.
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.01, snapshot_growth: float = 1.2,
+                 snapshot_interval: float = 1.0, tracemalloc_frames: int = 16):
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.snapshot_growth = snapshot_growth
+        self.snapshot_interval = snapshot_interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.logger = logging.getLogger('CrawlProfiler')
+
+        self.wall: Counter = Counter()
+        self.cpu: Counter = Counter()
+        self.tasks: Counter = Counter()
+        self.samples = 0
+        self.peak_bytes = 0
+        self.peak_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_bytes = 0
+        self._snapshot_at = 0.0
+        self._cpu_seen: Dict[int, float] = {}
+        self._profile = cProfile.Profile()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def __enter__(self) -> 'CrawlProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.write()
+        return False
+
+    def start(self):
+        """Start profiling; call from the event loop thread."""
+        self._loop = asyncio.get_running_loop()
+        tracemalloc.start(self.tracemalloc_frames)
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+        self._sampler.start()
+        self._profile.enable()
+
+    def stop(self):
+        """Stop sampling and tracing."""
+        self._profile.disable()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._check_memory(force=self.peak_snapshot is None)
+        tracemalloc.stop()
+
+    def _sample_loop(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(int((now - last) * 1_000_000))
+            last = now
+            self._check_memory()
+
+    def _sample(self, elapsed_us: int):
+        """Record one sample of every thread and every asyncio task."""
+        self.samples += 1
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = ';'.join([f"thread:{names.get(ident, ident)}"] + thread_stack(frame))
+            self.wall[stack] += elapsed_us
+            cpu_us = self._thread_cpu_delta(ident)
+            if cpu_us:
+                self.cpu[stack] += cpu_us
+
+        try:
+            tasks = list(asyncio.all_tasks(self._loop))
+        except RuntimeError:
+            # The task set changed while it was copied; skip this sample
+            return
+        for task in tasks:
+            stack = await_stack(task)
+            if stack:
+                self.tasks[';'.join([f"task:{task.get_name()}"] + stack)] += elapsed_us
+
+    def _thread_cpu_delta(self, ident: int) -> int:
+        """CPU microseconds a thread used since the last sample (Linux per-thread clocks)."""
+        try:
+            used = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return 0
+        previous = self._cpu_seen.get(ident)
+        self._cpu_seen[ident] = used
+        return int((used - previous) * 1_000_000) if previous is not None else 0
+
+    def _check_memory(self, force: bool = False):
+        """Track peak traced memory and keep a snapshot whenever it grows by ``snapshot_growth``.
+
+        Taking a snapshot walks every traced block, so at most one is taken per
+        ``snapshot_interval`` seconds.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_bytes = max(self.peak_bytes, peak)
+        now = time.perf_counter()
+        if force or (current > self._snapshot_bytes * self.snapshot_growth
+                     and now - self._snapshot_at >= self.snapshot_interval):
+            self.peak_snapshot = tracemalloc.take_snapshot()
+            self._snapshot_bytes = current
+            self._snapshot_at = now
+
+    def write(self):
+        """Write every profile to the output directory."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._profile.dump_stats(self.output_dir / 'loop.pstats')
+        for name, counter in (('wall', self.wall), ('cpu', self.cpu), ('tasks', self.tasks)):
+            with open(self.output_dir / f'{name}.collapsed', 'w', encoding='utf-8') as f:
+                for stack, weight in counter.most_common():
+                    f.write(f"{stack} {weight}\n")
+        if self.peak_snapshot is not None:
+            self.peak_snapshot.dump(str(self.output_dir / 'peak.tracemalloc'))
+        with open(self.output_dir / 'memory.txt', 'w', encoding='utf-8') as f:
+            f.write(self.memory_report())
+        self.logger.info(f"Wrote profile ({self.samples} samples over "
+                         f"{time.perf_counter() - self._started:.1f}s) to {self.output_dir}")
+
+    def memory_report(self) -> str:
+        """Peak traced memory, the largest snapshot by stage, and its top allocation sites."""
+        lines = [f"Peak traced memory: {self.peak_bytes / 2 ** 20:.1f} MB"]
+        if self.peak_snapshot is None:
+            return "\n".join(lines) + "\n"
+        by_stage: Counter = Counter()
+        for trace in self.peak_snapshot.traces:
+            by_stage[stage_of(trace.traceback)] += trace.size
+        total = sum(by_stage.values())
+        lines.append(f"Largest snapshot: {total / 2 ** 20:.1f} MB")
+        for stage, size in by_stage.most_common():
+            lines.append(f"  {stage:<8} {size / 2 ** 20:8.1f} MB")
+        lines.append("Top allocation sites:")
+        for stat in self.peak_snapshot.statistics('lineno')[:20]:
+            lines.append(f"  {stat}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+# src/utils/settings.py
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python before 3.11 ships no TOML reader; tomli has the same API
+    import tomli as tomllib
+
+from .config import (
+    LAPTOP_URLS, MAX_PAGES, DELAY_BETWEEN_REQUESTS, CONCURRENCY, LISTING_CONCURRENCY, PRODUCT_QUEUE_SIZE,
+    RATE_LIMIT_INITIAL, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_BURST, RATE_LIMIT_COOLDOWN,
+    INCREMENTAL_MAX_AGE_HOURS
+)
+
+# Crawl modes: fetch every product page, skip recently saved ones, or refresh known ones from listing cards
+FULL = 'full'
+INCREMENTAL = 'incremental'
+REFRESH = 'refresh'
+MODES = (FULL, INCREMENTAL, REFRESH)
+
+# Environment variables are this prefix plus the upper-cased setting name, e.g. CRAWLER_MAX_PAGES
+ENV_PREFIX = 'CRAWLER_'
+
+def rate_ceiling(rate_max: float, delay: float) -> float:
+    """Highest rate an adaptive limiter may reach: ``rate_max``, capped by one request per ``delay`` seconds."""
+    if delay > 0:
+        return min(rate_max, 1 / delay)
+    return rate_max
+
+@dataclass
+class CrawlSettings:
+    """Settings for one crawler run.
+
+    Defaults come from config.py; ``load_settings`` layers a TOML file,
+    ``CRAWLER_*`` environment variables and command-line values over them.
+    """
+    urls: List[str] = field(default_factory=lambda: list(LAPTOP_URLS))
+    mode: str = FULL
+    max_pages: int = MAX_PAGES              # Listing pages per search URL
+    max_requests: Optional[int] = None      # Listing and product pages per run
+    max_seconds: Optional[float] = None     # Wall-clock limit per run
+    concurrency: int = CONCURRENCY
+    listing_concurrency: int = LISTING_CONCURRENCY
+    queue_size: int = PRODUCT_QUEUE_SIZE
+    rate: float = RATE_LIMIT_INITIAL
+    rate_min: float = RATE_LIMIT_MIN
+    rate_max: float = RATE_LIMIT_MAX
+    burst: int = RATE_LIMIT_BURST
+    cooldown: float = RATE_LIMIT_COOLDOWN
+    delay: float = DELAY_BETWEEN_REQUESTS   # Minimum seconds between requests to one host through one proxy
+    max_age_hours: float = INCREMENTAL_MAX_AGE_HOURS
+
+    @property
+    def rate_ceiling(self) -> float:
+        """Highest rate the adaptive limiter may reach: ``rate_max``, capped by ``delay``."""
+        return rate_ceiling(self.rate_max, self.delay)
+
+    def validate(self):
+        """Raise ValueError for settings the crawler cannot run with."""
+        if not self.urls:
+            raise ValueError("At least one search URL is required")
+        if self.mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}, not {self.mode!r}")
+        for name in ('max_pages', 'concurrency', 'listing_concurrency', 'queue_size', 'burst'):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be at least 1")
+        if self.max_requests is not None and self.max_requests < 1:
+            raise ValueError("max_requests must be at least 1")
+        if self.max_seconds is not None and self.max_seconds <= 0:
+            raise ValueError("max_seconds must be positive")
+        if self.delay < 0 or self.cooldown < 0 or self.max_age_hours < 0:
+            raise ValueError("delay, cooldown and max_age_hours cannot be negative")
+        if not 0 < self.rate_min <= self.rate_ceiling:
+            raise ValueError(f"rate_min must be positive and at most the rate ceiling ({self.rate_ceiling:g}/s)")
+        if self.rate <= 0:
+            raise ValueError("rate must be positive")
+
+def _optional(parse: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Parser that also accepts an empty string or 'none' for "no limit"."""
+    def parse_optional(value):
+        if value is None or (isinstance(value, str) and value.strip().lower() in ('', 'none')):
+            return None
+        return parse(value)
+    return parse_optional
+
+def _url_list(value) -> List[str]:
+    """A list as given in TOML, or whitespace-separated URLs from the environment."""
+    if isinstance(value, str):
+        return value.split()
+    return [str(url) for url in value]
+
+_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    'urls': _url_list,
+    'mode': str,
+    'max_pages': int,
+    'max_requests': _optional(int),
+    'max_seconds': _optional(float),
+    'concurrency': int,
+    'listing_concurrency': int,
+    'queue_size': int,
+    'rate': float,
+    'rate_min': float,
+    'rate_max': float,
+    'burst': int,
+    'cooldown': float,
+    'delay': float,
+    'max_age_hours': float,
+}
+
+def _parse(name: str, value: Any, source: str) -> Any:
+    try:
+        return _PARSERS[name](value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for {name} in {source}: {value!r}") from None
+
+def read_settings_file(path: str) -> Dict[str, Any]:
+    """Settings from a TOML file, either at the top level or in a [crawler] table."""
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    data = data.get('crawler', data)
+    values = {}
+    for key, value in data.items():
+        name = key.replace('-', '_')
+        if name not in _PARSERS:
+            raise ValueError(f"Unknown setting {key!r} in {path}")
+        values[name] = _parse(name, value, path)
+    return values
+
+def load_settings(path: Optional[str] = None, env: Optional[Mapping[str, str]] = None,
+                  overrides: Optional[Dict[str, Any]] = None) -> CrawlSettings:
+    """Resolve settings: config.py defaults < TOML file < environment < overrides.
+
+    ``path`` falls back to ``CRAWLER_CONFIG``; overrides that are None (flags
+    not given on the command line) are ignored.
+    """
+    env = os.environ if env is None else env
+    values: Dict[str, Any] = {}
+    path = path or env.get(f'{ENV_PREFIX}CONFIG')
+    if path:
+        values.update(read_settings_file(path))
+    for name in _PARSERS:
+        variable = f'{ENV_PREFIX}{name.upper()}'
+        if variable in env:
+            values[name] = _parse(name, env[variable], variable)
+    for name, value in (overrides or {}).items():
+        if value is not None:
+            values[name] = _parse(name, value, 'command line')
+    settings = CrawlSettings(**values)
+    settings.validate()
+    return settings
@@ -0,0 +1,267 @@
+# tests/test_amazon_parser.py
+
+import os
+from datetime import datetime, timedelta
+
+import amazon_parser
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html><head><title>Amazon.in</title><script>var x = "<span class='a-price-whole'>1</span>";</script></head>
+<body>
+<div id="dp">
+  <span id="productTitle" class="a-size-large">
+    Acme Book 14 &amp; Pro <!-- promo --> Laptop<script>track()</script>
+  </span>
+  <div id="corePrice_feature_div">
+    <span class="savingPriceOverride aok-align-center">-18%</span>
+    <span class="a-price  aok-align-center"><span class="a-price-whole">54,990<span class="a-price-decimal">.</span></span></span>
+    <span class="a-price a-text-price" data-a-strike="true"><span class="a-offscreen">&#8377;66,990</span></span>
+  </div>
+  <table id="productDetails_techSpec_section_1">
+    <tr><th> Brand </th><td> &lrm;Acme </td></tr>
+    <tr><th>RAM Size</th><td>&lrm;16 GB<style>.x{}</style></td></tr>
+    <tr><th>Item Weight</th><td>1 kg<br/>approx</td></tr>
+    <tr><td>orphan cell</td></tr>
+  </table>
+</div>
+</body></html>
+"""
+
+
+def test_fast_path_matches_bs4_reference():
+    assert amazon_parser.extract_page(PRODUCT_PAGE) == amazon_parser.extract_page_bs4(PRODUCT_PAGE)
+
+
+def test_fast_path_handles_missing_sections():
+    page = "<html><body><p>Nothing here</p></body></html>"
+
+    assert amazon_parser.extract_page(page) == amazon_parser.extract_page_bs4(page)
+
+
+def matches(doc, query):
+    """Evaluate the small subset of MongoDB queries the parser issues."""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$gte" in condition and (value is None or value < condition["$gte"]):
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeRawCollection:
+    """Serves raw page documents to the parser."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def create_index(self, keys):
+        pass
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def count_documents(self, query):
+        return sum(matches(doc, query) for doc in self.docs)
+
+    def find(self, query=None, *args, **kwargs):
+        return iter([doc for doc in self.docs if matches(doc, query or {})])
+
+
+class FakeLaptopCollection:
+    """Collects laptop documents; writes containing a chosen source_id fail."""
+
+    def __init__(self, docs=(), fail_ids=()):
+        self.docs = list(docs)
+        self.fail_ids = set(fail_ids)
+
+    def create_index(self, keys):
+        pass
+
+    def insert_many(self, docs, ordered=True):
+        if any(doc["source_id"] in self.fail_ids for doc in docs):
+            raise RuntimeError("insert failed")
+        self.docs.extend(docs)
+
+    def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            source_id = op._filter["source_id"]
+            if source_id in self.fail_ids:
+                raise RuntimeError("write failed")
+            self.docs = [doc for doc in self.docs if doc["source_id"] != source_id]
+            self.docs.append({**op._doc, "_id": f"spec-{source_id}"})
+
+    def find(self, query=None, *args, **kwargs):
+        return iter([doc for doc in self.docs if matches(doc, query or {})])
+
+    def delete_many(self, query):
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+
+        class _Result:
+            deleted_count = len(self.docs) - len(kept)
+
+        self.docs = kept
+        return _Result()
+
+
+class FakeStateCollection:
+    def __init__(self, state=None):
+        self.state = state
+
+    def find_one(self, query):
+        return self.state
+
+    def replace_one(self, query, doc, upsert=False):
+        self.state = {**query, **doc}
+
+
+def raw_docs(count):
+    return [{"_id": i, "url": f"https://example.test/dp/{i}", "html": PRODUCT_PAGE} for i in range(count)]
+
+
+ORIGINAL_BUILD = amazon_parser.build_laptop_doc
+
+
+def crash_on_doc_3(doc):
+    if doc["_id"] == 3:
+        os._exit(1)
+    return ORIGINAL_BUILD(doc)
+
+
+def test_parallel_parse_saves_every_document():
+    laptops = FakeLaptopCollection()
+
+    failed = amazon_parser.process_in_parallel(FakeRawCollection(raw_docs(7)), laptops, workers=2, batch_size=3)
+
+    assert failed == []
+    assert sorted(doc["source_id"] for doc in laptops.docs) == list(range(7))
+    assert laptops.docs[0]["title"] == amazon_parser.extract_page(PRODUCT_PAGE)[0]
+
+
+def test_parallel_parse_isolates_a_crashing_document(monkeypatch):
+    # Workers are forked, so they inherit the patched function
+    monkeypatch.setattr(amazon_parser, "build_laptop_doc", crash_on_doc_3)
+    laptops = FakeLaptopCollection()
+
+    failed = amazon_parser.process_in_parallel(FakeRawCollection(raw_docs(7)), laptops, workers=2, batch_size=3)
+
+    assert failed == [3]
+    assert sorted(doc["source_id"] for doc in laptops.docs) == [0, 1, 2, 4, 5, 6]
+
+
+def record_dictionary(path):
+    os.environ["TEST_PARSER_DICT"] = path
+
+
+def build_with_dictionary(doc):
+    # Runs in the worker, so this sees what the worker's initializer loaded
+    if os.environ.get("TEST_PARSER_DICT") != "pages.dict":
+        raise RuntimeError("zstd dictionary was not loaded in the worker")
+    return ORIGINAL_BUILD(doc)
+
+
+def test_parallel_parse_loads_the_zstd_dictionary_in_every_worker(monkeypatch):
+    monkeypatch.setattr(amazon_parser, "ZSTD_DICT_PATH", "pages.dict")
+    monkeypatch.setattr(amazon_parser, "load_zstd_dictionary", record_dictionary)
+    monkeypatch.setattr(amazon_parser, "build_laptop_doc", build_with_dictionary)
+    monkeypatch.delenv("TEST_PARSER_DICT", raising=False)
+    laptops = FakeLaptopCollection()
+
+    failed = amazon_parser.process_in_parallel(FakeRawCollection(raw_docs(4)), laptops, workers=2, batch_size=2)
+
+    assert failed == []
+    assert "TEST_PARSER_DICT" not in os.environ
+
+
+def test_parallel_parse_continues_after_a_failed_save():
+    laptops = FakeLaptopCollection(fail_ids={4})
+
+    failed = amazon_parser.process_in_parallel(FakeRawCollection(raw_docs(7)), laptops, workers=2, batch_size=3)
+
+    assert sorted(failed) == [3, 4, 5]
+    assert sorted(doc["source_id"] for doc in laptops.docs) == [0, 1, 2, 6]
+
+
+def incremental_setup(last_run, changed):
+    """Raw pages 0-2 unchanged since ``last_run`` and 3-4 saved at ``changed``."""
+    docs = raw_docs(5)
+    for doc in docs:
+        doc["html_updated"] = changed if doc["_id"] >= 3 else last_run - timedelta(days=1)
+    specs = [{"_id": f"spec-{i}", "source_id": i, "parser_version": amazon_parser.EXTRACTOR_VERSION}
+             for i in range(3)]
+    state = FakeStateCollection({"_id": "laptop_specs", "watermark": last_run,
+                                 "extractor_version": amazon_parser.EXTRACTOR_VERSION})
+    return FakeRawCollection(docs), FakeLaptopCollection(specs), state
+
+
+def test_incremental_parses_changed_pages_and_advances_the_watermark():
+    last_run = datetime.utcnow() - timedelta(hours=1)
+    raw, laptops, state = incremental_setup(last_run, changed=last_run + timedelta(minutes=10))
+    started = datetime.utcnow()
+
+    amazon_parser.process_incremental(raw, laptops, state)
+
+    assert sorted(doc["source_id"] for doc in laptops.docs) == [0, 1, 2, 3, 4]
+    assert [doc for doc in laptops.docs if "title" in doc] == laptops.docs[3:]
+    assert state.state["watermark"] >= started
+
+
+def test_incremental_keeps_the_watermark_at_the_oldest_failure():
+    last_run = datetime.utcnow() - timedelta(hours=1)
+    changed = last_run + timedelta(minutes=10)
+    raw, laptops, state = incremental_setup(last_run, changed)
+    raw.docs[3]["html"] = None  # Nothing to parse
+
+    amazon_parser.process_incremental(raw, laptops, state)
+
+    assert state.state["watermark"] == changed
+    assert state.state["failures"] == [{"source_id": 3, "attempts": 1}]
+    # The next run picks the failed page up again
+    assert 3 in [doc["_id"] for doc in raw.find(amazon_parser.changed_pages_query(changed))]
+
+
+def test_incremental_stops_holding_the_watermark_for_a_page_that_keeps_failing():
+    last_run = datetime.utcnow() - timedelta(hours=1)
+    raw, laptops, state = incremental_setup(last_run, changed=last_run + timedelta(minutes=10))
+    raw.docs[3]["html"] = None
+    attempts = amazon_parser.MAX_PARSE_ATTEMPTS - 1
+    state.state["failures"] = [{"source_id": 3, "attempts": attempts}, {"source_id": 4, "attempts": attempts}]
+    started = datetime.utcnow()
+
+    amazon_parser.process_incremental(raw, laptops, state)
+
+    assert state.state["watermark"] >= started
+    # Page 4 parsed this time, so only page 3 keeps its count
+    assert state.state["failures"] == [{"source_id": 3, "attempts": amazon_parser.MAX_PARSE_ATTEMPTS}]
+
+
+def test_incremental_resets_failure_counts_for_a_new_extractor():
+    last_run = datetime.utcnow() - timedelta(hours=1)
+    changed = last_run + timedelta(minutes=10)
+    raw, laptops, state = incremental_setup(last_run, changed)
+    raw.docs[3]["html"] = None
+    state.state.update(extractor_version=amazon_parser.EXTRACTOR_VERSION - 1,
+                       failures=[{"source_id": 3, "attempts": amazon_parser.MAX_PARSE_ATTEMPTS}])
+
+    amazon_parser.process_incremental(raw, laptops, state)
+
+    assert state.state["watermark"] == changed
+    assert state.state["failures"] == [{"source_id": 3, "attempts": 1}]
+
+
+def test_incremental_removes_specs_of_deleted_pages():
+    last_run = datetime.utcnow() - timedelta(hours=1)
+    raw, laptops, state = incremental_setup(last_run, changed=last_run + timedelta(minutes=10))
+    del raw.docs[1]
+
+    amazon_parser.process_incremental(raw, laptops, state)
+
+    assert sorted(doc["source_id"] for doc in laptops.docs) == [0, 2, 3, 4]
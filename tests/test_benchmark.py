@@ -0,0 +1,49 @@
+# tests/test_benchmark.py
+
+import asyncio
+
+from benchmarks.crawler_benchmark import percentile, run_benchmark
+from benchmarks.mock_amazon import MockAmazonConfig
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 99) == 0.0
+
+
+def test_benchmark_crawls_whole_mock_catalogue_despite_faults():
+    config = MockAmazonConfig(search_urls=2, pages=2, products_per_page=5, product_kb=4,
+                              latency_ms=1, latency_jitter_ms=0, throttle_rate=0.05, overlap=0.3)
+
+    report = asyncio.run(run_benchmark(config, concurrency=4, rate=1000, cooldown=0.01,
+                                       parser_executor='thread', parser_workers=2))
+
+    assert report["products_stored"] == report["products_expected"]
+    assert report["pages_per_sec"] > 0
+    assert report["fetch_p99_ms"] >= report["fetch_p50_ms"]
+
+
+def test_benchmark_reports_limiter_wait_apart_from_fetch_latency():
+    config = MockAmazonConfig(search_urls=1, pages=2, products_per_page=6, product_kb=4,
+                              latency_ms=1, latency_jitter_ms=0)
+
+    # A burst of 10 at 10/s leaves the last few requests waiting on the limiter
+    report = asyncio.run(run_benchmark(config, concurrency=4, rate=10,
+                                       parser_executor='thread', parser_workers=2))
+
+    assert report["limiter_wait_s"] > 0.1
+    assert report["fetch_p99_ms"] < 250
+
+
+def test_benchmark_spreads_requests_over_proxies_and_quarantines_banned_ones():
+    config = MockAmazonConfig(search_urls=1, pages=2, products_per_page=6, product_kb=4,
+                              latency_ms=1, latency_jitter_ms=0, captcha_rate=0.1)
+
+    report = asyncio.run(run_benchmark(config, concurrency=4, rate=1000, cooldown=0.01,
+                                       parser_executor='thread', parser_workers=2,
+                                       proxies=3, quarantine_base=0.05, quarantine_max=0.2))
+
+    assert report["server"]["captcha"] > 0
+    assert report["products_stored"] > 0
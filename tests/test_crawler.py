@@ -0,0 +1,524 @@
+# tests/test_crawler.py
+
+import asyncio
+import gzip
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+from src.crawler.debug_store import DebugArtifactStore
+from src.crawler.dedup import AsinDeduplicator, BloomFilter
+from src.crawler.rate_limiter import AdaptiveRateLimiter, TokenBucket, limiter_key
+from src.crawler.listing_extractor import ListingCard, ListingExtractor
+from src.crawler import page_parser
+from src.crawler.page_parser import content_fingerprint
+from src.crawler.raw_crawler import CRAWLED, FAILED, SKIPPED, RawCrawler
+
+
+def listing_html(asins, last_page=None):
+    """Build a minimal search results page."""
+    cards = "".join(
+        f'<div data-asin="{asin}"><h2><a class="a-text-normal"><span>Laptop {asin}</span></a></h2>'
+        f'<span class="a-price-whole">50,000</span></div>'
+        for asin in asins
+    )
+    pagination = ""
+    if last_page:
+        items = "".join(f'<span class="s-pagination-item">{n}</span>' for n in (1, 2, last_page))
+        pagination = f'<div class="s-pagination-strip">{items}</div>'
+    return f"<html><body><div class='s-main-slot'>{cards}</div>{pagination}</body></html>"
+
+
+def acked(ok=True):
+    """A settled write acknowledgement, as DatabaseManager returns for each write."""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(ok)
+    return future
+
+
+class FakeDb:
+    """In-memory stand-in for the DatabaseManager calls the crawler makes; writes to fail_urls fail."""
+
+    def __init__(self, states=None, fail_urls=()):
+        self.states = states or {}
+        self.fail_urls = set(fail_urls)
+        self.saved = {}
+        self.touched = []
+        self.listings = {}
+        self.checkpoints = {}
+        self.seen_filters = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def load_seen_filter(self, crawl_id):
+        return self.seen_filters.get(crawl_id)
+
+    async def save_seen_filter(self, crawl_id, filter_doc):
+        self.seen_filters[crawl_id] = filter_doc
+        return True
+
+    async def load_checkpoint(self, crawl_id):
+        return self.checkpoints.get(crawl_id)
+
+    async def save_checkpoint(self, crawl_id, checkpoint):
+        self.checkpoints[crawl_id] = checkpoint
+        return True
+
+    async def get_url_states(self, urls):
+        return {url: self.states[url] for url in urls if url in self.states}
+
+    async def save_raw_data(self, url, html_content, metadata, content_hash=None, listing=None):
+        self.saved[url] = content_hash
+        return acked(url not in self.fail_urls)
+
+    async def touch_raw_data(self, url, metadata, listing=None):
+        self.touched.append(url)
+        return acked(url not in self.fail_urls)
+
+    async def update_listing(self, url, listing):
+        self.listings[url] = listing
+        return acked(url not in self.fail_urls)
+
+
+class StubCrawler(RawCrawler):
+    """Crawler with the network calls replaced by in-memory fakes."""
+
+    def __init__(self, pages, last_page=None, db=None, failing_pages=(), failing_products=(),
+                 skipped_products=(), **kwargs):
+        kwargs.setdefault("parser_executor", "thread")
+        super().__init__(db_manager=db or FakeDb(), **kwargs)
+        self.urls = ["https://example.test/s?k=laptop"]
+        self.pages = pages
+        self.last_page = last_page
+        self.fetched = []
+        self.crawled = []
+        self.failing_pages = set(failing_pages)
+        self.failing_products = set(failing_products)
+        self.skipped_products = set(skipped_products)
+
+    async def _fetch(self, session, url):
+        self.fetched.append(url)
+        page = int(url.rsplit("page=", 1)[1])
+        if page in self.failing_pages:
+            return 500, None
+        return 200, listing_html(self.pages.get(page, []), self.last_page)
+
+    async def crawl_product(self, session, url):
+        await asyncio.sleep(0)
+        self.crawled.append(url)
+        if url in self.failing_products:
+            return FAILED
+        return SKIPPED if url in self.skipped_products else CRAWLED
+
+
+def test_run_drains_queue_across_workers():
+    pages = {1: [f"A{i}" for i in range(10)], 2: [f"B{i}" for i in range(10)]}
+    crawler = StubCrawler(pages, concurrency=3, queue_size=2)
+
+    asyncio.run(crawler.run(max_pages=5))
+
+    expected = [f"https://www.amazon.in/dp/{asin}" for asin in pages[1] + pages[2]]
+    assert sorted(crawler.crawled) == sorted(expected)
+    assert len(crawler.worker_stats) == 3
+    assert sum(s.succeeded for s in crawler.worker_stats) == 20
+
+
+def test_full_queue_holds_back_listing_discovery():
+    pages = {page: [f"P{page}A", f"P{page}B"] for page in range(1, 21)}
+    crawler = StubCrawler(pages, last_page=20, concurrency=1, queue_size=2, listing_concurrency=3)
+    fetched_at_product = []
+
+    async def crawl_product(session, url):
+        fetched_at_product.append(len(crawler.fetched))
+        await asyncio.sleep(0)
+        crawler.crawled.append(url)
+        return CRAWLED
+
+    crawler.crawl_product = crawl_product
+    asyncio.run(crawler.run(max_pages=20))
+
+    assert len(crawler.crawled) == 40
+    # Page 1, then one page per listing slot waiting on the queue, plus the one being refilled
+    assert fetched_at_product[2] <= 5
+
+
+def test_discovery_stops_at_last_page_from_pagination():
+    pages = {page: [f"P{page}"] for page in range(1, 8)}
+    crawler = StubCrawler(pages, last_page=4, concurrency=2)
+
+    asyncio.run(crawler.run(max_pages=20))
+
+    assert sorted(int(url.rsplit("=", 1)[1]) for url in crawler.fetched) == [1, 2, 3, 4]
+    assert len(crawler.crawled) == 4
+
+
+def test_token_bucket_reserves_in_order():
+    bucket = TokenBucket(rate=2.0, capacity=2, now=0.0)
+
+    assert bucket.reserve(0.0) == 0.0
+    assert bucket.reserve(0.0) == 0.0
+    # Bucket is empty: the next callers queue at 1/rate intervals
+    assert bucket.reserve(0.0) == 0.5
+    assert bucket.reserve(0.0) == 1.0
+    assert bucket.reserve(2.0) == 0.0
+
+
+def test_cooldown_holds_callers_already_waiting_on_a_reservation():
+    limiter = AdaptiveRateLimiter(initial_rate=10.0, max_rate=10.0, burst_limit=1, jitter=0)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        await limiter.acquire("host")
+        started = loop.time()
+        waiter = asyncio.create_task(limiter.acquire("host"))  # Reserved 0.1s ahead
+        await asyncio.sleep(0.05)
+        limiter.cooldown("host", 0.3)
+        await waiter
+        return loop.time() - started
+
+    assert asyncio.run(scenario()) >= 0.35
+
+
+def test_adaptive_limiter_keeps_state_per_key():
+    limiter = AdaptiveRateLimiter(initial_rate=1.0, min_rate=0.1, max_rate=2.0, jitter=0)
+    amazon = limiter_key("https://www.amazon.in/dp/X", proxy="p1")
+    other = limiter_key("https://www.amazon.in/dp/X", proxy="p2")
+
+    asyncio.run(limiter.handle_response(amazon, False, throttled=True))
+
+    assert limiter.get_rate(amazon) == 0.5
+    assert limiter.get_rate(other) == 1.0
+    assert limiter.buckets[amazon].reserve(limiter.buckets[amazon].updated) == 0.0
+
+
+def test_duplicate_asins_are_fetched_once():
+    pages = {1: ["A1", "A2", "A1"], 2: ["A2", "A3"]}
+    crawler = StubCrawler(pages, concurrency=2)
+
+    asyncio.run(crawler.run(max_pages=5))
+
+    assert sorted(crawler.crawled) == [f"https://www.amazon.in/dp/A{i}" for i in (1, 2, 3)]
+    assert crawler.dedup.skipped == 2
+
+
+def test_bloom_filter_round_trip_keeps_seen_asins():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    dedup = AsinDeduplicator(persistent=bloom)
+    assert dedup.add("B0TEST0001")
+
+    restored = AsinDeduplicator(persistent=BloomFilter.from_document(bloom.to_document()))
+
+    assert not restored.add("B0TEST0001")
+    assert restored.add("B0TEST0002")
+
+
+def test_incremental_mode_skips_fresh_pages():
+    now = datetime.utcnow()
+    db = FakeDb({
+        "https://www.amazon.in/dp/OLD": {"last_updated": now - timedelta(days=3)},
+        "https://www.amazon.in/dp/NEW": {"last_updated": now},
+    })
+    crawler = StubCrawler({1: ["A1", "OLD", "NEW"]}, db=db, concurrency=1, incremental=True)
+
+    asyncio.run(crawler.run(max_pages=1))
+
+    assert sorted(crawler.crawled) == ["https://www.amazon.in/dp/A1", "https://www.amazon.in/dp/OLD"]
+    assert crawler.fresh_skipped == 1
+
+
+def product_html(title, price):
+    return (f'<html><body><span id="productTitle"> {title} </span>'
+            f'<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">{price}</span></span></div>'
+            f'<table id="productDetails_techSpec_section_1"><tr><th>Brand</th><td>Acme</td></tr></table>'
+            f'</body></html>')
+
+
+def test_unchanged_product_page_only_touches_metadata():
+    url = "https://www.amazon.in/dp/A1"
+    first = product_html("Acme Laptop", "50,000")
+    fingerprint = content_fingerprint(BeautifulSoup(first, "lxml"))
+    db = FakeDb()
+    crawler = RawCrawler(db_manager=db, parser_executor="process", parser_workers=1)
+    pages = iter([first, product_html("Acme Laptop", "45,000")])
+
+    async def fetch(session, requested):
+        return 200, next(pages)
+
+    crawler._fetch = fetch
+    crawler.known_hashes[url] = fingerprint
+    assert asyncio.run(crawler.crawl_product(None, url)) == CRAWLED
+    assert db.touched == [url] and not db.saved
+
+    crawler.known_hashes[url] = fingerprint
+    assert asyncio.run(crawler.crawl_product(None, url)) == CRAWLED
+    assert db.saved[url] != fingerprint
+    crawler._shutdown_executor()
+
+
+def test_failed_page_write_turns_a_crawled_product_into_a_failure():
+    failing = "https://www.amazon.in/dp/A2"
+    db = FakeDb(fail_urls={failing})
+    crawler = StubCrawler({1: ["A1", "A2"]}, last_page=1, db=db, crawl_id="c1")
+    crawler.crawl_product = partial(RawCrawler.crawl_product, crawler)
+    listing_fetch = crawler._fetch
+
+    async def fetch(session, url):
+        if "/dp/" in url:
+            return 200, product_html(f"Acme Laptop {url[-2:]}", "50,000")
+        return await listing_fetch(session, url)
+
+    crawler._fetch = fetch
+    asyncio.run(crawler.run(max_pages=1))
+
+    assert sum(s.succeeded for s in crawler.worker_stats) == 1
+    assert sum(s.failed for s in crawler.worker_stats) == 1
+    assert db.checkpoints["c1"]["products"]["A2"]["status"] == "failed"
+    results = crawler.metrics.snapshot()["counters"]["crawler_products_total"]
+    assert {r["labels"]["result"]: r["value"] for r in results} == {"saved": 1, "write_failed": 1}
+
+
+def test_listing_extractor_returns_cards_and_filters_combos():
+    extractor = ListingExtractor(["combo", "+ mouse"])
+    page = (
+        '<div class="s-main-slot">'
+        '<div data-asin="A1" class="s-result-item"><h2><a class="a-link-normal">'
+        '<span class="a-size-medium a-text-normal">Acme 14 Laptop</span></a></h2>'
+        '<span class="a-icon-alt">4.3 out of 5 stars</span>'
+        '<span class="a-price"><span class="a-price-whole">54,990</span></span></div>'
+        '<div data-asin="A2"><h2><span class="a-text-normal">Acme Laptop + Mouse</span></h2></div>'
+        '<div data-asin=""><h2><span class="a-text-normal">Ad slot</span></h2></div>'
+        '</div>'
+        '<div data-component-type="s-result-info-bar"><h1>1-24 of over 2,000 results for</h1></div>'
+    )
+
+    cards, last_page, found = extractor.extract(page)
+
+    assert found
+    assert cards == [ListingCard(asin="A1", title="Acme 14 Laptop", price="54,990",
+                                 rating="4.3 out of 5 stars")]
+    assert last_page == 84
+    assert extractor.title_variant == 1
+
+
+def test_listing_extractor_treats_an_empty_document_as_a_page_without_cards():
+    extractor = ListingExtractor([])
+
+    assert extractor.extract("  \n ") == ([], None, False)
+    assert extractor.extract("<!-- throttled -->") == ([], None, False)
+
+
+def test_listing_refresh_fetches_only_new_or_changed_products():
+    def stored(price):
+        return {"listing": {"title": "Laptop {}", "price": price, "rating": None,
+                            "num_reviews": None, "available": True}}
+
+    same, changed = stored("50,000"), stored("45,000")
+    same["listing"]["title"] = "Laptop SAME"
+    changed["listing"]["title"] = "Laptop CHANGED"
+    db = FakeDb({"https://www.amazon.in/dp/SAME": same, "https://www.amazon.in/dp/CHANGED": changed})
+    crawler = StubCrawler({1: ["SAME", "CHANGED", "NEW"]}, db=db, concurrency=1, listing_refresh=True)
+
+    asyncio.run(crawler.run(max_pages=1))
+
+    assert sorted(crawler.crawled) == ["https://www.amazon.in/dp/CHANGED", "https://www.amazon.in/dp/NEW"]
+    assert list(db.listings) == ["https://www.amazon.in/dp/SAME"]
+    assert crawler.listing_refreshed == 1
+
+
+def test_debug_store_keeps_failures_and_enforces_size_cap(tmp_path):
+    store = DebugArtifactStore(directory=str(tmp_path), enabled=True, success_sample_rate=0.0,
+                               max_total_bytes=1500)
+    page = "<html>" + "x" * 5000 + "</html>"
+
+    async def scenario():
+        store.save(page, "ok_page")
+        for i in range(40):
+            store.save(page + str(i) * 2000, f"blocked_{i}", failure=True)
+            await store.close()
+
+    asyncio.run(scenario())
+
+    files = sorted(tmp_path.glob("*.html.gz"))
+    assert files and all(f.name.startswith("fail_") for f in files)
+    assert sum(f.stat().st_size for f in files) <= 1500
+    assert gzip.decompress(files[-1].read_bytes()).decode().startswith("<html>")
+
+
+def test_resume_continues_from_checkpoint():
+    db = FakeDb()
+    pages = {1: ["A1", "A2"], 2: ["B1", "B2"]}
+    first = StubCrawler(pages, last_page=2, db=db, concurrency=2, crawl_id="c1",
+                        failing_pages={2}, failing_products={"https://www.amazon.in/dp/A2"})
+    asyncio.run(first.run(max_pages=5))
+
+    checkpoint = db.checkpoints["c1"]
+    assert checkpoint["listings"][0]["done"] == [1]
+    assert checkpoint["products"]["A2"] == {"status": "failed", "attempts": 1}
+
+    resumed = StubCrawler(pages, last_page=2, db=db, concurrency=2, crawl_id="c1", resume=True)
+    asyncio.run(resumed.run(max_pages=5))
+
+    assert [int(url.rsplit("=", 1)[1]) for url in resumed.fetched] == [2]
+    assert sorted(resumed.crawled) == [f"https://www.amazon.in/dp/{asin}" for asin in ("A2", "B1", "B2")]
+    assert db.checkpoints["c1"]["listings"][0]["complete"]
+
+
+def test_skipped_products_are_not_fetched_again_on_resume():
+    db = FakeDb()
+    pages = {1: ["A1", "A2"]}
+    first = StubCrawler(pages, last_page=1, db=db, crawl_id="c1",
+                        skipped_products={"https://www.amazon.in/dp/A2"})
+    asyncio.run(first.run(max_pages=5))
+
+    assert db.checkpoints["c1"]["products"]["A2"]["status"] == "done"
+    assert sum(s.skipped for s in first.worker_stats) == 1
+
+    resumed = StubCrawler(pages, last_page=1, db=db, crawl_id="c1", resume=True)
+    asyncio.run(resumed.run(max_pages=5))
+    assert resumed.crawled == []
+
+
+def test_request_budget_stops_cleanly_and_resumes():
+    db = FakeDb()
+    pages = {1: ["A1", "A2", "A3"], 2: ["B1", "B2"]}
+    first = StubCrawler(pages, last_page=2, db=db, concurrency=1, crawl_id="c1", max_requests=3)
+    asyncio.run(first.run(max_pages=5))
+
+    # Both listing pages and one product fit the budget; the others stay pending
+    assert len(first.fetched) + len(first.crawled) == 3
+    products = db.checkpoints["c1"]["products"]
+    assert sum(entry["status"] == "pending" for entry in products.values()) == 4
+
+    resumed = StubCrawler(pages, last_page=2, db=db, concurrency=1, crawl_id="c1", resume=True)
+    asyncio.run(resumed.run(max_pages=5))
+
+    assert resumed.fetched == []
+    assert len(first.crawled + resumed.crawled) == 5
+    assert set(first.crawled).isdisjoint(resumed.crawled)
+
+
+def test_seen_filter_is_saved_with_periodic_checkpoints():
+    db = FakeDb()
+    pages = {1: ["A1", "A2", "A3"]}
+    crawler = StubCrawler(pages, db=db, concurrency=1, crawl_id="c1", checkpoint_interval=0.01)
+    saved_during_run = []
+
+    async def crawl_product(session, url):
+        await asyncio.sleep(0.03)
+        saved_during_run.append("c1" in db.seen_filters)
+        return CRAWLED
+
+    crawler.crawl_product = crawl_product
+    asyncio.run(crawler.run(max_pages=1))
+
+    # Saved while products were still being fetched, not only when the run ended
+    assert saved_during_run[-1]
+    restored = BloomFilter.from_document(db.seen_filters["c1"])
+    assert all(asin in restored for asin in pages[1])
+
+
+def test_rerun_without_resume_ignores_the_saved_seen_filter():
+    db = FakeDb()
+    pages = {1: ["A1", "A2"]}
+    asyncio.run(StubCrawler(pages, last_page=1, db=db, crawl_id="c1").run(max_pages=5))
+
+    rerun = StubCrawler(pages, last_page=1, db=db, crawl_id="c1")
+    asyncio.run(rerun.run(max_pages=5))
+
+    assert sorted(rerun.crawled) == ["https://www.amazon.in/dp/A1", "https://www.amazon.in/dp/A2"]
+
+
+class MemoryWorkQueue:
+    """In-memory stand-in for WorkQueue with the same lease semantics, minus expiry."""
+
+    def __init__(self, crawl_id="dist"):
+        self.crawl_id = crawl_id
+        self.visibility_timeout = timedelta(seconds=60)
+        self.tasks = {}
+        self.leases = []
+
+    async def ensure_indexes(self):
+        pass
+
+    async def enqueue(self, kind, items):
+        new = [(url, payload) for url, payload in items if (kind, url) not in self.tasks]
+        for url, payload in new:
+            self.tasks[(kind, url)] = {"_id": (kind, url), "url": url, "payload": payload,
+                                       "status": "ready", "attempts": 0}
+        return len(new)
+
+    async def lease(self, kind, owner):
+        for (task_kind, _), task in self.tasks.items():
+            if task_kind == kind and task["status"] == "ready":
+                task.update(status="leased", owner=owner, attempts=task["attempts"] + 1)
+                self.leases.append(task["url"])
+                return dict(task)
+        return None
+
+    async def extend(self, task, owner):
+        return True
+
+    async def ack(self, task, owner):
+        self.tasks[task["_id"]]["status"] = "done"
+        return True
+
+    async def nack(self, task, owner):
+        self.tasks[task["_id"]]["status"] = "ready" if task["attempts"] < 3 else "dead"
+        return True
+
+    async def is_drained(self):
+        return all(task["status"] in ("done", "dead") for task in self.tasks.values())
+
+    async def stats(self):
+        return {}
+
+
+def test_distributed_nodes_share_work_without_refetching():
+    pages = {1: ["A1", "A2"], 2: ["A2", "B1"], 3: ["B2"]}
+    work_queue = MemoryWorkQueue()
+    nodes = [StubCrawler(pages, last_page=3, concurrency=2, listing_concurrency=1) for _ in range(2)]
+    for node in nodes:
+        node.poll_interval = 0.01
+
+    async def scenario():
+        await asyncio.gather(*(node.run_distributed(work_queue, max_pages=5) for node in nodes))
+
+    asyncio.run(scenario())
+
+    crawled = [url for node in nodes for url in node.crawled]
+    assert sorted(crawled) == [f"https://www.amazon.in/dp/{asin}" for asin in ("A1", "A2", "B1", "B2")]
+    fetched = sorted(int(url.rsplit("=", 1)[1]) for node in nodes for url in node.fetched)
+    assert fetched == [1, 2, 3]
+
+
+def test_distributed_skipped_products_are_acked():
+    skipped = "https://www.amazon.in/dp/A2"
+    work_queue = MemoryWorkQueue()
+    node = StubCrawler({1: ["A1", "A2"]}, last_page=1, skipped_products={skipped})
+    node.poll_interval = 0.01
+
+    asyncio.run(node.run_distributed(work_queue, max_pages=5))
+
+    assert node.crawled.count(skipped) == 1
+    assert work_queue.tasks[("product", skipped)]["status"] == "done"
+
+
+def test_listing_extractors_are_not_shared_between_threads():
+    barrier = threading.Barrier(2)
+
+    def extractor_of_this_thread():
+        page_parser.parse_listing_page("<html></html>", ("combo",))
+        extractor = page_parser._local.extractors[("combo",)]
+        barrier.wait()  # Both threads hold their extractor at once
+        return extractor
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first, second = pool.submit(extractor_of_this_thread), pool.submit(extractor_of_this_thread)
+        assert first.result() is not second.result()
@@ -0,0 +1,136 @@
+# tests/test_db_manager.py
+
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from src.database.db_manager import DatabaseManager
+from src.utils.compression import decompress_html
+
+
+class FakeCollection:
+    """Records bulk_write calls and fails the operations for chosen URLs."""
+
+    def __init__(self, fail_urls=()):
+        self.batches = []
+        self.fail_urls = set(fail_urls)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.batches.append(operations)
+        errors = [
+            {"index": i, "errmsg": "duplicate key"}
+            for i, op in enumerate(operations)
+            if op._filter["url"] in self.fail_urls
+        ]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+        class _Result:
+            acknowledged = True
+
+        return _Result()
+
+
+def make_manager(collection, **kwargs):
+    manager = DatabaseManager("mongodb://localhost:27017", **kwargs)
+    manager.collection = collection
+    return manager
+
+
+def test_writes_are_batched_with_per_item_acknowledgements():
+    collection = FakeCollection(fail_urls={"u2"})
+    manager = make_manager(collection, bulk_size=3, flush_interval=60)
+
+    async def scenario():
+        acks = [await manager.save_raw_data(url, "<html/>", {}) for url in ("u1", "u2")]
+        # Writers do not wait for the batch
+        assert collection.batches == [] and not any(ack.done() for ack in acks)
+        acks.append(await manager.save_raw_data("u3", "<html/>", {}))
+        return await asyncio.gather(*acks)
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert len(collection.batches) == 1
+
+
+def test_cancelled_flush_fails_the_whole_batch():
+    class HangingCollection(FakeCollection):
+        async def bulk_write(self, operations, ordered=True):
+            self.batches.append(operations)
+            await asyncio.sleep(60)
+
+    manager = make_manager(HangingCollection(), bulk_size=10, flush_interval=60)
+
+    async def scenario():
+        acks = [await manager.save_raw_data("u1", "<html/>", {}), await manager.touch_raw_data("u2", {})]
+        flush = asyncio.create_task(manager.flush())
+        await asyncio.sleep(0)
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        return await asyncio.gather(*acks)
+
+    assert asyncio.run(scenario()) == [False, False]
+
+
+def test_partial_batch_flushes_after_interval():
+    collection = FakeCollection()
+    manager = make_manager(collection, bulk_size=100, flush_interval=0.01)
+
+    async def scenario():
+        await manager.save_raw_data("u1", "<html/>", {})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert len(collection.batches) == 1
+
+
+def test_compressed_pages_round_trip():
+    collection = FakeCollection()
+    manager = make_manager(collection, bulk_size=1, compression='zlib')
+    html = "<html>" + "laptop " * 1000 + "</html>"
+
+    async def save():
+        return await (await manager.save_raw_data("u1", html, {}))
+
+    assert asyncio.run(save()) is True
+
+    fields = collection.batches[0][0]._doc["$set"]
+    assert fields["html_codec"] == "zlib"
+    assert len(fields["html_content"]) < len(html)
+    assert decompress_html(fields) == html
+    # No dictionary was used, so an id left by an earlier save must go
+    assert collection.batches[0][0]._doc["$unset"] == {"html_dict_id": ""}
+
+
+def test_url_state_is_streamed_in_cursor_batches():
+    class StreamingCollection:
+        def __init__(self, docs):
+            self.docs = docs
+            self.calls = []
+            self.yielded = 0
+
+        def find(self, query, projection, batch_size=None):
+            self.calls.append((query, projection, batch_size))
+            collection = self
+
+            async def cursor():
+                for doc in collection.docs:
+                    collection.yielded += 1
+                    yield doc
+            return cursor()
+
+    docs = [{"url": f"u{i}", "last_updated": None, "content_hash": None} for i in range(5)]
+    collection = StreamingCollection(docs)
+    manager = make_manager(collection)
+
+    async def first_two():
+        urls = []
+        async for doc in manager.iter_url_state(batch_size=2):
+            urls.append(doc["url"])
+            if len(urls) == 2:
+                break
+        return urls
+
+    assert asyncio.run(first_two()) == ["u0", "u1"]
+    assert collection.yielded == 2  # Nothing read ahead of the consumer
+    assert collection.calls[0][2] == 2
+    assert asyncio.run(manager.get_all_urls()) == [f"u{i}" for i in range(5)]
@@ -0,0 +1,32 @@
+# tests/test_http_cache.py
+
+import asyncio
+
+from src.crawler.http_cache import HttpCache
+from src.crawler.raw_crawler import RawCrawler
+
+
+def test_recorded_responses_replay_without_network(tmp_path):
+    page = "<html>" + "laptop " * 100 + "</html>"
+    recorder = HttpCache(str(tmp_path), mode="record")
+
+    async def record():
+        await recorder.record("https://shop.test/dp/A1", 200, page)
+        await recorder.record("https://shop.test/dp/A2", 200, page)
+        await recorder.record("https://shop.test/dp/A3", 503, None)
+
+    asyncio.run(record())
+    recorder.close()
+    # Identical bodies are stored once
+    assert (tmp_path / HttpCache.DATA_FILE).stat().st_size == len(page.encode())
+
+    replayer = HttpCache(str(tmp_path), mode="replay")
+    crawler = RawCrawler(db_manager=None, http_cache=replayer)
+
+    async def replay():
+        # No proxy pool is opened: replay never reaches the network
+        return [await crawler._fetch(None, f"https://shop.test/dp/{asin}") for asin in ("A2", "A3", "A4")]
+
+    assert asyncio.run(replay()) == [(200, page), (503, None), (404, None)]
+    assert (replayer.hits, replayer.misses) == (2, 1)
+    replayer.close()
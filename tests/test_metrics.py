@@ -0,0 +1,51 @@
+# tests/test_metrics.py
+
+import asyncio
+import json
+
+from src.crawler.http_cache import HttpCache
+from src.crawler.raw_crawler import BlockedError, RawCrawler
+from src.utils.metrics import Metrics, write_snapshot
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.inc('crawler_responses_total', stage='product', status='200')
+    metrics.inc('crawler_responses_total', stage='product', status='200')
+    for value in (0.05, 0.5, 5.0):
+        metrics.observe('crawler_fetch_seconds', value, stage='product', source='search1')
+
+    text = metrics.render_prometheus()
+
+    assert 'crawler_responses_total{stage="product",status="200"} 2' in text
+    assert 'crawler_fetch_seconds_bucket{stage="product",source="search1",le="0.1"} 1' in text
+    assert 'crawler_fetch_seconds_bucket{stage="product",source="search1",le="1.0"} 2' in text
+    assert 'crawler_fetch_seconds_bucket{stage="product",source="search1",le="+Inf"} 3' in text
+    assert 'crawler_fetch_seconds_count{stage="product",source="search1"} 3' in text
+
+
+def test_crawler_counts_responses_and_blocks(tmp_path):
+    recorder = HttpCache(str(tmp_path), mode="record")
+
+    async def record():
+        await recorder.record("https://shop.test/dp/A1", 200, "<html>ok</html>")
+        await recorder.record("https://shop.test/dp/A2", 200, "Sorry, we just need to make sure you're not a robot")
+
+    asyncio.run(record())
+    recorder.close()
+    crawler = RawCrawler(db_manager=None, http_cache=HttpCache(str(tmp_path), mode="replay"))
+
+    async def replay():
+        await crawler._fetch(None, "https://shop.test/dp/A1")
+        try:
+            await crawler._fetch(None, "https://shop.test/dp/A2")
+        except BlockedError:
+            pass
+
+    asyncio.run(replay())
+    write_snapshot(crawler.metrics, str(tmp_path / "metrics.json"))
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+
+    responses = snapshot["counters"]["crawler_responses_total"]
+    assert responses == [{"labels": {"stage": "product", "status": "200"}, "value": 2}]
+    assert snapshot["counters"]["crawler_blocked_total"][0]["labels"]["reason"] == "captcha"
@@ -0,0 +1,105 @@
+# tests/test_price_history.py
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from src.database.price_history import PriceHistory, parse_count, parse_rating, price_to_paise
+
+MONGODB_URI = "mongodb://localhost:27017"
+
+
+def mongod_available():
+    try:
+        MongoClient(MONGODB_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+class FakeHistoryCollection:
+    """Keeps inserted points and answers the latest-point aggregation from them."""
+
+    def __init__(self, points=()):
+        self.points = list(points)
+        self.inserts = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.inserts.append(documents)
+        self.points.extend(documents)
+
+    async def aggregate(self, pipeline):
+        asins = pipeline[0]["$match"]["asin"]["$in"]
+        latest = {}
+        for point in sorted(self.points, key=lambda p: p["ts"]):
+            if point["asin"] in asins:
+                latest[point["asin"]] = point
+        for asin, point in latest.items():
+            yield {"_id": asin, "price": point["price"], "rating": point["rating"], "reviews": point["reviews"]}
+
+
+def test_scraped_values_parse_to_compact_numbers():
+    assert price_to_paise("₹54,990.00") == 5499000
+    assert price_to_paise("1,23,456.5") == 12345650
+    assert price_to_paise(None) is None
+    assert parse_rating("4.2 out of 5 stars") == 4.2
+    assert parse_count("1,234 ratings") == 1234
+
+
+def test_points_are_written_only_when_values_change():
+    start = datetime(2024, 1, 1)
+    stored = {"ts": start, "asin": "A1", "price": 5499000, "rating": 4.2, "reviews": 10, "prev_price": None}
+    collection = FakeHistoryCollection([stored])
+    history = PriceHistory({"history": collection}, "history", bulk_size=100, flush_interval=60)
+
+    def metadata(price, reviews="10 ratings"):
+        return {"price": price, "rating": "4.2 out of 5 stars", "num_reviews": reviews}
+
+    async def scenario():
+        await history.record("A1", metadata("₹54,990.00"), start + timedelta(hours=1))   # Same as stored
+        await history.record("A1", metadata("₹49,990.00"), start + timedelta(hours=2))   # Price drop
+        await history.record("A1", metadata("₹49,990.00"), start + timedelta(hours=3))   # Same again
+        await history.record("A2", metadata("₹30,000"), start + timedelta(hours=3))      # New ASIN
+        await history.record("A3", {}, start)                                           # Nothing scraped
+        # Records return without waiting for the batch
+        assert len(collection.inserts) == 0
+        await history.flush()
+
+    asyncio.run(scenario())
+    assert len(collection.inserts) == 1
+    written = [(p["asin"], p["price"], p["prev_price"]) for p in collection.inserts[0]]
+    assert written == [("A1", 4999000, 5499000), ("A2", 3000000, None)]
+    # Cached from now on: an unchanged snapshot is not even buffered
+    asyncio.run(history.record("A1", metadata("₹49,990.00")))
+    assert history._pending == []
+
+
+@pytest.mark.skipif(not mongod_available(), reason="needs a local mongod")
+def test_history_and_biggest_drops_queries():
+    db = AsyncIOMotorClient(MONGODB_URI)["price_history_test"]
+    history = PriceHistory(db, f"history_{uuid.uuid4().hex}", bulk_size=1)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    async def scenario():
+        await history.ensure_collection()
+        for hours_ago, asin, price in [(48, "A1", "₹1,000"), (5, "A1", "₹800"), (1, "A1", "₹700"),
+                                       (48, "A2", "₹500"), (2, "A2", "₹450"),
+                                       (3, "A3", "₹999"),
+                                       (48, "A4", "₹300"), (1, "A4", "₹350")]:
+            await history.record(asin, {"price": price}, now - timedelta(hours=hours_ago))
+        try:
+            return await history.history("A1"), await history.biggest_drops(hours=24, now=now)
+        finally:
+            await db.drop_collection(history.name)
+
+    points, drops = asyncio.run(scenario())
+
+    assert [p["price"] for p in points] == [100000, 80000, 70000]
+    assert [(d["asin"], d["before"], d["price"], d["drop"]) for d in drops] == [
+        ("A1", 100000, 70000, 30000), ("A2", 50000, 45000, 5000)
+    ]
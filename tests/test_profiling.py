@@ -0,0 +1,56 @@
+# tests/test_profiling.py
+
+import asyncio
+import time
+import tracemalloc
+
+from src.utils.profiling import CrawlProfiler, stage_of
+
+
+def test_profiler_writes_stacks_and_memory_report(tmp_path):
+    async def busy_worker():
+        for _ in range(5):
+            blocks = [bytearray(64 * 1024) for _ in range(8)]
+            await asyncio.to_thread(time.sleep, 0.02)
+            del blocks
+
+    async def main():
+        with CrawlProfiler(str(tmp_path), interval=0.005):
+            await asyncio.gather(*(asyncio.create_task(busy_worker(), name=f"worker-{i}") for i in range(2)))
+
+    asyncio.run(main())
+
+    for name in ('loop.pstats', 'wall.collapsed', 'cpu.collapsed', 'tasks.collapsed',
+                 'peak.tracemalloc', 'memory.txt'):
+        assert (tmp_path / name).exists(), name
+
+    tasks = (tmp_path / 'tasks.collapsed').read_text().splitlines()
+    assert any(line.startswith('task:worker-') and 'busy_worker' in line for line in tasks)
+    for line in tasks + (tmp_path / 'wall.collapsed').read_text().splitlines():
+        stack, weight = line.rsplit(' ', 1)
+        assert stack and int(weight) >= 0
+    assert (tmp_path / 'memory.txt').read_text().startswith('Peak traced memory:')
+
+
+def trace(size, *files):
+    """A tracemalloc trace whose files run from the allocating frame outwards."""
+    return (0, size, tuple((name, 1) for name in files), len(files))
+
+
+def test_memory_is_attributed_to_the_innermost_known_stage(tmp_path):
+    crawler = '/src/crawler/raw_crawler.py'
+    parse = trace(3 * 2 ** 20, '/site-packages/lxml/html/__init__.py',
+                  '/src/crawler/listing_extractor.py', crawler, '/asyncio/events.py')
+    db = trace(2 ** 20, '/src/database/db_manager.py', crawler)
+    own = trace(2 ** 20, crawler, '/asyncio/events.py')
+
+    assert stage_of(tracemalloc.Trace(parse).traceback) == 'parse'
+
+    profiler = CrawlProfiler(str(tmp_path))
+    profiler.peak_snapshot = tracemalloc.Snapshot([parse, db, own], 16)
+    report = profiler.memory_report().splitlines()
+
+    assert report[1:5] == ["Largest snapshot: 5.0 MB",
+                           "  parse         3.0 MB",
+                           "  db            1.0 MB",
+                           "  crawler       1.0 MB"]
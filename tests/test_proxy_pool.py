@@ -0,0 +1,143 @@
+# tests/test_proxy_pool.py
+
+import asyncio
+
+from aiohttp import web
+
+from src.crawler.proxy_pool import BANNED, ERROR, OK, ProxyPool
+from src.crawler.rate_limiter import AdaptiveRateLimiter
+from src.crawler.raw_crawler import BlockedError, RawCrawler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_quarantine_doubles_per_strike_and_resets_on_success():
+    clock = Clock()
+    pool = ProxyPool(["http://p1", "http://p2"], quarantine_base=10, quarantine_max=25,
+                     error_threshold=2, clock=clock)
+    p1 = pool.proxies[0]
+
+    pool.release(p1, BANNED)
+    assert p1.quarantined_until == 10
+    pool.release(p1, BANNED)
+    assert p1.quarantined_until == 20
+    pool.release(p1, BANNED)
+    assert p1.quarantined_until == 25
+    assert pool.available() == [pool.proxies[1]]
+
+    clock.now = 30
+    pool.release(p1, OK, latency=0.2)
+    pool.release(p1, ERROR)
+    assert p1.quarantined_until == 25  # One error is below the threshold
+    pool.release(p1, ERROR)
+    assert p1.quarantined_until == 50  # Second strike since the reset: 2 x base
+
+
+def test_acquire_prefers_fast_healthy_proxies():
+    pool = ProxyPool(["http://fast", "http://slow"])
+    fast, slow = pool.proxies
+    for _ in range(5):
+        pool.release(fast, OK, latency=0.1)
+        pool.release(slow, OK, latency=2.0)
+
+    async def picks():
+        chosen = []
+        for _ in range(10):
+            proxy = await pool.acquire()
+            chosen.append(proxy.url)
+            pool.release(proxy, OK, latency=proxy.latency)
+        return chosen
+
+    assert set(asyncio.run(picks())) == {"http://fast"}
+
+
+def test_direct_connection_is_never_quarantined():
+    pool = ProxyPool([], quarantine_base=10)
+    direct = pool.proxies[0]
+
+    pool.release(direct, BANNED)
+    for _ in range(5):
+        pool.release(direct, ERROR)
+
+    assert direct.bans == 1 and direct.errors == 5
+    assert pool.available() == [direct]
+
+
+def test_failing_proxies_lose_picks_even_when_they_fail_fast():
+    pool = ProxyPool(["http://good", "http://broken"], error_threshold=100)
+    good, broken = pool.proxies
+    pool.release(good, OK, latency=0.5)
+
+    async def picks():
+        chosen = []
+        for _ in range(20):
+            proxy = await pool.acquire()
+            chosen.append(proxy.url)
+            if proxy is broken:
+                pool.release(proxy, ERROR, latency=0.01)
+            else:
+                pool.release(proxy, OK, latency=0.5)
+        return chosen
+
+    assert asyncio.run(picks()).count("http://broken") == 1
+
+
+def test_unmeasured_proxy_score_counts_requests_in_flight():
+    pool = ProxyPool(["http://busy", "http://idle"])
+    busy, idle = pool.proxies
+    pool.release(idle, OK, latency=0.2)
+    busy.in_flight = 4
+
+    assert busy.score(0.1) > idle.score(0.1)
+
+
+async def start_proxy(body):
+    """Local stand-in proxy that answers every request itself."""
+    hits = []
+
+    async def handler(request):
+        hits.append(str(request.url))
+        return web.Response(text=body, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", hits
+
+
+def test_fetch_routes_through_pool_and_quarantines_banned_proxy():
+    async def scenario():
+        good_runner, good, good_hits = await start_proxy("<html>laptop</html>")
+        bad_runner, bad, bad_hits = await start_proxy("Sorry, we just need to make sure you're not a robot")
+        limiter = AdaptiveRateLimiter(initial_rate=1000, min_rate=1000, max_rate=1000, burst_limit=100,
+                                      cooldown_time=0, jitter=0)
+        crawler = RawCrawler(db_manager=None, rate_limiter=limiter, proxies=[good, bad])
+        results = []
+        try:
+            async with await crawler.create_session() as pool:
+                for i in range(12):
+                    try:
+                        results.append((await crawler._fetch(pool, f"http://shop.test/dp/{i}"))[0])
+                    except BlockedError:
+                        results.append("blocked")
+                summary = {stats["proxy"]: stats for stats in pool.summary()}
+        finally:
+            await good_runner.cleanup()
+            await bad_runner.cleanup()
+        return results, summary, good, bad, len(good_hits), len(bad_hits)
+
+    results, summary, good, bad, good_hits, bad_hits = asyncio.run(scenario())
+
+    assert bad_hits == 1 and results.count("blocked") == 1
+    assert good_hits == 11 and summary[good]["successes"] == 11
+    assert summary[bad]["bans"] == 1
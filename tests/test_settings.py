@@ -0,0 +1,81 @@
+# tests/test_settings.py
+
+import pytest
+
+from src.crawler import raw_crawler
+from src.crawler.budget import CrawlBudget
+from src.crawler.raw_crawler import RawCrawler
+from src.utils.config import CONCURRENCY, LAPTOP_URLS, MAX_PAGES
+from src.utils.settings import load_settings, rate_ceiling
+
+
+def test_settings_layer_file_then_env_then_overrides(tmp_path):
+    config = tmp_path / "crawler.toml"
+    config.write_text(
+        '[crawler]\n'
+        'urls = ["https://example.test/s?k=a", "https://example.test/s?k=b"]\n'
+        'max-pages = 5\n'
+        'concurrency = 2\n'
+        'mode = "incremental"\n'
+    )
+    env = {"CRAWLER_CONCURRENCY": "6", "CRAWLER_MAX_SECONDS": "90", "CRAWLER_RATE_MAX": "4"}
+
+    settings = load_settings(str(config), env=env, overrides={"max_pages": 3, "rate": None})
+
+    assert settings.urls == ["https://example.test/s?k=a", "https://example.test/s?k=b"]
+    assert settings.mode == "incremental"
+    assert settings.max_pages == 3
+    assert settings.concurrency == 6
+    assert settings.max_seconds == 90.0
+    assert settings.max_requests is None
+    # --delay still caps the ceiling raised through the environment
+    assert settings.rate_ceiling == min(4.0, 1 / settings.delay)
+
+
+def test_settings_default_to_config_module():
+    settings = load_settings(env={})
+
+    assert settings.urls == LAPTOP_URLS
+    assert settings.max_pages == MAX_PAGES
+    assert settings.concurrency == CONCURRENCY
+    assert settings.mode == "full"
+
+
+def test_settings_reject_bad_values(tmp_path):
+    with pytest.raises(ValueError, match="CRAWLER_CONCURRENCY"):
+        load_settings(env={"CRAWLER_CONCURRENCY": "many"})
+    with pytest.raises(ValueError, match="mode"):
+        load_settings(env={}, overrides={"mode": "turbo"})
+    config = tmp_path / "crawler.toml"
+    config.write_text("max_pagez = 3\n")
+    with pytest.raises(ValueError, match="Unknown setting"):
+        load_settings(str(config), env={})
+
+
+def test_default_rate_limiter_respects_the_request_delay(monkeypatch):
+    assert rate_ceiling(2.0, 0.5) == 2.0
+    assert rate_ceiling(2.0, 0) == 2.0
+    monkeypatch.setattr(raw_crawler, "DELAY_BETWEEN_REQUESTS", 4.0)
+
+    limiter = RawCrawler(db_manager=None).rate_limiter
+
+    assert limiter.max_rate == 0.25
+    assert limiter.rate_limit <= 0.25
+
+
+def test_budget_stays_exhausted_once_a_limit_is_hit():
+    now = [0.0]
+    budget = CrawlBudget(max_requests=2, max_seconds=10, clock=lambda: now[0])
+    budget.start()
+
+    budget.charge()
+    assert budget.exceeded() is None
+    now[0] = 11.0
+    assert "time budget" in budget.exceeded()
+    now[0] = 0.0
+    assert budget.exceeded() is not None
+
+    budget.start()
+    budget.charge()
+    budget.charge()
+    assert "request budget" in budget.exceeded()
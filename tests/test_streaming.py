@@ -0,0 +1,83 @@
+# tests/test_streaming.py
+
+import asyncio
+from functools import partial
+
+import pytest
+from aiohttp import web
+
+from src.crawler.proxy_pool import ProxyPool
+from src.crawler.rate_limiter import AdaptiveRateLimiter
+from src.crawler.raw_crawler import BlockedError, RawCrawler
+from src.crawler.streaming import ResponseTooLargeError, response_charset
+
+CHUNK = 64 * 1024
+
+
+async def streamed(request, head: bytes, chunks: int, content_type='text/html; charset=utf-8'):
+    """Send ``head`` and then ``chunks`` filler chunks, stopping quietly if the client hangs up."""
+    response = web.StreamResponse(headers={'Content-Type': content_type})
+    await response.prepare(request)
+    try:
+        await response.write(head)
+        for _ in range(chunks):
+            await asyncio.sleep(0.001)
+            await response.write(b'x' * CHUNK)
+        await response.write_eof()
+    except (ConnectionError, RuntimeError):
+        pass
+    return response
+
+
+async def fetch_all(paths, **kwargs):
+    app = web.Application()
+    app.router.add_get('/captcha', partial(
+        streamed, head=b"<html>Sorry, we just need to make sure you're not a robot", chunks=200))
+    app.router.add_get('/big', partial(streamed, head=b'<html>', chunks=8))
+    app.router.add_get('/latin', partial(
+        streamed, head='Café <b>laptop</b>'.encode('latin-1'), chunks=0,
+        content_type='text/html; charset=ISO-8859-1'))
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    crawler = RawCrawler(db_manager=None, proxies=[], rate_limiter=AdaptiveRateLimiter(
+        initial_rate=1000, max_rate=1000, burst_limit=100, jitter=0), **kwargs)
+    results = {}
+    try:
+        async with ProxyPool([]) as pool:
+            for path in paths:
+                try:
+                    results[path] = await crawler._fetch(pool, base + path)
+                except Exception as e:
+                    results[path] = e
+    finally:
+        await runner.cleanup()
+    return results, crawler.metrics
+
+
+def test_captcha_page_is_abandoned_after_its_first_chunk():
+    results, metrics = asyncio.run(fetch_all(['/captcha']))
+
+    assert isinstance(results['/captcha'], BlockedError)
+    read = sum(metrics.counters['crawler_fetch_bytes_total'].values())
+    assert read < 4 * CHUNK  # Against a 12.5 MB body
+
+
+def test_oversized_page_raises_and_small_page_decodes_with_its_charset():
+    results, _ = asyncio.run(fetch_all(['/big', '/latin'], max_page_bytes=3 * CHUNK))
+
+    assert isinstance(results['/big'], ResponseTooLargeError)
+    assert results['/latin'] == (200, 'Café <b>laptop</b>')
+
+
+@pytest.mark.parametrize("content_type, head, expected", [
+    ('text/html; charset=ISO-8859-1', b'', 'iso8859-1'),
+    ('text/html', b'<html><head><meta charset="windows-1252">', 'cp1252'),
+    ('text/html', b'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">', 'shift_jis'),
+    ('text/html; charset=bogus', b'', 'utf-8'),
+])
+def test_response_charset(content_type, head, expected):
+    assert response_charset(content_type, head) == expected
@@ -0,0 +1,88 @@
+# tests/test_work_queue.py
+
+import asyncio
+import multiprocessing
+import uuid
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from src.database.work_queue import WorkQueue
+
+MONGODB_URI = "mongodb://localhost:27017"
+
+
+def mongod_available():
+    try:
+        MongoClient(MONGODB_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not mongod_available(), reason="needs a local mongod")
+
+
+def make_queue(crawl_id, **kwargs):
+    collection = AsyncIOMotorClient(MONGODB_URI)["work_queue_test"]["tasks"]
+    return WorkQueue(collection, crawl_id, **kwargs)
+
+
+def drain(crawl_id, owner, results):
+    """Lease and ack tasks until none are left (runs in a child process)."""
+    async def worker():
+        work_queue = make_queue(crawl_id)
+        claimed = []
+        while (task := await work_queue.lease("product", owner)) is not None:
+            claimed.append(task["url"])
+            await work_queue.ack(task, owner)
+        return claimed
+
+    results.put(asyncio.run(worker()))
+
+
+def test_tasks_are_leased_once_across_processes():
+    crawl_id = f"test-{uuid.uuid4().hex}"
+    urls = [f"https://example.test/dp/{i}" for i in range(200)]
+
+    async def seed():
+        work_queue = make_queue(crawl_id)
+        await work_queue.ensure_indexes()
+        return await work_queue.enqueue("product", [(url, {}) for url in urls + urls[:50]])
+
+    assert asyncio.run(seed()) == len(urls)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=drain, args=(crawl_id, f"node-{i}", results)) for i in range(4)]
+    for process in processes:
+        process.start()
+    claimed = [url for _ in processes for url in results.get(timeout=60)]
+    for process in processes:
+        process.join()
+
+    assert sorted(claimed) == sorted(urls)
+    assert asyncio.run(make_queue(crawl_id).is_drained())
+
+
+def test_expired_lease_is_retried_then_dead():
+    crawl_id = f"test-{uuid.uuid4().hex}"
+
+    async def scenario():
+        work_queue = make_queue(crawl_id, visibility_timeout=0, max_attempts=2, retry_delay=0)
+        await work_queue.enqueue("product", [("https://example.test/dp/X", {})])
+        first = await work_queue.lease("product", "a")
+        await asyncio.sleep(0.01)  # Stored dates have millisecond precision
+        second = await work_queue.lease("product", "b")
+        acked = await work_queue.ack(first, "a")
+        await asyncio.sleep(0.01)
+        third = await work_queue.lease("product", "c")
+        return first, second, acked, third, await work_queue.is_drained(), await work_queue.stats()
+
+    first, second, acked, third, drained, stats = asyncio.run(scenario())
+
+    assert first and second and second["attempts"] == 2
+    assert not acked and third is None
+    assert drained and stats["dead"] == 1